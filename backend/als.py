@@ -0,0 +1,159 @@
+"""
+Alternating Least Squares
+Biased matrix factorization of an explicit rating matrix,
+r(u, i) = mu + b_u + b_i + p_u . q_i, fitted one side at a time. A row's
+normal equations are built from sparse x dense products over the upper
+triangle of the fixed side's outer products (no loop over ratings), and
+each block of rows is solved with one batched np.linalg.solve. Blocks are
+spread over a process pool that inherits the rating matrix.
+"""
+
+import os
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+try:
+    from .batch import map_blocks, worker_state
+    from .mf import MFScorer
+except ImportError:  # running from inside backend/ (uvicorn main:app)
+    from batch import map_blocks, worker_state
+    from mf import MFScorer
+
+ALS_FACTORS = 32
+ALS_ITERATIONS = 10
+# Scaled by each row's rating count (ALS-WR), so it suits any data size
+ALS_REGULARIZATION = 0.05
+# Rows solved per task; bounds the Gram matrices at block x (factors + 1)^2
+ALS_BLOCK_ROWS = 4096
+# Factor pairs per sparse product; bounds the outer products at n x chunk
+PAIR_CHUNK = 64
+# Ratings predicted at once by rmse()
+PREDICT_CHUNK = 1 << 20
+
+
+def _solve_block(bounds):
+    """Least-squares [factors, bias] for rows start:stop against the fixed side"""
+    start, stop = bounds
+    state = worker_state()
+    block = state['targets'][start:stop]
+    fixed = state['fixed']
+    d = fixed.shape[1]
+
+    pattern = sparse.csr_matrix((np.ones_like(block.data), block.indices, block.indptr), shape=block.shape)
+    upper_a, upper_b = np.triu_indices(d)
+    gram_upper = np.empty((stop - start, len(upper_a)), dtype=np.float64)
+    for c in range(0, len(upper_a), PAIR_CHUNK):
+        a, b = upper_a[c:c + PAIR_CHUNK], upper_b[c:c + PAIR_CHUNK]
+        gram_upper[:, c:c + len(a)] = pattern @ (fixed[:, a] * fixed[:, b])
+
+    gram = np.empty((stop - start, d, d), dtype=np.float64)
+    gram[:, upper_a, upper_b] = gram_upper
+    gram[:, upper_b, upper_a] = gram_upper
+    counts = np.maximum(np.diff(block.indptr), 1)
+    diagonal = np.arange(d)
+    gram[:, diagonal, diagonal] += state['regularization'] * counts[:, None]
+
+    rhs = np.asarray(block @ fixed, dtype=np.float64)
+    solution = np.linalg.solve(gram, rhs[..., None])[..., 0]
+    return start, solution.astype(np.float32)
+
+
+def _half_sweep(targets: sparse.csr_matrix, fixed: np.ndarray, regularization: float,
+                workers: int, block_rows: int) -> np.ndarray:
+    """Solve every row of targets (residual ratings) against the fixed factors"""
+    n_rows = targets.shape[0]
+    blocks = [(start, min(start + block_rows, n_rows)) for start in range(0, n_rows, block_rows)]
+    solved = np.empty((n_rows, fixed.shape[1]), dtype=np.float32)
+    state = {'targets': targets, 'fixed': fixed, 'regularization': regularization}
+    for start, block in map_blocks(_solve_block, blocks, state, workers):
+        solved[start:start + len(block)] = block
+    return solved
+
+
+def _with_ones(factors: np.ndarray) -> np.ndarray:
+    """Append the constant column that turns the bias into one more factor"""
+    return np.hstack([factors, np.ones((len(factors), 1), dtype=np.float32)])
+
+
+def train_als(
+    ratings: sparse.csr_matrix,
+    user_ids: Sequence,
+    item_ids: Sequence,
+    factors: int = ALS_FACTORS,
+    iterations: int = ALS_ITERATIONS,
+    regularization: float = ALS_REGULARIZATION,
+    workers: Optional[int] = None,
+    block_rows: int = ALS_BLOCK_ROWS,
+    seed: int = 42,
+    history: Optional[List[float]] = None,
+) -> MFScorer:
+    """
+    Fit a user x item rating matrix (explicit ratings as CSR data) and
+    return it as an MFScorer. Seconds per iteration are appended to history.
+    """
+    workers = workers or os.cpu_count() or 1
+    ratings = sparse.csr_matrix(ratings, dtype=np.float32)
+    by_item = ratings.T.tocsr()
+    global_mean = float(ratings.data.mean())
+
+    rng = np.random.RandomState(seed)
+    user_factors = rng.normal(0, 0.1, (ratings.shape[0], factors)).astype(np.float32)
+    item_factors = rng.normal(0, 0.1, (ratings.shape[1], factors)).astype(np.float32)
+    user_bias = np.zeros(ratings.shape[0], dtype=np.float32)
+    item_bias = np.zeros(ratings.shape[1], dtype=np.float32)
+
+    for _ in range(iterations):
+        began = time.perf_counter()
+
+        # Users against [q_i, 1] on r - mu - b_i, then items against [p_u, 1] on r - mu - b_u
+        targets = sparse.csr_matrix(
+            (ratings.data - global_mean - item_bias[ratings.indices], ratings.indices, ratings.indptr),
+            shape=ratings.shape,
+        )
+        solved = _half_sweep(targets, _with_ones(item_factors), regularization, workers, block_rows)
+        user_factors, user_bias = np.ascontiguousarray(solved[:, :factors]), solved[:, factors].copy()
+
+        targets = sparse.csr_matrix(
+            (by_item.data - global_mean - user_bias[by_item.indices], by_item.indices, by_item.indptr),
+            shape=by_item.shape,
+        )
+        solved = _half_sweep(targets, _with_ones(user_factors), regularization, workers, block_rows)
+        item_factors, item_bias = np.ascontiguousarray(solved[:, :factors]), solved[:, factors].copy()
+
+        if history is not None:
+            history.append(time.perf_counter() - began)
+
+    return MFScorer(
+        user_factors=user_factors,
+        item_factors=item_factors,
+        user_ids=user_ids,
+        item_ids=item_ids,
+        user_bias=user_bias,
+        item_bias=item_bias,
+        global_mean=global_mean,
+        rating_scale=(float(ratings.data.min()), float(ratings.data.max())),
+    )
+
+
+def predict(scorer: MFScorer, user_rows: np.ndarray, item_rows: np.ndarray) -> np.ndarray:
+    """Clipped rating estimates for (inner user, inner item) pairs"""
+    est = np.einsum('ij,ij->i', scorer.user_factors[user_rows], scorer.item_factors[item_rows])
+    est = est + scorer.global_mean
+    if scorer.has_biases:
+        est += scorer.user_bias[user_rows] + scorer.item_bias[item_rows]
+    return np.clip(est, *scorer.rating_scale)
+
+
+def rmse(scorer: MFScorer, user_rows: np.ndarray, item_rows: np.ndarray, ratings: np.ndarray) -> float:
+    """Root mean squared error over rating triples, in chunks"""
+    if len(ratings) == 0:
+        return 0.0
+    squared = 0.0
+    for start in range(0, len(ratings), PREDICT_CHUNK):
+        stop = start + PREDICT_CHUNK
+        error = predict(scorer, user_rows[start:stop], item_rows[start:stop]) - ratings[start:stop]
+        squared += float(np.dot(error, error))
+    return float(np.sqrt(squared / len(ratings)))
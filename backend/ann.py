@@ -0,0 +1,126 @@
+"""
+Approximate Nearest Neighbour Index
+Pure-NumPy inverted-file (IVF) index over L2-normalised item vectors,
+with an exact brute-force fallback for small catalogs
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """Row-normalise a matrix so dot products become cosine similarities"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(vectors / norms)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        part = np.argpartition(-scores, k - 1)[:k]
+    else:
+        part = np.arange(len(scores))
+    return part[np.argsort(-scores[part], kind='stable')]
+
+
+class IVFIndex:
+    """
+    Cosine-similarity index. Vectors are clustered with spherical k-means;
+    a query only scans the n_probe closest clusters. Catalogs smaller than
+    exact_threshold are always searched exhaustively.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        n_iter: int = 10,
+        exact_threshold: int = 2048,
+        seed: int = 42,
+    ):
+        self.vectors = l2_normalize(vectors)
+        self.size, self.dim = self.vectors.shape
+        self.n_probe = n_probe
+        self.exact = self.size < exact_threshold
+
+        self.centroids = None
+        self.list_offsets = None
+        self.list_members = None
+        if not self.exact:
+            n_lists = n_lists or max(1, int(np.sqrt(self.size)))
+            self._train(min(n_lists, self.size), n_iter, seed)
+
+    def _train(self, n_lists: int, n_iter: int, seed: int) -> None:
+        """Spherical k-means, then bucket rows into contiguous posting lists"""
+        rng = np.random.default_rng(seed)
+        centroids = self.vectors[rng.choice(self.size, n_lists, replace=False)].copy()
+
+        for _ in range(n_iter):
+            assign = np.argmax(self.vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, self.vectors)
+            empty = np.bincount(assign, minlength=n_lists) == 0
+            # Re-seed empty clusters from random points
+            sums[empty] = self.vectors[rng.choice(self.size, int(empty.sum()))]
+            centroids = l2_normalize(sums)
+
+        assign = np.argmax(self.vectors @ centroids.T, axis=1)
+        order = np.argsort(assign, kind='stable')
+        counts = np.bincount(assign, minlength=n_lists)
+
+        self.centroids = centroids
+        self.list_members = order.astype(np.int64)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        n_probe: Optional[int] = None,
+        exclude: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row indices, cosine scores) of the k nearest rows to query"""
+        query = l2_normalize(np.asarray(query).reshape(1, -1))[0]
+
+        if self.exact:
+            candidates = None
+            scores = self.vectors @ query
+        else:
+            n_probe = min(n_probe or self.n_probe, len(self.centroids))
+            lists = top_k_indices(self.centroids @ query, n_probe)
+            candidates = np.concatenate([
+                self.list_members[self.list_offsets[l]:self.list_offsets[l + 1]] for l in lists
+            ])
+            scores = self.vectors[candidates] @ query
+
+        if exclude is not None:
+            if candidates is None:
+                scores[exclude] = -np.inf
+            else:
+                scores[candidates == exclude] = -np.inf
+
+        top = top_k_indices(scores, k)
+        top = top[np.isfinite(scores[top])]
+        rows = top if candidates is None else candidates[top]
+        return rows, scores[top]
+
+    def search_item(self, row: int, k: int, n_probe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest neighbours of an indexed row, excluding the row itself"""
+        return self.search(self.vectors[row], k, n_probe=n_probe, exclude=row)
+
+    def search_exact(self, query: np.ndarray, k: int, exclude: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force search over every row, used as ground truth for recall"""
+        query = l2_normalize(np.asarray(query).reshape(1, -1))[0]
+        scores = self.vectors @ query
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        top = top_k_indices(scores, k)
+        top = top[np.isfinite(scores[top])]
+        return top, scores[top]
@@ -0,0 +1,303 @@
+"""
+Model Artifact Format
+Pickle-free artifacts: one .npy file per array, opened with mmap_mode='r' so
+uvicorn workers share pages through the OS cache, plus a small JSON manifest
+with versions and checksums.
+
+Convert the pickles in models/ with:  python -m backend.artifacts
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+try:
+    from .demographics import AFFINITY_FILE, USERS_FILE
+    from .mf import MF_MODEL_FILE, MFScorer
+    from .ranking import LinearRanker, make_ranker
+except ImportError:  # running from inside backend/ (uvicorn main:app)
+    from demographics import AFFINITY_FILE, USERS_FILE
+    from mf import MF_MODEL_FILE, MFScorer
+    from ranking import LinearRanker, make_ranker
+
+ARTIFACT_FORMAT_VERSION = 1
+ARTIFACTS_DIRNAME = "artifacts"
+MANIFEST_FILE = "manifest.json"
+
+
+def file_checksum(path: Path, chunk_size: int = 1 << 20) -> str:
+    """sha256 of a file, streamed in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def catalog_checksum(item_ids) -> str:
+    """Short sha256 of the catalog's item ids in row order, for tables built against it"""
+    return hashlib.sha256("\n".join(str(i) for i in item_ids).encode()).hexdigest()[:12]
+
+
+def artifacts_version(models_dir: Path) -> Optional[str]:
+    """model_version of the artifacts in models_dir, None when serving from pickles"""
+    artifacts = ArtifactStore.open(Path(models_dir) / ARTIFACTS_DIRNAME)
+    return artifacts.version if artifacts is not None else None
+
+
+class ArtifactWriter:
+    """Collects arrays and metadata, then writes them with a manifest"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.files: Dict[str, dict] = {}
+        self.meta: Dict[str, Any] = {}
+
+    def add_array(self, name: str, array: np.ndarray) -> None:
+        array = np.ascontiguousarray(array)
+        filename = f"{name}.npy"
+        path = self.directory / filename
+        np.save(path, array)
+        self.files[name] = {
+            'file': filename,
+            'shape': list(array.shape),
+            'dtype': array.dtype.str,
+            'sha256': file_checksum(path),
+        }
+
+    def add_csr(self, name: str, matrix) -> None:
+        matrix = sparse.csr_matrix(matrix)
+        self.add_array(f"{name}.data", matrix.data)
+        self.add_array(f"{name}.indices", matrix.indices)
+        self.add_array(f"{name}.indptr", matrix.indptr)
+        self.meta[f"{name}.shape"] = list(matrix.shape)
+
+    def write(self, model_version: Optional[str] = None) -> str:
+        """Write the manifest last (atomically), so readers never see a partial set"""
+        if model_version is None:
+            digest = hashlib.sha256("".join(f['sha256'] for f in self.files.values()).encode())
+            model_version = digest.hexdigest()[:12]
+        manifest = {
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'model_version': model_version,
+            'created_at': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            'files': self.files,
+            'meta': self.meta,
+        }
+        tmp_path = self.directory / (MANIFEST_FILE + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.directory / MANIFEST_FILE)
+        return model_version
+
+
+class ArtifactStore:
+    """Read side of the artifact format; arrays are memory-mapped on first use"""
+
+    def __init__(self, directory: Path, manifest: dict):
+        self.directory = Path(directory)
+        self.manifest = manifest
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def open(cls, directory: Path) -> Optional["ArtifactStore"]:
+        """Open an artifact directory, or None if there is no usable manifest"""
+        manifest_path = Path(directory) / MANIFEST_FILE
+        if not manifest_path.exists():
+            return None
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except Exception as e:
+            print(f"Error reading {manifest_path}: {e}")
+            return None
+        if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+            print(f"Warning: unsupported artifact format {manifest.get('format_version')}")
+            return None
+        return cls(directory, manifest)
+
+    @property
+    def version(self) -> str:
+        return self.manifest['model_version']
+
+    def meta(self, key: str, default: Any = None) -> Any:
+        return self.manifest['meta'].get(key, default)
+
+    def has(self, name: str) -> bool:
+        return name in self.manifest['files']
+
+    def array(self, name: str) -> Optional[np.ndarray]:
+        """Memory-mapped array, or None if it is not part of this artifact set"""
+        if name not in self._arrays:
+            entry = self.manifest['files'].get(name)
+            if entry is None:
+                return None
+            self._arrays[name] = np.load(self.directory / entry['file'], mmap_mode='r')
+        return self._arrays[name]
+
+    def csr(self, name: str) -> Optional[sparse.csr_matrix]:
+        if not self.has(f"{name}.data"):
+            return None
+        return sparse.csr_matrix(
+            (self.array(f"{name}.data"), self.array(f"{name}.indices"), self.array(f"{name}.indptr")),
+            shape=tuple(self.meta(f"{name}.shape")),
+            copy=False,
+        )
+
+    def verify(self) -> List[str]:
+        """Names of files whose checksum does not match the manifest"""
+        return [
+            name for name, entry in self.manifest['files'].items()
+            if file_checksum(self.directory / entry['file']) != entry['sha256']
+        ]
+
+    def mf_scorer(self) -> Optional[MFScorer]:
+        if not self.has('mf_item_factors'):
+            return None
+        user_ids = self.array('mf_user_ids')
+        return MFScorer(
+            user_factors=self.array('mf_user_factors'),
+            item_factors=self.array('mf_item_factors'),
+            user_ids=user_ids if user_ids is not None else [],
+            item_ids=self.array('mf_item_ids'),
+            user_bias=self.array('mf_user_bias'),
+            item_bias=self.array('mf_item_bias'),
+            global_mean=self.meta('mf_global_mean', 0.0),
+            rating_scale=self.meta('mf_rating_scale', (1.0, 5.0)),
+        )
+
+    def label_encoder(self, name: str):
+        """LabelEncoder rebuilt from its stored classes"""
+        classes = self.meta(f"{name}_classes")
+        if classes is None:
+            return None
+        from sklearn.preprocessing import LabelEncoder
+        encoder = LabelEncoder()
+        encoder.classes_ = np.array(classes)
+        return encoder
+
+    def tfidf_vectorizer(self):
+        """TfidfVectorizer rebuilt from its stored vocabulary, idf weights and parameters"""
+        params = self.meta('tfidf_params')
+        if params is None or not self.has('tfidf_vocabulary'):
+            return None
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        if params.get('ngram_range') is not None:
+            params = {**params, 'ngram_range': tuple(params['ngram_range'])}
+        terms = self.array('tfidf_vocabulary')
+        vectorizer = TfidfVectorizer(**params)
+        vectorizer.vocabulary_ = {str(term): i for i, term in enumerate(terms)}
+        vectorizer.idf_ = np.asarray(self.array('tfidf_idf'), dtype=np.float64)
+        return vectorizer
+
+    def ranker(self):
+        ranking = self.meta('ranking')
+        if ranking is None:
+            return None
+        if ranking['type'] == 'linear':
+            return LinearRanker(self.array('ranking_coef'), ranking['intercept'], logistic=ranking['logistic'])
+        # Non-linear rankers are still pickled next to the manifest
+        with open(self.directory / ranking['file'], 'rb') as f:
+            return make_ranker(pickle.load(f))
+
+
+def load_model_file(path: Path) -> Any:
+    """Unpickle a model file (plain pickle or joblib dump), None if missing"""
+    if not Path(path).exists():
+        return None
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        import joblib
+        return joblib.load(path)
+
+
+def export_artifacts(models_dir: Path, items_df) -> str:
+    """Convert the pickles in models_dir into the artifact format under models_dir/artifacts"""
+    models_dir = Path(models_dir)
+    writer = ArtifactWriter(models_dir / ARTIFACTS_DIRNAME)
+
+    def load_model(filename: str):
+        return load_model_file(models_dir / filename)
+
+    user_embeddings = load_model("user_embeddings.pkl")
+    item_embeddings = load_model("item_embeddings.pkl")
+    if user_embeddings is not None:
+        writer.add_array('user_embeddings', np.asarray(user_embeddings, dtype=np.float32))
+    if item_embeddings is not None:
+        writer.add_array('item_embeddings', np.asarray(item_embeddings, dtype=np.float32))
+
+    # A model from the training pipeline takes precedence over the notebook's pickle
+    scorer = MFScorer.load(models_dir / MF_MODEL_FILE) or MFScorer.from_model(
+        load_model("svd_sklearn.pkl"), user_embeddings
+    )
+    if scorer is not None:
+        writer.add_array('mf_item_factors', scorer.item_factors.astype(np.float32))
+        writer.add_array('mf_item_ids', np.array(list(scorer.item_index), dtype=str))
+        if scorer.user_factors is not None:
+            writer.add_array('mf_user_factors', scorer.user_factors.astype(np.float32))
+            writer.add_array('mf_user_ids', np.array(list(scorer.user_index), dtype=str))
+        if scorer.has_biases:
+            writer.add_array('mf_user_bias', scorer.user_bias)
+            writer.add_array('mf_item_bias', scorer.item_bias)
+        writer.meta['mf_global_mean'] = scorer.global_mean
+        writer.meta['mf_rating_scale'] = list(scorer.rating_scale)
+
+    ranking_model = load_model("ranking_model.pkl")
+    if ranking_model is not None:
+        ranker = make_ranker(ranking_model)
+        if isinstance(ranker, LinearRanker):
+            writer.add_array('ranking_coef', ranker.coef)
+            writer.meta['ranking'] = {'type': 'linear', 'intercept': ranker.intercept, 'logistic': ranker.logistic}
+        else:
+            with open(writer.directory / "ranking_model.pkl", 'wb') as f:
+                pickle.dump(ranking_model, f)
+            writer.meta['ranking'] = {'type': 'pickle', 'file': "ranking_model.pkl"}
+
+    for name in ('gender', 'occupation'):
+        encoder = load_model(f"{name}_encoder.pkl")
+        if encoder is not None:
+            writer.meta[f"{name}_classes"] = [str(c) for c in encoder.classes_]
+
+    # (gender x occupation x item) table learned by the training pipeline
+    affinity_path = models_dir / AFFINITY_FILE
+    if affinity_path.exists():
+        writer.add_array('demographic_affinity', np.load(affinity_path))
+    users_path = models_dir / USERS_FILE
+    if users_path.exists():
+        with np.load(users_path) as users:
+            for name in users.files:
+                writer.add_array(f"demographic_{name}", users[name])
+
+    # TF-IDF rows for the catalog, plus what transform() needs for free text
+    tfidf = load_model("tfidf_vectorizer.pkl")
+    if tfidf is not None:
+        text = items_df['title'].fillna('') + " " + items_df['genres'].fillna('')
+        writer.add_csr('tfidf_matrix', tfidf.transform(text).astype(np.float32))
+        terms = sorted(tfidf.vocabulary_, key=tfidf.vocabulary_.get)
+        writer.add_array('tfidf_vocabulary', np.array(terms, dtype=str))
+        writer.add_array('tfidf_idf', np.asarray(tfidf.idf_, dtype=np.float64))
+        writer.meta['tfidf_params'] = {
+            name: list(value) if isinstance(value, tuple) else value
+            for name, value in tfidf.get_params().items()
+            if name != 'dtype' and isinstance(value, (str, int, float, bool, tuple, type(None)))
+        }
+
+    return writer.write()
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    models_dir = Path(__file__).parent.parent / "models"
+    version = export_artifacts(models_dir, pd.read_csv(models_dir / "items_metadata.csv"))
+    print(f"Wrote artifacts version {version} to {models_dir / ARTIFACTS_DIRNAME}")
@@ -0,0 +1,126 @@
+"""
+Batch Scoring
+Top-k for many users at once: users are scored a block at a time with one
+user-block x item matrix product and every row keeps only its partial
+top-k, so memory stays at block x n_items scores however large the batch
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Scores materialised per block (block x n_items); ~64MB as float32
+BLOCK_SCORES = 1 << 24
+
+
+# Per-process state of map_blocks workers, set once by the pool initializer instead of pickled per task
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(state: Dict[str, Any]):
+    _worker_state.clear()
+    _worker_state.update(state)
+
+
+def worker_state() -> Dict[str, Any]:
+    """The state given to map_blocks, as seen by a block function in this process"""
+    return _worker_state
+
+
+def map_blocks(fn: Callable, blocks: Sequence, state: Dict[str, Any], workers: int) -> Iterator:
+    """
+    fn over blocks, results in order, on a pool of worker processes that
+    receive state once at start-up (see worker_state). With one worker or
+    one block, runs in this process.
+    """
+    if workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(state,)) as pool:
+            yield from pool.map(fn, blocks)
+    else:
+        _init_worker(state)
+        try:
+            yield from map(fn, blocks)
+        finally:
+            _worker_state.clear()
+
+
+def block_size_for(n_items: int, budget: int = BLOCK_SCORES) -> int:
+    """Users per block so that a block of scores stays around budget entries"""
+    return max(1, min(1024, budget // max(n_items, 1)))
+
+
+def row_top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Column indices and values of the k highest scores of every row, best first"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((len(scores), 0), dtype=np.int64), np.empty((len(scores), 0), dtype=scores.dtype)
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+class BatchResult:
+    """Top-k catalog rows for one user of a batch"""
+
+    __slots__ = ('user_id', 'source', 'rows', 'scores')
+
+    def __init__(self, user_id: str, source: str, rows: np.ndarray, scores: np.ndarray):
+        self.user_id = user_id
+        self.source = source
+        self.rows = rows
+        self.scores = scores
+
+
+def iter_batch_top_k(
+    scorer,
+    user_ids: Sequence[str],
+    k: int,
+    fallback_rows: np.ndarray,
+    fallback_scores: np.ndarray,
+    block_size: Optional[int] = None,
+    overrides: Optional[Callable[[str], Optional[np.ndarray]]] = None,
+) -> Iterator[List[BatchResult]]:
+    """
+    Top-k per user, one list of results per block in request order. Users the
+    MF scorer knows are ranked by their predicted scores ('svd'); everyone
+    else gets the fallback ranking ('trending'). overrides(user_id) may supply
+    a user's catalog scores ahead of the scorer (e.g. folded-in ratings).
+    """
+    n_items = len(fallback_scores)
+    block_size = block_size or block_size_for(n_items)
+    fallback_rows = np.asarray(fallback_rows[:k])
+    fallback_top = np.asarray(fallback_scores)[fallback_rows]
+
+    for start in range(0, len(user_ids), block_size):
+        block = [str(user_id) for user_id in user_ids[start:start + block_size]]
+        if scorer is not None and scorer.user_factors is not None:
+            inner = [scorer.user_index.get(user_id) for user_id in block]
+        else:
+            inner = [None] * len(block)
+        override: Dict[int, np.ndarray] = {}
+        if overrides is not None:
+            for i, user_id in enumerate(block):
+                scores = overrides(user_id)
+                if scores is not None:
+                    override[i] = scores
+        known = [i for i, row in enumerate(inner) if row is not None and i not in override]
+
+        results: List[Optional[BatchResult]] = [None] * len(block)
+        if override:
+            top_rows, top_scores = row_top_k(np.vstack(list(override.values())), k)
+            for i, rows, scores in zip(override, top_rows, top_scores):
+                results[i] = BatchResult(block[i], 'svd', rows, scores)
+        if known:
+            # One matrix product for every known user of the block
+            top_rows, top_scores = row_top_k(scorer.score_rows(np.array([inner[i] for i in known])), k)
+            for i, rows, scores in zip(known, top_rows, top_scores):
+                results[i] = BatchResult(block[i], 'svd', rows, scores)
+        for i, user_id in enumerate(block):
+            if results[i] is None:
+                results[i] = BatchResult(user_id, 'trending', fallback_rows, fallback_top)
+        yield results
@@ -0,0 +1,118 @@
+"""
+Result Cache
+Bounded in-process LRU cache with TTL for endpoint results, behind a small
+backend interface so a shared cache can be slotted in later
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class CacheBackend:
+    """Storage interface used by ResultCache"""
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class LRUCache(CacheBackend):
+    """Thread-safe LRU cache with a per-entry time-to-live (None: entries never expire)"""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: Optional[float] = 300.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else float('inf')
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+class ResultCache:
+    """
+    Versioned view over a backend. Every key carries the model version it was
+    computed with, so a request that started before a reload and stores its
+    result afterwards can never have that result served for the new models.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, enabled: bool = True):
+        self.backend = backend or LRUCache()
+        self.enabled = enabled
+        self.invalidations = 0
+
+    def get(self, version: Hashable, key: tuple) -> Any:
+        """Cached value for key under a model version, or None"""
+        if not self.enabled:
+            return None
+        value = self.backend.get((version,) + key, _MISSING)
+        return None if value is _MISSING else value
+
+    def set(self, version: Hashable, key: tuple, value: Any) -> None:
+        if self.enabled:
+            self.backend.set((version,) + key, value)
+
+    def invalidate(self) -> None:
+        """Free everything; entries for older versions are unreachable anyway"""
+        self.invalidations += 1
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {'enabled': self.enabled, 'invalidations': self.invalidations, **self.backend.stats()}
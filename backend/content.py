@@ -0,0 +1,101 @@
+"""
+Content Engine
+TF-IDF similarity over the catalog: the item matrix is L2-normalised once
+and kept in CSR form, so item->item and text->item cosine similarity are
+sparse matrix products. Batch top-k works through the catalog in row chunks
+to keep memory bounded.
+"""
+
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+# Catalog rows scored per chunk in top_k (bounds dense scores at queries x chunk)
+CONTENT_CHUNK = 8192
+
+
+def l2_normalize_rows(matrix) -> sparse.csr_matrix:
+    """Row-normalised float32 CSR copy; all-zero rows stay zero"""
+    matrix = sparse.csr_matrix(matrix, dtype=np.float32, copy=True)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    matrix.data /= np.repeat(norms, np.diff(matrix.indptr)).astype(np.float32)
+    matrix.sort_indices()
+    return matrix
+
+
+class ContentEngine:
+    """Cosine similarity between TF-IDF item rows, item profiles and free text"""
+
+    def __init__(self, tfidf_matrix, vectorizer=None, chunk_size: int = CONTENT_CHUNK):
+        self.matrix = l2_normalize_rows(tfidf_matrix)
+        self.vectorizer = vectorizer
+        self.chunk_size = chunk_size
+        self.size = self.matrix.shape[0]
+
+    def item_profile(self, rows: Iterable[int], weights: Optional[np.ndarray] = None) -> Optional[sparse.csr_matrix]:
+        """Normalised (weighted) centroid of some catalog items"""
+        rows = np.asarray(list(rows), dtype=np.int64)
+        if len(rows) == 0:
+            return None
+        block = self.matrix[rows]
+        if weights is not None:
+            block = sparse.diags(np.asarray(weights, dtype=np.float32)) @ block
+        return l2_normalize_rows(block.sum(axis=0))
+
+    def text_profile(self, text: str) -> Optional[sparse.csr_matrix]:
+        """Normalised TF-IDF vector of free text, None if nothing in it is in the vocabulary"""
+        if self.vectorizer is None or not text:
+            return None
+        vector = self.vectorizer.transform([text])
+        if vector.nnz == 0:
+            return None
+        return l2_normalize_rows(vector)
+
+    def score(self, profile: sparse.csr_matrix, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of a profile with the given rows (default: the whole catalog)"""
+        block = self.matrix if rows is None else self.matrix[rows]
+        return np.asarray((block @ profile.T).todense(), dtype=np.float64).ravel()
+
+    def top_k(
+        self,
+        queries: sparse.csr_matrix,
+        k: int,
+        exclude: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Best k catalog rows for each query row, best first. Scores are computed
+        chunk by chunk and merged into a running top-k. exclude gives one row
+        per query to skip (e.g. the query item itself), or -1.
+        """
+        n_queries = queries.shape[0]
+        k = min(k, self.size)
+        best_rows = np.full((n_queries, 0), -1, dtype=np.int64)
+        best_scores = np.empty((n_queries, 0), dtype=np.float32)
+        queries_t = sparse.csr_matrix(queries.T, dtype=np.float32)
+
+        for start in range(0, self.size, self.chunk_size):
+            stop = min(start + self.chunk_size, self.size)
+            scores = np.asarray((self.matrix[start:stop] @ queries_t).T.todense(), dtype=np.float32)
+            if exclude is not None:
+                hit = (exclude >= start) & (exclude < stop)
+                scores[np.flatnonzero(hit), exclude[hit] - start] = -np.inf
+
+            rows = np.broadcast_to(np.arange(start, stop), scores.shape)
+            merged_scores = np.concatenate([best_scores, scores], axis=1)
+            merged_rows = np.concatenate([best_rows, rows], axis=1)
+            if merged_scores.shape[1] > k:
+                keep = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+                merged_scores = np.take_along_axis(merged_scores, keep, axis=1)
+                merged_rows = np.take_along_axis(merged_rows, keep, axis=1)
+            best_scores, best_rows = merged_scores, merged_rows
+
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def similar_items(self, row: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k items by TF-IDF similarity to one item, excluding itself"""
+        rows, scores = self.top_k(self.matrix[row], k, exclude=np.array([row]))
+        valid = np.isfinite(scores[0])
+        return rows[0][valid], scores[0][valid]
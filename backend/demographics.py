@@ -0,0 +1,166 @@
+"""
+Demographic Affinity
+The gender and occupation encoders are compiled into dict lookups at load
+time, and the demographic feature is a precomputed (gender x occupation x
+item) table, so scoring a request is one gather over its rows. The last
+index of each label axis holds the marginal over that label, used for
+unknown values. The table is learned from rated data by the training
+pipeline, which also keeps the model users' labels for personalised
+requests; without a table, a fixed pseudo-random one (stable across
+processes) stands in.
+"""
+
+import zlib
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+AFFINITY_FILE = "demographic_affinity.npy"
+# Gender and occupation labels of the users the table was learned from
+USERS_FILE = "user_demographics.npz"
+# Pseudo-ratings pulling a small group's like rate towards the item's overall rate
+AFFINITY_PRIOR = 10.0
+
+
+class LabelIndex:
+    """A fitted LabelEncoder as a case-insensitive label -> code dict"""
+
+    def __init__(self, classes: Iterable):
+        self.classes = [str(c) for c in classes]
+        self.index = {c.lower(): code for code, c in enumerate(self.classes)}
+
+    @classmethod
+    def from_encoder(cls, encoder) -> "LabelIndex":
+        return cls(encoder.classes_ if encoder is not None else [])
+
+    def __len__(self) -> int:
+        return len(self.classes)
+
+    def encode(self, label: Optional[str]) -> int:
+        """Code of a label; unknown labels get the marginal slot len(self)"""
+        return self.index.get(str(label).lower(), len(self.classes)) if label is not None else len(self.classes)
+
+
+def _stable_hash(value: str) -> int:
+    return zlib.crc32(value.encode("utf-8"))
+
+
+def synthetic_table(n_genders: int, n_occupations: int, item_ids: Sequence) -> np.ndarray:
+    """0.5-1.0 pseudo-random affinities, the same in every process"""
+    genders = np.array([_stable_hash(str(g)) for g in range(n_genders)] + [_stable_hash("any")], dtype=np.int64)
+    occupations = np.array([_stable_hash(str(o)) for o in range(n_occupations)] + [_stable_hash("any")], dtype=np.int64)
+    items = np.fromiter((_stable_hash(str(i)) for i in item_ids), dtype=np.int64, count=len(item_ids))
+    seed = (genders[:, None, None] + occupations[None, :, None] + items[None, None, :]) % 100
+    return (0.5 + seed / 200).astype(np.float16)
+
+
+def build_affinity_table(
+    ratings: sparse.csr_matrix,
+    user_genders: np.ndarray,
+    user_occupations: np.ndarray,
+    n_genders: int,
+    n_occupations: int,
+    threshold: float,
+    prior: float = AFFINITY_PRIOR,
+) -> np.ndarray:
+    """
+    Share of each (gender, occupation) group's ratings of an item that are
+    likes (>= threshold), shrunk towards the item's overall share, which is
+    shrunk towards the global one. ratings is users x items; user codes
+    outside the encoders (e.g. -1) only count towards the marginals.
+    """
+    n_users, n_items = ratings.shape
+    G, O = n_genders, n_occupations
+    genders = np.where((user_genders >= 0) & (user_genders < G), user_genders, G)
+    occupations = np.where((user_occupations >= 0) & (user_occupations < O), user_occupations, O)
+
+    # Every user counts towards its cell, both single-label marginals and the overall marginal
+    n_cells = (G + 1) * (O + 1)
+    cells = np.column_stack([
+        genders * (O + 1) + occupations,
+        genders * (O + 1) + O,
+        G * (O + 1) + occupations,
+        np.full(n_users, n_cells - 1),
+    ]).astype(np.int64)
+    # Unknown labels make some of these the same cell; a user counts once per cell
+    pairs = np.unique(cells.ravel() * n_users + np.repeat(np.arange(n_users, dtype=np.int64), 4))
+    groups = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.float32), (pairs // n_users, pairs % n_users)), shape=(n_cells, n_users)
+    )
+
+    rated = sparse.csr_matrix((np.ones_like(ratings.data), ratings.indices, ratings.indptr), shape=ratings.shape)
+    liked = sparse.csr_matrix(
+        ((ratings.data >= threshold).astype(np.float32), ratings.indices, ratings.indptr), shape=ratings.shape
+    )
+    counts = np.asarray((groups @ rated).todense()).reshape(G + 1, O + 1, n_items)
+    likes = np.asarray((groups @ liked).todense()).reshape(G + 1, O + 1, n_items)
+
+    overall = likes[G, O].sum() / max(counts[G, O].sum(), 1.0)
+    item_rate = (likes[G, O] + prior * overall) / (counts[G, O] + prior)
+    return ((likes + prior * item_rate) / (counts + prior)).astype(np.float16)
+
+
+def save_users(path, user_ids: Sequence, genders: Sequence, occupations: Sequence) -> None:
+    """Users' labels as plain string arrays (no pickle), see USERS_FILE"""
+    np.savez(path, user_ids=np.asarray(user_ids, dtype=str),
+             genders=np.asarray(genders, dtype=str), occupations=np.asarray(occupations, dtype=str))
+
+
+class DemographicAffinity:
+    """Encoders plus the affinity table, aligned with the catalog rows"""
+
+    def __init__(self, genders: LabelIndex, occupations: LabelIndex, table: np.ndarray, learned: bool):
+        self.genders = genders
+        self.occupations = occupations
+        self.table = table
+        self.learned = learned
+        # User id -> (gender code, occupation code), for users with known demographics
+        self.users: Dict[str, Tuple[int, int]] = {}
+
+    @classmethod
+    def create(cls, gender_encoder, occupation_encoder, table: Optional[np.ndarray],
+               item_ids: Sequence, users: Optional[Dict[str, np.ndarray]] = None) -> "DemographicAffinity":
+        """
+        Use the learned table when it matches the encoders and catalog, else
+        the synthetic one. users holds the user_ids/genders/occupations arrays
+        of USERS_FILE.
+        """
+        genders = LabelIndex.from_encoder(gender_encoder)
+        occupations = LabelIndex.from_encoder(occupation_encoder)
+        expected = (len(genders) + 1, len(occupations) + 1, len(item_ids))
+        if table is not None and tuple(table.shape) == expected:
+            affinity = cls(genders, occupations, table, learned=True)
+        else:
+            if table is not None:
+                print(f"Warning: demographic affinity table {tuple(table.shape)} doesn't match {expected}; ignoring it")
+            affinity = cls(genders, occupations, synthetic_table(len(genders), len(occupations), item_ids), learned=False)
+        if users is not None:
+            affinity.users = {
+                str(user_id): (genders.encode(gender), occupations.encode(occupation))
+                for user_id, gender, occupation in zip(users['user_ids'], users['genders'], users['occupations'])
+            }
+        return affinity
+
+    def scores(self, gender: Optional[str], occupation: Optional[str],
+               rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Affinity of the group with the given rows (default: the whole catalog)"""
+        affinities = self.table[self.genders.encode(gender), self.occupations.encode(occupation)]
+        return np.asarray(affinities if rows is None else affinities[rows], dtype=np.float64)
+
+    def user_scores(self, user_id: str, rows: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """Affinity of a known user's group with the given rows, None without their demographics"""
+        codes = self.users.get(str(user_id))
+        if codes is None:
+            return None
+        affinities = self.table[codes]
+        return np.asarray(affinities if rows is None else affinities[rows], dtype=np.float64)
+
+    def stats(self) -> dict:
+        return {
+            'learned': self.learned,
+            'genders': self.genders.classes,
+            'occupations': len(self.occupations),
+            'users': len(self.users),
+            'table_mb': round(self.table.nbytes / 2**20, 2),
+        }
@@ -0,0 +1,62 @@
+"""
+User-Item Embedding Similarity
+Both embedding matrices are L2-normalised once, so a user's cosine
+similarity to every item is one matrix-vector product; per-user score
+vectors are kept in a bounded LRU cache
+"""
+
+from typing import Optional
+
+import numpy as np
+
+try:
+    from .ann import l2_normalize
+    from .cache import LRUCache
+except ImportError:  # running from inside backend/ (uvicorn main:app)
+    from ann import l2_normalize
+    from cache import LRUCache
+
+# Per-user score vectors kept (each is one float32 per catalog item)
+USER_SCORE_CACHE_SIZE = 1024
+
+
+class EmbeddingScorer:
+    """Cosine similarity between a user embedding and every catalog item embedding"""
+
+    def __init__(self, user_embeddings: np.ndarray, item_embeddings: np.ndarray, cache_size: int = USER_SCORE_CACHE_SIZE):
+        self.users = l2_normalize(user_embeddings)
+        self.items = l2_normalize(item_embeddings)
+        # Embedding rows follow the sorted user ids 1..n (MovieLens convention)
+        self.user_index = {str(i + 1): i for i in range(len(self.users))}
+        # Scores only change with the models, which replace this object on reload
+        self.cache = LRUCache(max_size=cache_size, ttl_seconds=None)
+
+    @classmethod
+    def create(cls, user_embeddings, item_embeddings, n_items: int, cache_size: int = USER_SCORE_CACHE_SIZE) -> Optional["EmbeddingScorer"]:
+        """Scorer if both matrices exist, share a dimension and items line up with the catalog"""
+        if user_embeddings is None or item_embeddings is None:
+            return None
+        if np.ndim(user_embeddings) != 2 or np.ndim(item_embeddings) != 2:
+            return None
+        if np.shape(user_embeddings)[1] != np.shape(item_embeddings)[1] or len(item_embeddings) != n_items:
+            return None
+        return cls(np.asarray(user_embeddings), np.asarray(item_embeddings), cache_size)
+
+    def user_row(self, user_id: str) -> Optional[int]:
+        """Embedding row of a user id; the demo ids "user1", "user2", ... map to 1, 2, ..."""
+        user_id = str(user_id)
+        if user_id not in self.user_index and user_id.startswith("user"):
+            user_id = user_id[len("user"):]
+        return self.user_index.get(user_id)
+
+    def score_user(self, user_id: str) -> Optional[np.ndarray]:
+        """Cosine similarity of a user with every item (read-only), None for unknown users"""
+        row = self.user_row(user_id)
+        if row is None:
+            return None
+        scores = self.cache.get(row)
+        if scores is None:
+            scores = self.items @ self.users[row]
+            scores.setflags(write=False)
+            self.cache.set(row, scores)
+        return scores
@@ -0,0 +1,254 @@
+"""
+Offline Evaluation
+Offline SVD benchmark on a held-out MovieLens split: factors are trained on
+the train split only (TruncatedSVD, as in the notebook), every user is
+scored in batches across a process pool and precision@k, recall@k, NDCG@k,
+catalog coverage and scoring throughput are written to a JSON report that
+/api/stats/performance serves. The served snapshot (its MF factors, ranker
+and fold-in) is not what gets measured; the report says so in 'benchmark'.
+
+    python -m backend.evaluation --data ml-100k/u.data
+    python -m backend.evaluation --data ml-1m/ratings.dat --k 10 --workers 8
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+try:
+    from .batch import map_blocks, worker_state
+    from .mf import MFScorer
+except ImportError:  # running from inside backend/ (uvicorn main:app)
+    from batch import map_blocks, worker_state
+    from mf import MFScorer
+
+REPORT_FILE = "evaluation_report.json"
+
+# What the metrics describe, carried in the report and shown next to them
+BENCHMARK = "offline TruncatedSVD retrained on a held-out split; not the served model"
+
+DEFAULT_K = 10
+# Test ratings at or above this count as relevant
+RELEVANCE_THRESHOLD = 4.0
+# Users scored per task; bounds worker memory at chunk x n_items scores
+USER_CHUNK = 512
+# Rating rows parsed at a time when streaming a ratings file
+RATINGS_CHUNK = 1_000_000
+
+
+def iter_ratings(path: Path, chunk_size: int = RATINGS_CHUNK) -> Iterator[pd.DataFrame]:
+    """
+    MovieLens ratings in chunks of rows: ml-100k u.data (tab separated),
+    ml-1m ratings.dat (:: separated) or ml-20m/25m ratings.csv (with header)
+    """
+    path = Path(path)
+    with open(path) as f:
+        first = f.readline()
+    if "::" in first:
+        # Splitting on ':' keeps the C parser; every other column is empty
+        options = dict(sep=":", header=None, usecols=[0, 2, 4, 6])
+    elif "," in first:
+        options = dict(sep=",", header=None if first[:1].isdigit() else 0, usecols=[0, 1, 2, 3])
+    else:
+        options = dict(sep="\t", header=None, usecols=[0, 1, 2, 3])
+    for chunk in pd.read_csv(path, chunksize=chunk_size, **options):
+        chunk.columns = ["user_id", "item_id", "rating", "timestamp"]
+        yield chunk
+
+
+def load_ratings(path: Path) -> pd.DataFrame:
+    """All MovieLens ratings of a file (see iter_ratings for the formats)"""
+    return pd.concat(iter_ratings(path), ignore_index=True)
+
+
+def split_ratings(ratings: pd.DataFrame, test_size: float = 0.2, seed: int = 42):
+    """Random holdout split of individual ratings (like surprise's train_test_split)"""
+    rng = np.random.RandomState(seed)
+    test = rng.rand(len(ratings)) < test_size
+    return ratings[~test], ratings[test]
+
+
+def rating_matrix(ratings: pd.DataFrame, user_ids: np.ndarray, item_ids: np.ndarray) -> sparse.csr_matrix:
+    rows = np.searchsorted(user_ids, ratings['user_id'].to_numpy())
+    cols = np.searchsorted(item_ids, ratings['item_id'].to_numpy())
+    return sparse.csr_matrix(
+        (ratings['rating'].to_numpy(dtype=np.float32), (rows, cols)),
+        shape=(len(user_ids), len(item_ids)),
+    )
+
+
+def train_svd(train: sparse.csr_matrix, n_components: int = 50, seed: int = 42) -> MFScorer:
+    """TruncatedSVD on the train rating matrix, as an MFScorer over the train item order"""
+    from sklearn.decomposition import TruncatedSVD
+
+    svd = TruncatedSVD(n_components=min(n_components, min(train.shape) - 1), random_state=seed)
+    user_factors = svd.fit_transform(train).astype(np.float32)
+    scorer = MFScorer.from_model(svd, user_factors)
+    scorer.bind_catalog(range(1, train.shape[1] + 1))
+    return scorer
+
+
+def _evaluate_chunk(bounds) -> dict:
+    """Top-k for a block of users, excluding their train items, and the metric sums"""
+    start, stop = bounds
+    state = worker_state()
+    scorer, k = state['scorer'], state['k']
+    train, relevant = state['train'][start:stop], state['relevant'][start:stop]
+    n_items = train.shape[1]
+
+    began = time.perf_counter()
+    if scorer is not None:
+        scores = scorer.score_rows(np.arange(start, stop)).astype(np.float64)
+    else:
+        scores = np.broadcast_to(state['popularity'], (stop - start, n_items)).copy()
+    # Already-rated items are never recommended
+    scores[train.nonzero()] = -np.inf
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    scoring_seconds = time.perf_counter() - began
+
+    relevant_dense = relevant.toarray() > 0
+    n_relevant = relevant_dense.sum(axis=1)
+    hits = np.take_along_axis(relevant_dense, top, axis=1)
+    users = n_relevant > 0
+
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = hits @ discounts
+    ideal = np.cumsum(discounts)[np.minimum(n_relevant, k) - 1]
+
+    return {
+        'users': int(users.sum()),
+        'precision': float((hits.sum(axis=1)[users] / k).sum()),
+        'recall': float((hits.sum(axis=1)[users] / n_relevant[users]).sum()),
+        'ndcg': float((dcg[users] / ideal[users]).sum()),
+        'recommended': np.unique(top[users]),
+        'scored_users': stop - start,
+        'scoring_seconds': scoring_seconds,
+    }
+
+
+def evaluate_recommender(
+    scorer: Optional[MFScorer],
+    popularity: np.ndarray,
+    train: sparse.csr_matrix,
+    relevant: sparse.csr_matrix,
+    k: int = DEFAULT_K,
+    workers: int = 1,
+    chunk_size: int = USER_CHUNK,
+) -> dict:
+    """Aggregate metrics over all users with at least one relevant test item"""
+    n_users, n_items = train.shape
+    chunks = [(start, min(start + chunk_size, n_users)) for start in range(0, n_users, chunk_size)]
+
+    began = time.perf_counter()
+    state = {'scorer': scorer, 'popularity': popularity, 'train': train, 'relevant': relevant, 'k': k}
+    results = list(map_blocks(_evaluate_chunk, chunks, state, workers))
+    wall_seconds = time.perf_counter() - began
+
+    users = sum(r['users'] for r in results)
+    recommended = np.unique(np.concatenate([r['recommended'] for r in results]))
+    scoring_seconds = sum(r['scoring_seconds'] for r in results)
+    return {
+        f'precision@{k}': sum(r['precision'] for r in results) / max(users, 1),
+        f'recall@{k}': sum(r['recall'] for r in results) / max(users, 1),
+        f'ndcg@{k}': sum(r['ndcg'] for r in results) / max(users, 1),
+        'coverage': len(recommended) / n_items,
+        'evaluated_users': users,
+        'wall_seconds': round(wall_seconds, 3),
+        # Single-core scoring rate (score + top-k), independent of the pool size
+        'users_per_second': round(n_users / scoring_seconds, 1) if scoring_seconds > 0 else 0.0,
+        'scores_per_second': round(n_users * n_items / scoring_seconds, 1) if scoring_seconds > 0 else 0.0,
+    }
+
+
+def run_evaluation(
+    data_path: Path,
+    k: int = DEFAULT_K,
+    test_size: float = 0.2,
+    n_components: int = 50,
+    workers: Optional[int] = None,
+    seed: int = 42,
+) -> dict:
+    """Split, train a fresh SVD on the train part and evaluate it and popularity (the served models aren't used)"""
+    workers = workers or os.cpu_count() or 1
+    began = time.perf_counter()
+
+    ratings = load_ratings(data_path)
+    train_df, test_df = split_ratings(ratings, test_size, seed)
+
+    # Dense ids 1..n in sorted raw-id order, matching MFScorer.from_model's item ids
+    user_ids = np.unique(ratings['user_id'].to_numpy())
+    item_ids = np.unique(ratings['item_id'].to_numpy())
+    train = rating_matrix(train_df, user_ids, item_ids)
+    relevant = rating_matrix(test_df[test_df['rating'] >= RELEVANCE_THRESHOLD], user_ids, item_ids)
+
+    train_began = time.perf_counter()
+    scorer = train_svd(train, n_components, seed)
+    train_seconds = time.perf_counter() - train_began
+
+    popularity = np.asarray((train > 0).sum(axis=0), dtype=np.float64).ravel()
+
+    recommenders = {
+        'svd': evaluate_recommender(scorer, popularity, train, relevant, k, workers),
+        'popularity': evaluate_recommender(None, popularity, train, relevant, k, workers),
+    }
+    return {
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        'benchmark': BENCHMARK,
+        'components': scorer.n_factors,
+        'dataset': {
+            'path': str(data_path),
+            'ratings': len(ratings),
+            'users': len(user_ids),
+            'items': len(item_ids),
+            'test_size': test_size,
+            'relevance_threshold': RELEVANCE_THRESHOLD,
+            'seed': seed,
+        },
+        'k': k,
+        'workers': workers,
+        'train_seconds': round(train_seconds, 3),
+        'total_seconds': round(time.perf_counter() - began, 3),
+        'recommenders': recommenders,
+    }
+
+
+def load_report(models_dir: Path) -> Optional[dict]:
+    """The last evaluation report written next to the models, if any"""
+    path = Path(models_dir) / REPORT_FILE
+    if not path.exists():
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading {path}: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline evaluation on a MovieLens ratings file")
+    parser.add_argument("--data", type=Path, required=True, help="u.data (ml-100k), ratings.dat (ml-1m) or ratings.csv (ml-20m/25m)")
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--components", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--output", type=Path, default=Path(__file__).parent.parent / "models" / REPORT_FILE)
+    args = parser.parse_args()
+
+    report = run_evaluation(args.data, args.k, args.test_size, args.components, args.workers)
+    args.output.write_text(json.dumps(report, indent=2))
+    for name, metrics in report['recommenders'].items():
+        quality = "  ".join(
+            f"{metric} {value:.4f}" for metric, value in metrics.items() if '@' in metric or metric == 'coverage'
+        )
+        print(f"{name:<12} {quality}  {metrics['users_per_second']:.0f} users/s")
+    print(f"Wrote {args.output} in {report['total_seconds']:.1f}s")
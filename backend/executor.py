@@ -0,0 +1,163 @@
+"""
+Scoring Executor
+Runs CPU-bound request work off the asyncio event loop on a bounded thread
+pool (NumPy/SciPy release the GIL in the heavy kernels), so health checks
+and static files stay responsive while recommendations are computed. Work
+beyond the pool plus a bounded queue is rejected instead of piling up; a
+streamed response reserves its capacity before the first byte is sent.
+A slot is only freed once its work has finished in the pool, even when the
+request that started it was cancelled (client gone).
+
+There is no process pool mode: the work closes over the loaded model
+snapshot, which would have to be pickled to another process on every call.
+Run several uvicorn workers to use more cores.
+"""
+
+import asyncio
+import contextvars
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+try:
+    from .metrics import follow_in_current_thread
+except ImportError:  # running from inside backend/ (uvicorn main:app)
+    from metrics import follow_in_current_thread
+
+EXECUTOR_MODES = ('thread', 'inline')
+
+
+class Saturated(Exception):
+    """Raised when every worker is busy and the queue is full"""
+
+
+class Reservation:
+    """One unit of executor capacity held across several calls, e.g. for a streamed response"""
+
+    def __init__(self, executor: "ScoringExecutor", active: bool):
+        self.executor = executor
+        self.active = active
+        self._pending: Optional[Future] = None
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Call fn(*args) in the pool without another capacity check"""
+        if self.executor._pool is None:
+            return fn(*args)
+        self._pending = self.executor._submit(fn, *args)
+        return await asyncio.wrap_future(self._pending)
+
+    def release(self) -> None:
+        """Give the capacity back once the last call has finished; safe to call more than once"""
+        if not self.active:
+            return
+        self.active = False
+        if self._pending is not None and not self._pending.done():
+            self.executor._release_when_done(self._pending)
+        else:
+            self.executor._release()
+
+
+class ScoringExecutor:
+    """
+    'thread' runs calls on max_workers threads with at most max_queue more
+    waiting; 'inline' runs them on the event loop (the old behaviour).
+    """
+
+    def __init__(self, mode: str = 'thread', max_workers: int = 4, max_queue: int = 64):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode {mode!r}, expected one of {EXECUTOR_MODES}")
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="scoring") if mode == 'thread' else None
+        # Only touched from the event loop thread, so no lock is needed
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.calls = 0
+        self.queue_wait_ms = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _acquire(self) -> None:
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise Saturated()
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self.completed += 1
+
+    @staticmethod
+    def _on_loop(loop: asyncio.AbstractEventLoop, fn: Callable[..., Any], *args) -> None:
+        """Schedule fn(*args) on the event loop from any thread"""
+        try:
+            loop.call_soon_threadsafe(fn, *args)
+        except RuntimeError:
+            # The loop is closed (shutdown); nothing is left to account for
+            pass
+
+    def _release_when_done(self, future: Future) -> None:
+        """Free the slot once future has run, or was cancelled before it started"""
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: self._on_loop(loop, self._release))
+
+    def _record_wait(self, seconds: float) -> None:
+        self.calls += 1
+        self.queue_wait_ms += seconds * 1000
+
+    def _submit(self, fn: Callable[..., Any], *args) -> Future:
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        # Carry the request context (stage timer, profiler) into the worker thread
+        context = contextvars.copy_context()
+
+        def call():
+            self._on_loop(loop, self._record_wait, time.perf_counter() - submitted)
+            with follow_in_current_thread():
+                return fn(*args)
+
+        return self._pool.submit(context.run, call)
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Call fn(*args) in the pool; raises Saturated when over capacity"""
+        if self._pool is None:
+            return fn(*args)
+        self._acquire()
+        try:
+            future = self._submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Not released when this coroutine ends: a cancelled request's work keeps running and keeps its slot
+        self._release_when_done(future)
+        return await asyncio.wrap_future(future)
+
+    def reserve(self) -> Reservation:
+        """Hold capacity for a series of calls; raises Saturated when over capacity"""
+        if self._pool is None:
+            return Reservation(self, active=False)
+        self._acquire()
+        return Reservation(self, active=True)
+
+    def stats(self) -> dict:
+        return {
+            'mode': self.mode,
+            'workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'in_flight': self.in_flight,
+            'queued': max(0, self.in_flight - self.max_workers),
+            'peak_in_flight': self.peak_in_flight,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'mean_queue_wait_ms': round(self.queue_wait_ms / self.calls, 3) if self.calls else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,136 @@
+"""
+Online SVD Fold-In
+Ratings that arrive between offline retrains are folded into per-user
+factor vectors against the fixed item factors of the base model (a small
+ridge regression per user). The resulting delta layer is consulted before
+the base model, so new users and fresh ratings are personalised at once.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Ridge strength pulling a user's factors towards their base-model factors (or zero)
+FOLD_IN_REGULARIZATION = 0.1
+# Users kept in the delta layer; the least recently updated are dropped first
+FOLD_IN_MAX_USERS = 100_000
+
+
+class FoldInLayer:
+    """
+    Per-user factors solved from the ratings received online. Biased models
+    (Surprise SVD) fit the observed ratings' residuals, user bias included.
+    Unbiased ones (TruncatedSVD on the zero-filled rating matrix) were
+    trained with unrated items as zeros, so the fit is over every item of
+    the model: the Gram matrix of all model item factors is shared and only
+    the observed ratings enter the right-hand side.
+    """
+
+    def __init__(self, scorer, regularization: float = FOLD_IN_REGULARIZATION, max_users: int = FOLD_IN_MAX_USERS):
+        self.scorer = scorer
+        self.regularization = regularization
+        self.max_users = max_users
+        self.factors = scorer.catalog_factors
+        self.known_items = scorer.catalog_rows >= 0
+        self.explicit = scorer.has_biases
+        if not self.explicit:
+            # The model's whole item space, not just the items the catalog shows
+            gram = np.asarray(scorer.item_factors.T @ scorer.item_factors, dtype=np.float64)
+            self._inverse = np.linalg.inv(gram + regularization * np.eye(scorer.n_factors))
+        self._ratings: "OrderedDict[str, Dict[int, float]]" = OrderedDict()
+        self._users: Dict[str, Tuple[np.ndarray, float]] = {}
+        self._revisions: Dict[str, int] = {}
+        self._sequence = 0
+        # Users dropped to stay within max_users; their ratings wait for the next retrain
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def knows(self, user_id: str) -> bool:
+        return str(user_id) in self._users
+
+    def revision(self, user_id: str) -> int:
+        """Changes on every update of a user (0 when not in the layer); part of their cache keys"""
+        return self._revisions.get(str(user_id), 0)
+
+    def _base(self, user_id: str) -> Tuple[np.ndarray, float]:
+        """Base-model factors and bias of a user (zeros for new users)"""
+        scorer = self.scorer
+        inner = scorer.user_index.get(user_id) if scorer.user_factors is not None else None
+        factors = np.zeros(scorer.n_factors) if inner is None else np.asarray(scorer.user_factors[inner], dtype=np.float64)
+        bias = float(scorer.user_bias[inner]) if inner is not None and scorer.user_bias is not None else 0.0
+        return factors, bias
+
+    def _solve(self, user_id: str, ratings: Dict[int, float]) -> Tuple[np.ndarray, float]:
+        base_factors, base_bias = self._base(user_id)
+        rows = np.fromiter(ratings.keys(), dtype=np.int64, count=len(ratings))
+        values = np.fromiter(ratings.values(), dtype=np.float64, count=len(ratings))
+        Q = np.asarray(self.factors[rows], dtype=np.float64)
+        lam = self.regularization
+
+        if not self.explicit:
+            # Zero-filled training matrix: the new ratings shift the base projection. The base
+            # factors already contain the training row; their rank-k reconstruction stands in for
+            # each rated item's training value (about 0 if unrated), so a re-rating replaces it
+            previous = Q @ base_factors
+            return base_factors + self._inverse @ (Q.T @ (values - previous)), base_bias
+
+        # Residual ridge over [factors, bias], pulled towards the base values
+        residual = values - self.scorer.global_mean - self.scorer.catalog_bias[rows]
+        X = np.hstack([Q, np.ones((len(rows), 1))])
+        prior = np.append(base_factors, base_bias)
+        solution = np.linalg.solve(X.T @ X + lam * np.eye(X.shape[1]), X.T @ residual + lam * prior)
+        return solution[:-1], float(solution[-1])
+
+    def add_ratings(self, user_id: str, ratings: Iterable[Tuple[int, float]]) -> int:
+        """Fold catalog-row ratings into a user; returns how many the model could use"""
+        user_id = str(user_id)
+        usable = [(int(row), float(value)) for row, value in ratings if self.known_items[row]]
+        if not usable:
+            return 0
+        with self._lock:
+            merged = dict(self._ratings.pop(user_id, {}))
+            merged.update(usable)
+            self._ratings[user_id] = merged
+            self._users[user_id] = self._solve(user_id, merged)
+            self._sequence += 1
+            self._revisions[user_id] = self._sequence
+            while len(self._ratings) > self.max_users:
+                evicted, _ = self._ratings.popitem(last=False)
+                self._users.pop(evicted, None)
+                self._revisions.pop(evicted, None)
+                self.evicted += 1
+                if self.evicted == 1:
+                    print(f"Fold-in layer full ({self.max_users} users): dropping the least recently updated; "
+                          f"see 'evicted' in /api/admin/models")
+        return len(usable)
+
+    def score_catalog(self, user_id: str) -> Optional[np.ndarray]:
+        """Scores for every catalog item from the folded-in factors, None if not in the layer"""
+        entry = self._users.get(str(user_id))
+        if entry is None:
+            return None
+        factors, bias = entry
+        scorer = self.scorer
+        est = scorer.global_mean + scorer.catalog_bias + bias + self.factors @ factors
+        low, high = scorer.rating_scale
+        return np.clip(est, low, high) / high
+
+    def export(self) -> List[Tuple[str, Dict[int, float]]]:
+        """Ratings (by catalog row) held per user, oldest update first, to replay after a reload"""
+        with self._lock:
+            return [(user_id, dict(ratings)) for user_id, ratings in self._ratings.items()]
+
+    def stats(self) -> dict:
+        return {
+            'users': len(self._users),
+            'ratings': sum(len(r) for r in self._ratings.values()),
+            'max_users': self.max_users,
+            'evicted': self.evicted,
+            'mode': 'explicit' if self.explicit else 'zero-filled',
+            'regularization': self.regularization,
+        }
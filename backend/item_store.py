@@ -0,0 +1,217 @@
+"""
+Columnar Item Store
+Immutable, array-backed view of the item catalog built once at load time,
+so endpoints filter and score on NumPy columns instead of DataFrame rows
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+try:
+    from .search_index import PostingIndex, intersect_rows, tokenize, unique_rows
+    from .serialization import dumps
+except ImportError:  # running from inside backend/ (uvicorn main:app)
+    from search_index import PostingIndex, intersect_rows, tokenize, unique_rows
+    from serialization import dumps
+
+DEFAULT_IMAGE_URL = "https://images.unsplash.com/photo-1489599849927-2ee91cede3ba?w=400&h=600&fit=crop"
+
+# Recency feature: linear decay over 50 years from this reference year
+RECENCY_REFERENCE_YEAR = 2024
+RECENCY_SPAN_YEARS = 50.0
+
+
+# Bytes -> set bits, for popcount on NumPy versions without np.bitwise_count
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount64(values: np.ndarray) -> np.ndarray:
+    """Number of set bits in each element of a uint64 array"""
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values).astype(np.int64)
+    return _POPCOUNT_TABLE[values.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.int64)
+
+
+def _bitmask(cols: np.ndarray) -> np.uint64:
+    """Fold genre column ids into a single uint64 bitmask"""
+    return np.bitwise_or.reduce(np.left_shift(np.uint64(1), cols.astype(np.uint64)), initial=np.uint64(0))
+
+
+def _column(df: pd.DataFrame, name: str, default) -> pd.Series:
+    if name in df.columns:
+        return df[name].fillna(default)
+    return pd.Series([default] * len(df), index=df.index)
+
+
+class ItemStore:
+    """Catalog columns, genre multi-hot matrix and pre-built item payloads"""
+
+    def __init__(self, metadata: pd.DataFrame):
+        self.size = len(metadata)
+
+        self.ids: List[str] = [str(i) for i in metadata['id']]
+        self.id_to_row: Dict[str, int] = {item_id: row for row, item_id in enumerate(self.ids)}
+
+        self.titles: List[str] = [str(t) for t in _column(metadata, 'title', '')]
+        self.descriptions: List[str] = [str(d) for d in _column(metadata, 'description', '')]
+        self.categories: List[str] = [str(c) for c in _column(metadata, 'category', 'Movie')]
+        self.genres: List[List[str]] = [
+            g.split('|') if isinstance(g, str) and g else [] for g in metadata['genres']
+        ]
+
+        self.years = np.ascontiguousarray(metadata['year'].to_numpy(dtype=np.int64))
+        self.popularity = np.ascontiguousarray(_column(metadata, 'popularity', 50).to_numpy(dtype=np.float64))
+
+        # Derived ranking features, identical for every request
+        self.popularity_norm = self.popularity / 100.0
+        self.recency = np.maximum(0.0, 1 - (RECENCY_REFERENCE_YEAR - self.years) / RECENCY_SPAN_YEARS)
+
+        # Inverted indexes for the /api/items filters
+        self.text_index = PostingIndex(
+            (tokenize(f"{t} {d}") for t, d in zip(self.titles, self.descriptions)), self.size
+        )
+        self.category_index = PostingIndex(([c.lower()] for c in self.categories), self.size)
+
+        # Genre vocabulary and CSR multi-hot matrix (items x genres)
+        self.genre_names: List[str] = sorted({g for genres in self.genres for g in genres})
+        self.genre_index: Dict[str, int] = {g: i for i, g in enumerate(self.genre_names)}
+        indptr = np.zeros(self.size + 1, dtype=np.int64)
+        indices = []
+        for row, genres in enumerate(self.genres):
+            cols = sorted({self.genre_index[g] for g in genres})
+            indices.extend(cols)
+            indptr[row + 1] = len(indices)
+        self.genre_matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), np.array(indices, dtype=np.int64), indptr),
+            shape=(self.size, len(self.genre_names)),
+        )
+        self.genre_counts = np.diff(indptr)
+        # Column-major copy: each genre's sorted item rows are one slice (its posting list)
+        self.genre_postings = self.genre_matrix.tocsc()
+        self.genre_postings.sort_indices()
+
+        # One uint64 bitmask per item when the vocabulary fits in 64 genres;
+        # larger vocabularies fall back to sparse matrix products
+        self.genre_bits = None
+        if len(self.genre_names) <= 64:
+            bits = np.zeros(self.size, dtype=np.uint64)
+            rows = np.repeat(np.arange(self.size), self.genre_counts)
+            np.bitwise_or.at(bits, rows, np.left_shift(np.uint64(1), np.array(indices, dtype=np.uint64)))
+            self.genre_bits = bits
+
+        # Pre-sorted orders for the /api/items sort options
+        self.sort_orders: Dict[str, np.ndarray] = {
+            'popularity': np.argsort(-self.popularity, kind='stable'),
+            'year': np.argsort(-self.years, kind='stable'),
+            'title': np.argsort(np.array(self.titles, dtype=object), kind='stable'),
+        }
+        # Position of each row in every order, to sort filtered subsets without a full scan
+        self.sort_ranks: Dict[str, np.ndarray] = {}
+        for name, order in self.sort_orders.items():
+            ranks = np.empty(self.size, dtype=np.int64)
+            ranks[order] = np.arange(self.size)
+            self.sort_ranks[name] = ranks
+
+        # Serialized item payloads and their JSON (rendered once, spliced into responses)
+        self.payloads: List[dict] = [self._payload(row) for row in range(self.size)]
+        self.payload_json: List[bytes] = [dumps(payload) for payload in self.payloads]
+
+    def _payload(self, row: int) -> dict:
+        return {
+            'id': self.ids[row],
+            'title': self.titles[row],
+            'year': int(self.years[row]),
+            'category': self.categories[row],
+            'genres': list(self.genres[row]),
+            'description': self.descriptions[row],
+            'popularity': float(self.popularity[row]),
+            'imageUrl': DEFAULT_IMAGE_URL,
+        }
+
+    def row_of(self, item_id: str) -> Optional[int]:
+        return self.id_to_row.get(str(item_id))
+
+    def genre_columns(self, query: str) -> np.ndarray:
+        """Genre columns whose name contains query (case-insensitive)"""
+        query = query.lower()
+        return np.array([i for i, g in enumerate(self.genre_names) if query in g.lower()], dtype=np.int64)
+
+    def genre_query(self, genres: Iterable[str]) -> np.ndarray:
+        """Genre column ids of the known genres in a query"""
+        return np.array(sorted({self.genre_index[g] for g in genres if g in self.genre_index}), dtype=np.int64)
+
+    def genre_overlap(self, genres: Iterable[str]) -> np.ndarray:
+        """Number of query genres each item has, for the whole catalog"""
+        cols = self.genre_query(genres)
+        if self.genre_bits is not None:
+            query = _bitmask(cols)
+            return popcount64(self.genre_bits & query)
+        query = np.zeros(len(self.genre_names), dtype=np.float32)
+        query[cols] = 1
+        return (self.genre_matrix @ query).astype(np.int64)
+
+    def genre_jaccard(self, row: int) -> np.ndarray:
+        """Jaccard genre similarity between one item and every item"""
+        if self.genre_bits is not None:
+            target = self.genre_bits[row]
+            inter = popcount64(self.genre_bits & target)
+            union = popcount64(self.genre_bits | target)
+        else:
+            inter = (self.genre_matrix @ self.genre_matrix[row].T).toarray().ravel().astype(np.int64)
+            union = self.genre_counts + self.genre_counts[row] - inter
+        return inter / np.maximum(union, 1)
+
+    def genre_rows(self, genre: str) -> np.ndarray:
+        """Sorted rows of items with any genre matching query (substring, case-insensitive)"""
+        postings = self.genre_postings
+        spans = [postings.indices[postings.indptr[c]:postings.indptr[c + 1]] for c in self.genre_columns(genre)]
+        if not spans:
+            return np.empty(0, dtype=np.int32)
+        return spans[0] if len(spans) == 1 else unique_rows(np.concatenate(spans), self.size)
+
+    def select_rows(
+        self,
+        category: Optional[str] = None,
+        genre: Optional[str] = None,
+        search: Optional[str] = None,
+        sort_by: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        Rows for the /api/items filters: intersect posting lists, then order
+        only the matches by their rank in the pre-sorted order. Search matches
+        every query token as a prefix of a title/description word. after is
+        the last row of the previous page (keyset pagination): only rows
+        ordered behind it are returned.
+        """
+        postings = []
+        if category:
+            postings.append(self.category_index.lookup(category.lower()))
+        if genre:
+            postings.append(self.genre_rows(genre))
+        if search:
+            matched = self.text_index.search(search)
+            postings.append(matched if matched is not None else np.empty(0, dtype=np.int32))
+
+        ranks = self.sort_ranks.get(sort_by) if sort_by else None
+        # Position in the chosen order (catalog order when unsorted) to resume from
+        start = 0 if after is None else int(ranks[after] if ranks is not None else after) + 1
+        if not postings:
+            rows = self.sort_orders[sort_by] if ranks is not None else np.arange(self.size)
+            return rows[start:start + limit if limit is not None else None]
+
+        rows = intersect_rows(postings)
+        if start:
+            rows = rows[(ranks[rows] if ranks is not None else rows) >= start]
+        if ranks is not None:
+            row_ranks = ranks[rows]
+            if limit is not None and len(rows) > limit:
+                keep = np.argpartition(row_ranks, limit - 1)[:limit]
+                rows, row_ranks = rows[keep], row_ranks[keep]
+            rows = rows[np.argsort(row_ranks)]
+        return rows[:limit]
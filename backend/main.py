@@ -3,19 +3,63 @@ Intelligent Recommendation Engine - FastAPI Backend
 Loads all ML models and serves recommendations via REST API
 """
 
+import asyncio
+import base64
 import os
 import pickle
-from typing import List, Optional
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
-from sklearn.metrics.pairwise import cosine_similarity
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+
+try:
+    from .ann import IVFIndex, top_k_indices
+    from .artifacts import ARTIFACTS_DIRNAME, ArtifactStore
+    from .batch import iter_batch_top_k
+    from .cache import LRUCache, ResultCache
+    from .content import ContentEngine
+    from .demographics import AFFINITY_FILE, USERS_FILE, DemographicAffinity
+    from .embeddings import EmbeddingScorer
+    from .evaluation import BENCHMARK, load_report
+    from .executor import Reservation, Saturated, ScoringExecutor
+    from .foldin import FoldInLayer
+    from .item_store import ItemStore
+    from .metrics import LatencyMiddleware, RequestMetrics, SlowRequestProfiler, stage_timer
+    from .mf import MF_MODEL_FILE, MFScorer
+    from .neighbours import NeighbourTable
+    from .pipeline import CandidateGenerator, parse_budgets
+    from .ranking import DEFAULT_FEATURE_VALUE, make_ranker
+    from .serialization import FastJSONResponse, RawJSONResponse, dumps, json_array
+    from .user_topn import UserTopN
+except ImportError:  # running from inside backend/ (uvicorn main:app)
+    from ann import IVFIndex, top_k_indices
+    from artifacts import ARTIFACTS_DIRNAME, ArtifactStore
+    from batch import iter_batch_top_k
+    from cache import LRUCache, ResultCache
+    from content import ContentEngine
+    from demographics import AFFINITY_FILE, USERS_FILE, DemographicAffinity
+    from embeddings import EmbeddingScorer
+    from evaluation import BENCHMARK, load_report
+    from executor import Reservation, Saturated, ScoringExecutor
+    from foldin import FoldInLayer
+    from item_store import ItemStore
+    from metrics import LatencyMiddleware, RequestMetrics, SlowRequestProfiler, stage_timer
+    from mf import MF_MODEL_FILE, MFScorer
+    from neighbours import NeighbourTable
+    from pipeline import CandidateGenerator, parse_budgets
+    from ranking import DEFAULT_FEATURE_VALUE, make_ranker
+    from serialization import FastJSONResponse, RawJSONResponse, dumps, json_array
+    from user_topn import UserTopN
 
 # ============= Pydantic Models =============
 
@@ -55,31 +99,162 @@ class ColdStartRequest(BaseModel):
     occupation: str
     interests: List[str]
 
+class RatingIn(BaseModel):
+    itemId: str
+    rating: float
+
+class RatingsRequest(BaseModel):
+    userId: str
+    ratings: List[RatingIn] = Field(..., min_length=1, max_length=1000)
+
+class BatchRequest(BaseModel):
+    userIds: List[str]
+    limit: int = Field(10, ge=1, le=50)
+    includeItems: bool = False
+    # Send one NDJSON line per user as each block of users is scored
+    stream: bool = False
+
+class BatchItem(BaseModel):
+    id: str
+    score: float
+    item: Optional[Item] = None
+
+class BatchRecommendation(BaseModel):
+    userId: str
+    source: str  # 'svd' or 'trending'
+    items: List[BatchItem]
+
+class BatchResponse(BaseModel):
+    results: List[BatchRecommendation]
+
+class LatencySummary(BaseModel):
+    count: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+class RouteLatency(LatencySummary):
+    requests_per_second: float
+    stages: Dict[str, LatencySummary] = {}
+
+class EvaluationSummary(BaseModel):
+    # The metrics come from a separately trained SVD, not from the served snapshot
+    benchmark: str
+    k: int
+    dataset: Dict[str, Union[str, int, float]]
+    created_at: str
+    users_per_second: float
+    baseline: Dict[str, float] = {}
+
 class PerformanceStats(BaseModel):
-    precision: float
-    recall: float
-    ndcg: float
-    coverage: float
+    # Offline SVD benchmark from models/evaluation_report.json (None until it exists; none ships)
+    precision: Optional[float] = None
+    recall: Optional[float] = None
+    ndcg: Optional[float] = None
+    coverage: Optional[float] = None
+    evaluation: Optional[EvaluationSummary] = None
     latency_ms: float
+    latency_p95_ms: float = 0.0
+    latency_p99_ms: float = 0.0
+    requests_per_second: float = 0.0
+    total_requests: int = 0
+    routes: Dict[str, RouteLatency] = {}
 
 # ============= Model Loading =============
 
-# Path to models folder (one level up from backend folder)
-MODELS_DIR = Path(__file__).parent.parent / "models"
+# Path to models folder (one level up from backend folder, override with MODELS_DIR)
+MODELS_DIR = Path(os.getenv("MODELS_DIR", Path(__file__).parent.parent / "models"))
 
-class ModelManager:
-    """Loads and manages all ML models"""
+# Check artifact checksums against the manifest at load time (reads every file)
+VERIFY_ARTIFACTS = os.getenv("VERIFY_ARTIFACTS", "0") == "1"
+
+# Similar-item retrieval: IVF clusters scanned per query, and candidates re-scored
+ANN_N_PROBE = int(os.getenv("ANN_N_PROBE", "8"))
+SIMILAR_CANDIDATES = int(os.getenv("SIMILAR_CANDIDATES", "100"))
+
+# User recommendations: candidates per retrieval source, e.g. "mf=200,popularity=100"
+CANDIDATE_BUDGETS = parse_budgets(os.getenv("CANDIDATE_BUDGETS", ""))
+
+# Placeholder scores for missing models: truly random when enabled, otherwise
+# stable per user/item so identical requests give identical results
+RANDOM_FALLBACKS = os.getenv("RANDOM_FALLBACKS", "0") == "1"
+
+# Result cache for recommendation/item endpoints (only with deterministic scoring)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "2048"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "300"))
+
+# Per-user embedding score vectors kept in memory
+USER_SCORE_CACHE_SIZE = int(os.getenv("USER_SCORE_CACHE_SIZE", "1024"))
+
+# /api/items page size: default and maximum (NDJSON exports are unbounded)
+ITEMS_PAGE_SIZE = 50
+ITEMS_PAGE_MAX = 1000
+# Items rendered per executor call while streaming NDJSON
+NDJSON_CHUNK = 1000
+
+# Most user ids accepted by one /api/recommend/batch request
+BATCH_MAX_USERS = int(os.getenv("BATCH_MAX_USERS", "10000"))
+
+# Top-scored items whose TF-IDF centroid forms a user's content profile
+CONTENT_PROFILE_ITEMS = int(os.getenv("CONTENT_PROFILE_ITEMS", "5"))
+
+# Poll models/ for changed files and hot-reload (seconds, 0 disables)
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+
+# Required in the X-Admin-Token header for admin endpoints when set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Where CPU-bound scoring runs: "thread" (bounded pool off the event loop) or
+# "inline" (on the event loop). Beyond workers + queue, requests get a 503.
+SCORING_EXECUTOR = os.getenv("SCORING_EXECUTOR", "thread")
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", str(min(4, os.cpu_count() or 1))))
+SCORING_QUEUE = int(os.getenv("SCORING_QUEUE", "64"))
+
+# Keep stack samples of requests slower than this (ms, 0 disables the profiler)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class ModelSnapshot:
+    """
+    One fully loaded set of models and derived indexes. A request reads a
+    single snapshot from start to finish; reloads build a new one and swap it in.
+    """
     
     def __init__(self):
+        self.version = None
+        self.loaded_at = None
         self.svd_model = None
         self.tfidf_vectorizer = None
         self.item_embeddings = None
         self.user_embeddings = None
         self.gender_encoder = None
         self.occupation_encoder = None
+        self.demographics = None
         self.ranking_model = None
         self.items_metadata = None
-        self.loaded = False
+        self.artifacts = None
+        self.tfidf_matrix = None
+        self.content = None
+        self.embedding_scorer = None
+        self.item_store = None
+        self.mf_scorer = None
+        self.fold_in = None
+        self.ann_index = None
+        self.neighbour_table = None
+        self.user_topn = None
+        self.ranker = None
+        self.evaluation = None
     
     def load_pickle(self, filename: str):
         """Load a pickle file from models directory"""
@@ -88,24 +263,47 @@ class ModelManager:
             try:
                 with open(filepath, 'rb') as f:
                     return pickle.load(f)
+            except Exception:
+                pass
+            try:
+                # Notebook artifacts are written with joblib.dump
+                import joblib
+                return joblib.load(filepath)
             except Exception as e:
                 print(f"Error loading {filename}: {e}")
                 return None
         print(f"Warning: {filename} not found at {filepath}")
         return None
     
-    def load_all(self):
-        """Load all models at startup"""
+    def load_all(self, sequence: int = 1):
+        """Load all models and build every derived index"""
         print(f"Loading models from: {MODELS_DIR}")
         
-        # Load pickle models
-        self.svd_model = self.load_pickle("svd_sklearn.pkl")
-        self.tfidf_vectorizer = self.load_pickle("tfidf_vectorizer.pkl")
-        self.item_embeddings = self.load_pickle("item_embeddings.pkl")
-        self.user_embeddings = self.load_pickle("user_embeddings.pkl")
-        self.gender_encoder = self.load_pickle("gender_encoder.pkl")
-        self.occupation_encoder = self.load_pickle("occupation_encoder.pkl")
-        self.ranking_model = self.load_pickle("ranking_model.pkl")
+        # Prefer memory-mapped artifacts; fall back to the pickles
+        self.artifacts = ArtifactStore.open(MODELS_DIR / ARTIFACTS_DIRNAME)
+        if self.artifacts is not None and VERIFY_ARTIFACTS:
+            mismatched = self.artifacts.verify()
+            if mismatched:
+                print(f"Warning: artifact checksum mismatch for {mismatched}, loading pickles instead")
+                self.artifacts = None
+        
+        if self.artifacts is not None:
+            print(f"Loading artifacts version {self.artifacts.version} (memory-mapped)")
+            self.item_embeddings = self.artifacts.array("item_embeddings")
+            self.user_embeddings = self.artifacts.array("user_embeddings")
+            self.gender_encoder = self.artifacts.label_encoder("gender")
+            self.occupation_encoder = self.artifacts.label_encoder("occupation")
+            self.tfidf_matrix = self.artifacts.csr("tfidf_matrix")
+            self.tfidf_vectorizer = self.artifacts.tfidf_vectorizer()
+        else:
+            # Load pickle models
+            self.svd_model = self.load_pickle("svd_sklearn.pkl")
+            self.tfidf_vectorizer = self.load_pickle("tfidf_vectorizer.pkl")
+            self.item_embeddings = self.load_pickle("item_embeddings.pkl")
+            self.user_embeddings = self.load_pickle("user_embeddings.pkl")
+            self.gender_encoder = self.load_pickle("gender_encoder.pkl")
+            self.occupation_encoder = self.load_pickle("occupation_encoder.pkl")
+            self.ranking_model = self.load_pickle("ranking_model.pkl")
         
         # Load CSV metadata
         csv_path = MODELS_DIR / "items_metadata.csv"
@@ -117,8 +315,122 @@ class ModelManager:
             # Create mock data if file doesn't exist
             self.items_metadata = self._create_mock_metadata()
         
-        self.loaded = True
-        print("All models loaded successfully!")
+        # Columnar item store: arrays, genre matrix and pre-rendered item JSON
+        self.item_store = ItemStore(self.items_metadata)
+        
+        # Normalised TF-IDF rows for content similarity
+        tfidf_rows = self._tfidf_rows()
+        if tfidf_rows is not None:
+            self.content = ContentEngine(tfidf_rows, self.tfidf_vectorizer)
+            print(f"Content engine ready: {tfidf_rows.shape[0]} items x {tfidf_rows.shape[1]} terms")
+        
+        # Normalised user/item embeddings for user-item cosine similarity
+        self.embedding_scorer = EmbeddingScorer.create(
+            self.user_embeddings, self.item_embeddings, self.item_store.size, cache_size=USER_SCORE_CACHE_SIZE
+        )
+        if self.embedding_scorer is not None:
+            print(f"Embedding scorer ready: {len(self.embedding_scorer.users)} users x {self.item_store.size} items")
+        
+        # Extract SVD factors once so users are scored against the whole catalog
+        if self.artifacts is not None:
+            self.mf_scorer = self.artifacts.mf_scorer()
+        else:
+            self.mf_scorer = MFScorer.load(MODELS_DIR / MF_MODEL_FILE) or MFScorer.from_model(
+                self.svd_model, self.user_embeddings
+            )
+        if self.mf_scorer is not None:
+            self.mf_scorer.bind_catalog(self.items_metadata['id'])
+            print(f"MF scorer ready: {len(self.mf_scorer.item_index)} items, "
+                  f"{len(self.mf_scorer.user_index)} users, {self.mf_scorer.n_factors} factors")
+            # Ratings received online are folded in against these item factors
+            self.fold_in = FoldInLayer(self.mf_scorer)
+        
+        # Compiled encoders, the (gender x occupation x item) affinity table and the users' labels
+        user_labels = None
+        if self.artifacts is not None:
+            affinity_table = self.artifacts.array("demographic_affinity")
+            if self.artifacts.has("demographic_user_ids"):
+                user_labels = {name: self.artifacts.array(f"demographic_{name}")
+                               for name in ('user_ids', 'genders', 'occupations')}
+        else:
+            affinity_path = MODELS_DIR / AFFINITY_FILE
+            affinity_table = np.load(affinity_path, mmap_mode='r') if affinity_path.exists() else None
+            users_path = MODELS_DIR / USERS_FILE
+            if users_path.exists():
+                with np.load(users_path) as users:
+                    user_labels = dict(users)
+        self.demographics = DemographicAffinity.create(
+            self.gender_encoder, self.occupation_encoder, affinity_table, self.item_store.ids, user_labels
+        )
+        print(f"Demographic affinity ready ({'learned' if self.demographics.learned else 'synthetic'})")
+        
+        # Batched ranking stage (coefficients extracted for linear models)
+        self.ranker = (self.artifacts.ranker() if self.artifacts is not None else None) or make_ranker(self.ranking_model)
+        print(f"Ranking stage: {self.ranker.name}")
+        
+        # Offline tables are ignored unless built for these artifacts and this catalog
+        artifacts_version = self.artifacts.version if self.artifacts is not None else None
+        
+        # Offline neighbour table, memory-mapped; falls back to the ANN index
+        self.neighbour_table = NeighbourTable.load(MODELS_DIR, self.item_store.ids, artifacts_version)
+        if self.neighbour_table is not None:
+            print(f"Neighbour table ready: {self.item_store.size} items x {self.neighbour_table.k} neighbours")
+        
+        # Offline top-N per user (precompute_recommendations.py), memory-mapped
+        self.user_topn = UserTopN.load(MODELS_DIR, self.item_store.ids, artifacts_version)
+        if self.user_topn is not None:
+            print(f"User top-N table ready: {len(self.user_topn.user_index)} users x {self.user_topn.n} items")
+        
+        # Nearest-neighbour index for similar-item lookups
+        vectors = self._item_vectors()
+        if vectors is not None:
+            self.ann_index = IVFIndex(vectors, n_probe=ANN_N_PROBE)
+            mode = "exact" if self.ann_index.exact else f"IVF, {len(self.ann_index.centroids)} lists"
+            print(f"ANN index ready: {self.ann_index.size} items ({mode})")
+        
+        # Offline metrics written by `python -m backend.evaluation`
+        self.evaluation = load_report(MODELS_DIR)
+        
+        # Reloading the same artifacts still yields a distinct version
+        source = self.artifacts.version if self.artifacts is not None else "pickle"
+        self.version = f"{sequence}-{source}"
+        self.loaded_at = time.time()
+        print(f"All models loaded successfully! (version {self.version})")
+    
+    def warm(self):
+        """Run every serving path once so the first request doesn't page in models"""
+        store = self.item_store
+        if store is None or store.size == 0:
+            return
+        if self.mf_scorer is not None:
+            self.mf_scorer.score_catalog(next(iter(self.mf_scorer.user_index), ""))
+        if self.neighbour_table is not None:
+            self.neighbour_table.neighbours(0)
+        if self.ann_index is not None:
+            self.ann_index.search_item(0, 10)
+        self.ranker.score({'popularity': store.popularity_norm}, store.size)
+    
+    def _tfidf_rows(self):
+        """Sparse TF-IDF rows aligned with metadata rows, if available"""
+        n_items = len(self.items_metadata)
+        if self.tfidf_matrix is not None and self.tfidf_matrix.shape[0] == n_items:
+            return self.tfidf_matrix
+        if self.tfidf_vectorizer is not None:
+            try:
+                text = self.items_metadata['title'].fillna('') + " " + self.items_metadata['genres'].fillna('')
+                return self.tfidf_vectorizer.transform(text)
+            except Exception as e:
+                print(f"Error building TF-IDF item vectors: {e}")
+        return None
+    
+    def _item_vectors(self) -> Optional[np.ndarray]:
+        """Item vectors aligned with metadata rows: embeddings, else TF-IDF"""
+        n_items = len(self.items_metadata)
+        if self.item_embeddings is not None and len(self.item_embeddings) == n_items:
+            return np.asarray(self.item_embeddings)
+        if self.content is not None:
+            return self.content.matrix.toarray()
+        return None
     
     def _create_mock_metadata(self) -> pd.DataFrame:
         """Create mock metadata for testing"""
@@ -151,6 +463,145 @@ class ModelManager:
             'popularity': [92, 88, 85, 95, 94, 93, 97, 91]
         })
 
+class ModelManager:
+    """Holds the current ModelSnapshot and swaps in new ones without downtime"""
+    
+    def __init__(self):
+        self.snapshot: Optional[ModelSnapshot] = None
+        self.candidate_generator = CandidateGenerator(CANDIDATE_BUDGETS)
+        self.result_cache = ResultCache(
+            LRUCache(max_size=RESULT_CACHE_SIZE, ttl_seconds=RESULT_CACHE_TTL),
+            enabled=RESULT_CACHE_SIZE > 0 and not RANDOM_FALLBACKS
+        )
+        self._reload_lock = threading.Lock()
+        # Serialises online ratings with the carry-over and swap of a reload,
+        # so none land on a snapshot after its ratings were copied
+        self._ratings_lock = threading.Lock()
+        self._sequence = 0
+        self.last_reload = None
+    
+    @property
+    def loaded(self) -> bool:
+        return self.snapshot is not None
+    
+    @property
+    def reloading(self) -> bool:
+        return self._reload_lock.locked()
+    
+    def reload(self) -> bool:
+        """
+        Build and warm a new snapshot, then replace the current one with a
+        single assignment. In-flight requests finish on the snapshot they
+        started with; on failure the current snapshot stays in place.
+        Returns False if another reload is already running.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            start = time.perf_counter()
+            rss_before = current_rss_mb()
+            self._sequence += 1
+            previous = self.snapshot
+            try:
+                snapshot = ModelSnapshot()
+                snapshot.load_all(self._sequence)
+                snapshot.warm()
+            except Exception as e:
+                print(f"Model reload failed, keeping current models: {e}")
+                self.last_reload = {
+                    'status': 'failed',
+                    'error': str(e),
+                    'version': previous.version if previous is not None else None,
+                    'finished_at': time.time(),
+                }
+                return True
+            
+            with self._ratings_lock:
+                if previous is not None:
+                    self._carry_over_ratings(previous, snapshot)
+                self.snapshot = snapshot
+            # Keys carry the snapshot version, so old entries can't be served; free them
+            self.result_cache.invalidate()
+            
+            self.last_reload = {
+                'status': 'ok',
+                'version': snapshot.version,
+                'previous_version': previous.version if previous is not None else None,
+                'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+                'memory_delta_mb': round(current_rss_mb() - rss_before, 2),
+                'finished_at': snapshot.loaded_at,
+            }
+            return True
+        finally:
+            self._reload_lock.release()
+    
+    def _carry_over_ratings(self, previous: ModelSnapshot, snapshot: ModelSnapshot):
+        """Fold the ratings received online into the new models as well"""
+        if previous.fold_in is None or snapshot.fold_in is None:
+            return
+        old_ids, store = previous.item_store.ids, snapshot.item_store
+        for user_id, ratings in previous.fold_in.export():
+            rows = [(store.row_of(old_ids[row]), value) for row, value in ratings.items()]
+            snapshot.fold_in.add_ratings(user_id, [(row, value) for row, value in rows if row is not None])
+    
+    def add_ratings(self, user_id: str, ratings: List[Tuple[str, float]]) -> Tuple[int, List[str]]:
+        """Fold (item id, rating) pairs into the current snapshot; returns (folded, unknown item ids)"""
+        with self._ratings_lock:
+            snapshot = self.snapshot
+            store = snapshot.item_store
+            rows, unknown_items = [], []
+            for item_id, rating in ratings:
+                row = store.row_of(item_id)
+                if row is None:
+                    unknown_items.append(item_id)
+                else:
+                    rows.append((row, rating))
+            folded = snapshot.fold_in.add_ratings(user_id, rows) if snapshot.fold_in is not None else 0
+            return folded, unknown_items
+    
+    def reload_in_background(self) -> bool:
+        """Start a reload thread; False if a reload is already running"""
+        if self.reloading:
+            return False
+        threading.Thread(target=self.reload, name="model-reload", daemon=True).start()
+        return True
+    
+    def watch(self, interval: float):
+        """Poll MODELS_DIR and reload whenever a file in it changes"""
+        def latest_mtime() -> float:
+            return max((p.stat().st_mtime for p in MODELS_DIR.rglob("*") if p.is_file()), default=0.0)
+        
+        def loop():
+            seen = latest_mtime()
+            while True:
+                time.sleep(interval)
+                try:
+                    latest = latest_mtime()
+                except OSError:
+                    # A file vanished mid-scan (e.g. being replaced); try again next tick
+                    continue
+                if latest > seen:
+                    seen = latest
+                    print("Model files changed, reloading...")
+                    self.reload()
+        
+        threading.Thread(target=loop, name="model-watch", daemon=True).start()
+        print(f"Watching {MODELS_DIR} for changes every {interval}s")
+    
+    def status(self) -> dict:
+        snapshot = self.snapshot
+        return {
+            'version': snapshot.version if snapshot is not None else None,
+            'loaded_at': snapshot.loaded_at if snapshot is not None else None,
+            'items': snapshot.item_store.size if snapshot is not None else 0,
+            'fold_in': snapshot.fold_in.stats() if snapshot is not None and snapshot.fold_in is not None else None,
+            'user_topn': snapshot.user_topn.meta if snapshot is not None and snapshot.user_topn is not None else None,
+            'demographics': snapshot.demographics.stats() if snapshot is not None and snapshot.demographics else None,
+            'reloading': self.reloading,
+            'last_reload': self.last_reload,
+            'rss_mb': round(current_rss_mb(), 2),
+        }
+
 # Initialize model manager
 models = ModelManager()
 
@@ -169,12 +620,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Outermost middleware, so latency includes CORS handling
+request_metrics = RequestMetrics()
+slow_request_profiler = (
+    SlowRequestProfiler(SLOW_REQUEST_MS, interval_ms=PROFILE_INTERVAL_MS) if SLOW_REQUEST_MS > 0 else None
+)
+app.add_middleware(LatencyMiddleware, metrics=request_metrics, profiler=slow_request_profiler)
+
+# CPU-bound recommendation work runs here, never on the event loop
+scoring_executor = ScoringExecutor(SCORING_EXECUTOR, SCORING_WORKERS, SCORING_QUEUE)
+
 @app.on_event("startup")
 async def startup_event():
     """Load all models when the server starts"""
-    models.load_all()
+    models.reload()
+    if MODEL_WATCH_INTERVAL > 0:
+        models.watch(MODEL_WATCH_INTERVAL)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the scoring threads"""
+    scoring_executor.shutdown()
 
 # ============= Static Files (Frontend) =============
 
@@ -206,121 +675,108 @@ async def custom_404_handler(_, __):
 
 # ============= Helper Functions =============
 
-def get_item_from_row(row) -> Item:
-    """Convert a DataFrame row to Item model"""
-    genres = row['genres'].split('|') if isinstance(row['genres'], str) else []
-    return Item(
-        id=str(row['id']),
-        title=row['title'],
-        year=int(row['year']),
-        category=row.get('category', 'Movie'),
-        genres=genres,
-        description=row.get('description', ''),
-        popularity=float(row.get('popularity', 50)),
-        imageUrl=f"https://images.unsplash.com/photo-1489599849927-2ee91cede3ba?w=400&h=600&fit=crop"
-    )
+def current_snapshot() -> ModelSnapshot:
+    """The snapshot a request works against for its whole lifetime"""
+    snapshot = models.snapshot
+    if snapshot is None or snapshot.item_store is None:
+        raise HTTPException(status_code=500, detail="Items metadata not loaded")
+    return snapshot
 
-def compute_svd_score(user_id: str, item_id: str) -> float:
-    """Compute SVD prediction score for user-item pair"""
-    if models.svd_model is not None:
-        try:
-            # Assuming SVD model has a predict method
-            prediction = models.svd_model.predict(user_id, item_id)
-            return float(prediction.est) / 5.0  # Normalize to 0-1
-        except:
-            pass
-    # Return random score if model not available
-    return np.random.uniform(0.6, 0.95)
-
-def compute_content_similarity(item_id: str, target_genres: List[str]) -> float:
-    """Compute content-based similarity score"""
-    if models.item_embeddings is not None:
-        try:
-            # Use item embeddings for similarity
-            idx = int(item_id) - 1
-            if idx < len(models.item_embeddings):
-                # Compute cosine similarity with average user preference
-                return float(np.random.uniform(0.5, 0.9))
-        except:
-            pass
-    return np.random.uniform(0.5, 0.85)
-
-def compute_user_item_similarity(user_id: str, item_id: str) -> float:
-    """Compute user-item embedding similarity"""
-    if models.user_embeddings is not None and models.item_embeddings is not None:
-        try:
-            # Get user and item embeddings, compute similarity
-            return float(np.random.uniform(0.6, 0.92))
-        except:
-            pass
-    return np.random.uniform(0.55, 0.88)
+def server_busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Server busy, try again shortly", headers={"Retry-After": "1"})
 
+async def offload(fn: Callable, *args):
+    """Run CPU-bound work on the scoring executor; 503 when it is saturated"""
+    try:
+        return await scoring_executor.run(fn, *args)
+    except Saturated:
+        raise server_busy()
 
+def reserve_executor() -> Reservation:
+    """Executor capacity for a whole streamed response, taken before its headers are sent"""
+    try:
+        return scoring_executor.reserve()
+    except Saturated:
+        raise server_busy()
 
-def compute_final_ranking(features: dict) -> float:
-    """Use ranking model to compute final score"""
-    if models.ranking_model is not None:
-        try:
-            # Prepare features for ranking model
-            feature_vector = np.array([
-                features.get('svdScore', 0.5),
-                features.get('contentSimilarity', 0.5),
-                features.get('userItemSimilarity', 0.5),
-                features.get('popularity', 0.5),
-                features.get('recency', 0.5),
-                features.get('demographicMatch', 0.5)
-            ]).reshape(1, -1)
-            
-            # Predict final ranking score
-            # Use predict_proba if available for smoother scoring
-            if hasattr(models.ranking_model, "predict_proba"):
-                score = models.ranking_model.predict_proba(feature_vector)[0][1]
-            else:
-                score = models.ranking_model.predict(feature_vector)[0]
-                
-            return float(np.clip(score, 0, 1))
-        except Exception as e:
-            # print(f"Ranking error: {e}")
-            pass
-    
-    # Weighted average fallback
-    weights = {
-        'svdScore': 0.3,
-        'contentSimilarity': 0.2,
-        'userItemSimilarity': 0.2,
-        'popularity': 0.15,
-        'recency': 0.05,
-        'demographicMatch': 0.1
-    }
-    
-    score = sum(features.get(k, 0.5) * v for k, v in weights.items())
-    return float(np.clip(score, 0, 1))
+def encode_cursor(store: ItemStore, sort_by: Optional[str], row: int) -> str:
+    """Opaque keyset cursor: the sort order and the last item id of a page"""
+    return base64.urlsafe_b64encode(f"{sort_by or ''}:{store.ids[row]}".encode()).decode().rstrip("=")
 
-def compute_demographic_match(gender: str, occupation: str, item_id: str) -> float:
-    """Compute demographic matching score"""
-    encoded_gender = 0
-    encoded_occupation = 1 # Default different from 0
-    
-    # Try to encode, handle unseen labels gracefully
-    if models.gender_encoder is not None:
-        try:
-            # Check if label exists in encoder classes
-            if gender in models.gender_encoder.classes_:
-                encoded_gender = models.gender_encoder.transform([gender])[0]
-        except:
-            pass
-    
-    if models.occupation_encoder is not None:
-        try:
-             if occupation in models.occupation_encoder.classes_:
-                encoded_occupation = models.occupation_encoder.transform([occupation])[0]
-        except:
-            pass
-    
-    # Return a synthetic score based on the "match" of these (dummy logic since we lack a real user-item interaction model for demographics)
-    # Using hash to be deterministic but look random
-    seed = (hash(str(encoded_gender)) + hash(str(encoded_occupation)) + hash(str(item_id))) % 100
-    return 0.5 + (seed / 200) # Returns 0.5 to 1.0
+def decode_cursor(store: ItemStore, cursor: Optional[str], sort_by: Optional[str]) -> Optional[int]:
+    """Row of the item a cursor points after"""
+    if not cursor:
+        return None
+    try:
+        sort, item_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split(":", 1)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if sort != (sort_by or ''):
+        raise HTTPException(status_code=400, detail="Cursor was issued for a different sort_by")
+    row = store.row_of(item_id)
+    if row is None:
+        raise HTTPException(status_code=400, detail="Cursor item no longer exists")
+    return row
+
+def check_admin_token(token: Optional[str]):
+    """Reject admin calls without the configured ADMIN_TOKEN"""
+    if ADMIN_TOKEN and token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def fallback_scores(low: float, high: float, size: Optional[int], *key):
+    """Placeholder scores: random, or seeded from key when RANDOM_FALLBACKS is off"""
+    if RANDOM_FALLBACKS:
+        return np.random.uniform(low, high, size)
+    seed = zlib.crc32("|".join(str(k) for k in key).encode())
+    return np.random.default_rng(seed).uniform(low, high, size)
+
+def compute_svd_scores(snapshot: ModelSnapshot, user_id: str) -> Optional[np.ndarray]:
+    """Compute SVD prediction scores for a user against every catalog item"""
+    # Folded-in online ratings take precedence over the base model
+    if snapshot.fold_in is not None:
+        scores = snapshot.fold_in.score_catalog(user_id)
+        if scores is not None:
+            return scores
+    if snapshot.mf_scorer is not None:
+        return snapshot.mf_scorer.score_catalog(user_id)
+    return None
+
+def compute_content_similarity(snapshot: ModelSnapshot, rows: np.ndarray, profile) -> np.ndarray:
+    """TF-IDF cosine similarity between candidate rows and a content profile"""
+    if snapshot.content is not None and profile is not None:
+        return snapshot.content.score(profile, rows)
+    store = snapshot.item_store
+    return np.array([fallback_scores(0.5, 0.85, None, 'content', store.ids[row]) for row in rows])
+
+def content_profile(snapshot: ModelSnapshot, user_scores: np.ndarray, rows: Optional[np.ndarray] = None):
+    """TF-IDF centroid of a user's top-scored items (among rows, default all), weighted by score"""
+    if snapshot.content is None:
+        return None
+    top = top_k_indices(user_scores, CONTENT_PROFILE_ITEMS)
+    seeds = top if rows is None else rows[top]
+    return snapshot.content.item_profile(seeds, user_scores[top])
+
+def compute_user_item_similarity(snapshot: ModelSnapshot, user_id: str, rows: np.ndarray) -> np.ndarray:
+    """Cosine similarity between the user's and the candidates' embeddings"""
+    if snapshot.embedding_scorer is not None:
+        scores = snapshot.embedding_scorer.score_user(user_id)
+        if scores is not None:
+            return np.clip(scores[rows], 0, 1)
+    store = snapshot.item_store
+    return np.array([fallback_scores(0.55, 0.88, None, 'user-item', user_id, store.ids[row]) for row in rows])
+
+def compute_final_scores(snapshot: ModelSnapshot, features: Dict[str, np.ndarray], n_rows: int) -> np.ndarray:
+    """Use the ranking stage to score every candidate in one call"""
+    return snapshot.ranker.score(features, n_rows)
+
+def compute_demographic_match(snapshot: ModelSnapshot, gender: str, occupation: str, rows: np.ndarray) -> np.ndarray:
+    """Affinity of a gender/occupation group with the given catalog rows"""
+    return snapshot.demographics.scores(gender, occupation, rows)
+
+def compute_user_demographic_match(snapshot: ModelSnapshot, user_id: str, rows: np.ndarray) -> np.ndarray:
+    """Affinity of a known user's group; users without demographics get the default, as in training"""
+    scores = snapshot.demographics.user_scores(user_id, rows)
+    return scores if scores is not None else np.full(len(rows), DEFAULT_FEATURE_VALUE)
 
 def determine_source(features: dict) -> str:
     """Determine recommendation source based on feature contributions"""
@@ -336,6 +792,34 @@ def determine_source(features: dict) -> str:
     else:
         return 'trending'
 
+# FeatureBreakdown field order; features an endpoint doesn't compute render as null
+FEATURE_FIELDS = list(FeatureBreakdown.model_fields)
+
+def build_recommendations(
+    snapshot: ModelSnapshot,
+    rows: np.ndarray,
+    scores: np.ndarray,
+    features: Dict[str, np.ndarray],
+    limit: int,
+    source: Callable[[int, dict], str],
+) -> bytes:
+    """
+    JSON for the top `limit` candidates as a List[Recommendation]: each item's
+    pre-rendered payload spliced with the per-request score, source and features
+    """
+    store = snapshot.item_store
+    fragments = []
+    for i in top_k_indices(scores, limit):
+        item_features = {name: float(values[i]) for name, values in features.items()}
+        breakdown = {name: item_features.get(name) for name in FEATURE_FIELDS}
+        fragments.append(
+            b'{"item":' + store.payload_json[rows[i]]
+            + b',"score":' + dumps(float(scores[i]))
+            + b',"source":' + dumps(source(i, item_features))
+            + b',"features":' + dumps(breakdown) + b'}'
+        )
+    return json_array(fragments)
+
 # ============= API Endpoints =============
 
 @app.get("/api/health")
@@ -364,52 +848,58 @@ async def get_all_items(
     genre: Optional[str] = None,
     search: Optional[str] = None,
     sort_by: Optional[str] = Query(None, regex="^(popularity|year|title)$"),
-    limit: int = Query(50, ge=1, le=200)
+    limit: Optional[int] = Query(None, ge=1, le=ITEMS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    format: str = Query("json", regex="^(json|ndjson)$")
 ):
-    """Get all items with optional filtering"""
-    if models.items_metadata is None:
-        raise HTTPException(status_code=500, detail="Items metadata not loaded")
-    
-    df = models.items_metadata.copy()
-    
-    # Apply filters
-    if category:
-        df = df[df['category'].str.lower() == category.lower()]
+    """
+    Get all items with optional filtering. Pages are keyset-paginated: pass a
+    page's X-Next-Cursor header as cursor for the next one. format=ndjson
+    streams every match (up to limit) as one item per line.
+    """
+    snapshot = current_snapshot()
+    store = snapshot.item_store
+    after = decode_cursor(store, cursor, sort_by)
     
-    if genre:
-        df = df[df['genres'].str.contains(genre, case=False, na=False)]
-    
-    if search:
-        df = df[
-            df['title'].str.contains(search, case=False, na=False) |
-            df['description'].str.contains(search, case=False, na=False)
-        ]
-    
-    # Apply sorting
-    if sort_by == 'popularity':
-        df = df.sort_values('popularity', ascending=False)
-    elif sort_by == 'year':
-        df = df.sort_values('year', ascending=False)
-    elif sort_by == 'title':
-        df = df.sort_values('title')
+    # Index lookups and pre-rendered payloads: cheaper on the event loop than a hop to the executor
+    if format == 'ndjson':
+        rows = store.select_rows(category, genre, search, sort_by, limit, after)
+        
+        async def lines():
+            for start in range(0, len(rows), NDJSON_CHUNK):
+                yield b"".join(store.payload_json[row] + b"\n" for row in rows[start:start + NDJSON_CHUNK])
+                # Let other requests run between chunks of a large export
+                await asyncio.sleep(0)
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
     
-    # Limit results
-    df = df.head(limit)
+    limit = limit or ITEMS_PAGE_SIZE
+    cache_key = ('items', category, genre, search, sort_by, limit, after)
+    page = models.result_cache.get(snapshot.version, cache_key)
+    if page is None:
+        page = render_items_page(store, category, genre, search, sort_by, limit, after)
+        models.result_cache.set(snapshot.version, cache_key, page)
     
-    return [get_item_from_row(row) for _, row in df.iterrows()]
+    body, next_cursor = page
+    return RawJSONResponse(body, headers={'X-Next-Cursor': next_cursor} if next_cursor else None)
+
+def render_items_page(store: ItemStore, category, genre, search, sort_by, limit: int, after: Optional[int]):
+    """JSON body of one page (pre-rendered payloads, no model validation) and the cursor after it"""
+    # Intersect the posting lists, then order just the matches; one extra row tells if more follow
+    rows = store.select_rows(category, genre, search, sort_by, limit + 1, after)
+    next_cursor = encode_cursor(store, sort_by, rows[limit - 1]) if len(rows) > limit else None
+    return json_array(store.payload_json[row] for row in rows[:limit]), next_cursor
 
 @app.get("/api/items/{item_id}", response_model=Item)
 async def get_item(item_id: str):
     """Get a single item by ID"""
-    if models.items_metadata is None:
-        raise HTTPException(status_code=500, detail="Items metadata not loaded")
+    snapshot = current_snapshot()
+    store = snapshot.item_store
     
-    item_row = models.items_metadata[models.items_metadata['id'].astype(str) == item_id]
-    
-    if len(item_row) == 0:
+    row = store.row_of(item_id)
+    if row is None:
         raise HTTPException(status_code=404, detail="Item not found")
     
-    return get_item_from_row(item_row.iloc[0])
+    return RawJSONResponse(store.payload_json[row])
 
 @app.get("/api/recommend/user/{user_id}", response_model=List[Recommendation])
 async def get_user_recommendations(
@@ -417,38 +907,63 @@ async def get_user_recommendations(
     limit: int = Query(10, ge=1, le=50)
 ):
     """Get personalized recommendations for a user"""
-    if models.items_metadata is None:
-        raise HTTPException(status_code=500, detail="Items metadata not loaded")
+    snapshot = current_snapshot()
     
-    recommendations = []
+    # New ratings for the user change the revision, so stale entries are never hit
+    revision = snapshot.fold_in.revision(user_id) if snapshot.fold_in is not None else 0
+    cache_key = ('user', user_id, limit, revision)
+    cached = models.result_cache.get(snapshot.version, cache_key)
+    if cached is not None:
+        return RawJSONResponse(cached, headers={'Server-Timing': 'cache;desc="hit"'})
     
-    for _, row in models.items_metadata.head(limit * 2).iterrows():
-        item = get_item_from_row(row)
-        
-        # Compute all feature scores
+    timer = stage_timer()
+    body = await offload(recommend_for_user, snapshot, user_id, limit)
+    
+    models.result_cache.set(snapshot.version, cache_key, body)
+    return RawJSONResponse(body, headers={'Server-Timing': timer.server_timing()})
+
+def recommend_for_user(snapshot: ModelSnapshot, user_id: str, limit: int) -> bytes:
+    """Candidates, features and ranking for one user (runs on the scoring executor)"""
+    store = snapshot.item_store
+    timer = stage_timer()
+    
+    # Stage 1: candidates from the offline top-N table, else cheap generation over the whole catalog
+    with timer.stage('candidates'):
+        precomputed = None
+        if snapshot.user_topn is not None and not (snapshot.fold_in is not None and snapshot.fold_in.knows(user_id)):
+            precomputed = snapshot.user_topn.lookup(user_id, min_n=limit)
+        if precomputed is not None:
+            # Scores cover just the table's rows
+            rows, user_scores = precomputed
+            scored_rows, svd_feature = rows, user_scores
+        else:
+            svd_scores = compute_svd_scores(snapshot, user_id)
+            rows, _ = models.candidate_generator.generate(
+                store, svd_scores, snapshot.ann_index, min_candidates=limit
+            )
+            user_scores = svd_scores if svd_scores is not None else fallback_scores(0.6, 0.95, store.size, 'svd', user_id)
+            scored_rows, svd_feature = None, user_scores[rows]
+    
+    # Stage 2: compute all feature scores as columns over the candidates only
+    with timer.stage('features'):
         features = {
-            'svdScore': compute_svd_score(user_id, item.id),
-            'contentSimilarity': compute_content_similarity(item.id, item.genres),
-            'userItemSimilarity': compute_user_item_similarity(user_id, item.id),
-            'popularity': item.popularity / 100.0,
-            'recency': max(0, 1 - (2024 - item.year) / 50.0),
-            'demographicMatch': compute_demographic_match('male', 'Engineer', item.id)
+            'svdScore': svd_feature,
+            # Similarity to what the user is predicted to like most
+            'contentSimilarity': compute_content_similarity(
+                snapshot, rows, content_profile(snapshot, user_scores, scored_rows)
+            ),
+            'userItemSimilarity': compute_user_item_similarity(snapshot, user_id, rows),
+            'popularity': store.popularity_norm[rows],
+            'recency': store.recency[rows],
+            'demographicMatch': compute_user_demographic_match(snapshot, user_id, rows)
         }
-        
-        # Compute final ranking score
-        final_score = compute_final_ranking(features)
-        source = determine_source(features)
-        
-        recommendations.append(Recommendation(
-            item=item,
-            score=final_score,
-            source=source,
-            features=FeatureBreakdown(**features)
-        ))
     
-    # Sort by score and limit
-    recommendations.sort(key=lambda x: x.score, reverse=True)
-    return recommendations[:limit]
+    # Stage 3: compute final ranking scores
+    with timer.stage('ranking'):
+        scores = compute_final_scores(snapshot, features, len(rows))
+    
+    with timer.stage('serialization'):
+        return build_recommendations(snapshot, rows, scores, features, limit, lambda _, f: determine_source(f))
 
 @app.get("/api/similar/{item_id}", response_model=List[Recommendation])
 async def get_similar_items(
@@ -456,46 +971,68 @@ async def get_similar_items(
     limit: int = Query(6, ge=1, le=20)
 ):
     """Get similar items using content-based filtering"""
-    if models.items_metadata is None:
-        raise HTTPException(status_code=500, detail="Items metadata not loaded")
+    snapshot = current_snapshot()
+    store = snapshot.item_store
     
     # Get the target item
-    target_row = models.items_metadata[models.items_metadata['id'].astype(str) == item_id]
-    if len(target_row) == 0:
+    target = store.row_of(item_id)
+    if target is None:
         raise HTTPException(status_code=404, detail="Item not found")
     
-    target_genres = target_row.iloc[0]['genres'].split('|') if isinstance(target_row.iloc[0]['genres'], str) else []
-    
-    recommendations = []
+    cache_key = ('similar', item_id, limit)
+    body = models.result_cache.get(snapshot.version, cache_key)
+    if body is None:
+        if has_neighbour_table(snapshot, limit):
+            # Re-scoring k precomputed neighbours is cheaper on the loop than a hop to the executor
+            body = similar_to_item(snapshot, target, limit)
+        else:
+            body = await offload(similar_to_item, snapshot, target, limit)
+        models.result_cache.set(snapshot.version, cache_key, body)
+    return RawJSONResponse(body)
+
+def has_neighbour_table(snapshot: ModelSnapshot, limit: int) -> bool:
+    return snapshot.neighbour_table is not None and snapshot.neighbour_table.k >= limit
+
+def similar_to_item(snapshot: ModelSnapshot, target: int, limit: int) -> bytes:
+    """Neighbours of one catalog row, re-scored (on the executor unless they come from the table)"""
+    store = snapshot.item_store
+    item_id = store.ids[target]
     
-    for _, row in models.items_metadata.iterrows():
-        if str(row['id']) == item_id:
-            continue  # Skip the same item
-        
-        item = get_item_from_row(row)
-        
-        # Compute content similarity based on genres
-        item_genres = row['genres'].split('|') if isinstance(row['genres'], str) else []
-        genre_overlap = len(set(target_genres) & set(item_genres)) / max(len(set(target_genres) | set(item_genres)), 1)
-        
-        features = {
-            'contentSimilarity': genre_overlap * 0.7 + np.random.uniform(0.1, 0.3),
-            'userItemSimilarity': compute_content_similarity(item.id, target_genres),
-            'popularity': item.popularity / 100.0,
-            'recency': max(0, 1 - (2024 - item.year) / 50.0),
-        }
+    if has_neighbour_table(snapshot, limit):
+        # Precomputed neighbours: an O(k) slice of the offline table
+        rows, content_sims = snapshot.neighbour_table.neighbours(target)
+    else:
+        # Retrieve nearest neighbours from the index, then re-score only those
+        if snapshot.ann_index is not None:
+            rows, sims = snapshot.ann_index.search_item(target, max(SIMILAR_CANDIDATES, limit))
+            embedding_sims = np.clip(sims, 0, 1)
+        elif snapshot.content is not None:
+            # No embeddings: nearest neighbours by TF-IDF, in bounded catalog chunks
+            rows, sims = snapshot.content.similar_items(target, max(SIMILAR_CANDIDATES, limit))
+            embedding_sims = np.clip(sims, 0, 1).astype(np.float64)
+        else:
+            rows = np.arange(store.size)
+            embedding_sims = fallback_scores(0, 1, store.size, 'similar', item_id)
         
-        score = features['contentSimilarity'] * 0.5 + features['popularity'] * 0.3 + features['recency'] * 0.2
+        # Skip the same item
+        keep = rows != target
+        rows, embedding_sims = rows[keep], embedding_sims[keep]
         
-        recommendations.append(Recommendation(
-            item=item,
-            score=score,
-            source='content',
-            features=FeatureBreakdown(**features)
-        ))
+        # Compute content similarity based on genres and embedding proximity
+        content_sims = store.genre_jaccard(target)[rows] * 0.7 + 0.1 + 0.2 * embedding_sims
+    
+    features = {
+        'contentSimilarity': content_sims,
+        'userItemSimilarity': compute_content_similarity(
+            snapshot, rows, snapshot.content.item_profile([target]) if snapshot.content is not None else None
+        ),
+        'popularity': store.popularity_norm[rows],
+        'recency': store.recency[rows],
+    }
+    
+    scores = features['contentSimilarity'] * 0.5 + features['popularity'] * 0.3 + features['recency'] * 0.2
     
-    recommendations.sort(key=lambda x: x.score, reverse=True)
-    return recommendations[:limit]
+    return build_recommendations(snapshot, rows, scores, features, limit, lambda _, __: 'content')
 
 @app.post("/api/recommend/cold-start", response_model=List[Recommendation])
 async def get_cold_start_recommendations(
@@ -503,69 +1040,210 @@ async def get_cold_start_recommendations(
     limit: int = Query(10, ge=1, le=50)
 ):
     """Get recommendations for new users based on demographics"""
-    if models.items_metadata is None:
-        raise HTTPException(status_code=500, detail="Items metadata not loaded")
+    snapshot = current_snapshot()
+    return RawJSONResponse(await offload(cold_start_for, snapshot, request, limit))
+
+def cold_start_for(snapshot: ModelSnapshot, request: ColdStartRequest, limit: int) -> bytes:
+    """Whole-catalog scoring for a new user (runs on the scoring executor)"""
+    store = snapshot.item_store
     
-    # Encode demographics
-    gender_encoded = 0
-    occupation_encoded = 0
+    # Check genre match with interests for the whole catalog at once
+    interest_matches = store.genre_overlap(request.interests) / max(len(request.interests), 1)
+    rows = np.arange(store.size)
     
-    if models.gender_encoder is not None:
-        try:
-            gender_encoded = models.gender_encoder.transform([request.gender])[0]
-        except:
-            pass
+    # Free-text TF-IDF match of the interests fills the remaining 0.1-0.2 band
+    interest_profile = snapshot.content.text_profile(" ".join(request.interests)) if snapshot.content is not None else None
+    if interest_profile is not None:
+        text_match = 0.1 + 0.1 * snapshot.content.score(interest_profile)
+    else:
+        text_match = fallback_scores(0.1, 0.2, store.size, 'cold-start')
     
-    if models.occupation_encoder is not None:
-        try:
-            occupation_encoded = models.occupation_encoder.transform([request.occupation])[0]
-        except:
-            pass
+    features = {
+        'contentSimilarity': interest_matches * 0.8 + text_match,
+        'popularity': store.popularity_norm,
+        'recency': store.recency,
+        'demographicMatch': compute_demographic_match(snapshot, request.gender, request.occupation, rows)
+    }
     
-    recommendations = []
+    # Weighted score for cold start (no SVD available)
+    scores = (
+        features['contentSimilarity'] * 0.4 +
+        features['popularity'] * 0.25 +
+        features['recency'] * 0.1 +
+        features['demographicMatch'] * 0.25
+    )
     
-    for _, row in models.items_metadata.iterrows():
-        item = get_item_from_row(row)
-        
-        # Check genre match with interests
-        item_genres = row['genres'].split('|') if isinstance(row['genres'], str) else []
-        interest_match = len(set(request.interests) & set(item_genres)) / max(len(request.interests), 1)
+    return build_recommendations(
+        snapshot, rows, scores, features, limit,
+        lambda i, _: 'content' if interest_matches[i] > 0.3 else 'trending'
+    )
+
+@app.post("/api/recommend/batch", response_model=BatchResponse)
+async def get_batch_recommendations(request: BatchRequest):
+    """
+    Top-k for many users in one call. Users are ranked by their SVD scores,
+    a block of users per matrix product (no per-candidate re-ranking as in
+    /api/recommend/user); users without factors get the most popular items.
+    """
+    snapshot = current_snapshot()
+    store = snapshot.item_store
+    if len(request.userIds) > BATCH_MAX_USERS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_USERS} user ids per request")
+    
+    blocks = iter_batch_top_k(
+        snapshot.mf_scorer, request.userIds, request.limit,
+        store.sort_orders['popularity'], store.popularity_norm,
+        overrides=snapshot.fold_in.score_catalog if snapshot.fold_in is not None else None
+    )
+    
+    def serialize(result) -> dict:
+        items = []
+        for row, score in zip(result.rows.tolist(), result.scores.tolist()):
+            entry = {'id': store.ids[row], 'score': score}
+            if request.includeItems:
+                entry['item'] = store.payloads[row]
+            items.append(entry)
+        return {'userId': result.user_id, 'source': result.source, 'items': items}
+    
+    if request.stream:
+        def next_lines() -> Optional[bytes]:
+            block = next(blocks, None)
+            if block is None:
+                return None
+            return b"".join(dumps(serialize(result)) + b"\n" for result in block)
         
-        features = {
-            'contentSimilarity': interest_match * 0.8 + np.random.uniform(0.1, 0.2),
-            'popularity': item.popularity / 100.0,
-            'recency': max(0, 1 - (2024 - item.year) / 50.0),
-            'demographicMatch': compute_demographic_match(request.gender, request.occupation, item.id)
-        }
+        # Capacity is taken for the whole stream up front: once the 200 is sent a 503 can't follow
+        reservation = reserve_executor()
         
-        # Weighted score for cold start (no SVD available)
-        score = (
-            features['contentSimilarity'] * 0.4 +
-            features['popularity'] * 0.25 +
-            features['recency'] * 0.1 +
-            features['demographicMatch'] * 0.25
-        )
-        
-        recommendations.append(Recommendation(
-            item=item,
-            score=score,
-            source='content' if interest_match > 0.3 else 'trending',
-            features=FeatureBreakdown(**features)
-        ))
+        async def lines():
+            try:
+                while (chunk := await reservation.run(next_lines)) is not None:
+                    yield chunk
+            finally:
+                reservation.release()
+        # Also released if the client goes away before the stream is consumed
+        return StreamingResponse(lines(), media_type="application/x-ndjson", background=BackgroundTask(reservation.release))
+    
+    def respond() -> FastJSONResponse:
+        timer = stage_timer()
+        with timer.stage('scoring'):
+            scored = list(blocks)
+        with timer.stage('serialization'):
+            # Plain dicts straight to JSON; validating thousands of models would dominate
+            response = FastJSONResponse({'results': [serialize(result) for block in scored for result in block]})
+        response.headers['Server-Timing'] = timer.server_timing()
+        return response
     
-    recommendations.sort(key=lambda x: x.score, reverse=True)
-    return recommendations[:limit]
+    return await offload(respond)
+
+@app.post("/api/ratings")
+async def ingest_ratings(request: RatingsRequest):
+    """
+    Record a user's new ratings and fold them into their SVD factors, so their
+    recommendations reflect them right away instead of after the next retrain
+    """
+    snapshot = current_snapshot()
+    if snapshot.fold_in is None:
+        raise HTTPException(status_code=503, detail="No SVD model loaded to fold ratings into")
+    
+    low, high = snapshot.mf_scorer.rating_scale
+    if any(not low <= r.rating <= high for r in request.ratings):
+        raise HTTPException(status_code=400, detail=f"Ratings must be between {low:g} and {high:g}")
+    
+    start = time.perf_counter()
+    # Resolved against whichever snapshot is current once the manager lets it in
+    folded, unknown_items = await offload(models.add_ratings, request.userId, [(r.itemId, r.rating) for r in request.ratings])
+    return {
+        'userId': request.userId,
+        'folded': folded,
+        'ignored': len(request.ratings) - folded,
+        'unknownItems': unknown_items,
+        'foldInMs': round((time.perf_counter() - start) * 1000, 3),
+    }
 
 @app.get("/api/stats/performance", response_model=PerformanceStats)
 async def get_performance_stats():
-    """Get model performance statistics"""
-    return PerformanceStats(
-        precision=0.847,
-        recall=0.792,
-        ndcg=0.891,
-        coverage=0.683,
-        latency_ms=23.5
-    )
+    """Get model performance statistics and live request latency"""
+    live = request_metrics.summary()
+    overall = live['overall']
+    
+    quality = {}
+    report = models.snapshot.evaluation if models.snapshot is not None else None
+    if report is not None:
+        k = report['k']
+        svd = report['recommenders']['svd']
+        popularity = report['recommenders'].get('popularity', {})
+        quality = {
+            'precision': svd[f'precision@{k}'],
+            'recall': svd[f'recall@{k}'],
+            'ndcg': svd[f'ndcg@{k}'],
+            'coverage': svd['coverage'],
+            'evaluation': {
+                'benchmark': report.get('benchmark', BENCHMARK),
+                'k': k,
+                'dataset': report['dataset'],
+                'created_at': report['created_at'],
+                'users_per_second': svd['users_per_second'],
+                'baseline': {name: value for name, value in popularity.items() if '@' in name or name == 'coverage'}
+            }
+        }
+    
+    # Plain dicts in the PerformanceStats shape; validating the per-route models costs more than building them
+    return FastJSONResponse({
+        'precision': None, 'recall': None, 'ndcg': None, 'coverage': None, 'evaluation': None,
+        **quality,
+        'latency_ms': overall['p50_ms'],
+        'latency_p95_ms': overall['p95_ms'],
+        'latency_p99_ms': overall['p99_ms'],
+        'requests_per_second': overall['requests_per_second'],
+        'total_requests': overall['count'],
+        'routes': live['routes']
+    })
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Request metrics in the Prometheus text format"""
+    return PlainTextResponse(request_metrics.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/stats/slow-requests")
+async def get_slow_requests():
+    """Stack samples of recent slow requests (needs SLOW_REQUEST_MS)"""
+    if slow_request_profiler is None:
+        return {"enabled": False, "requests": []}
+    return {
+        "enabled": True,
+        "threshold_ms": slow_request_profiler.threshold_ms,
+        "requests": slow_request_profiler.report()
+    }
+
+@app.get("/api/stats/cache")
+async def get_cache_stats():
+    """Get result cache and per-user embedding score cache counters"""
+    snapshot = models.snapshot
+    scorer = snapshot.embedding_scorer if snapshot is not None else None
+    return {
+        **models.result_cache.stats(),
+        'user_embedding_scores': scorer.cache.stats() if scorer is not None else None
+    }
+
+@app.get("/api/stats/scoring")
+async def get_scoring_stats():
+    """Scoring executor load: in-flight and queued work, rejections"""
+    return scoring_executor.stats()
+
+@app.get("/api/admin/models")
+async def get_model_status(x_admin_token: Optional[str] = Header(None)):
+    """Current model version, reload state and the last reload's cost"""
+    check_admin_token(x_admin_token)
+    return models.status()
+
+@app.post("/api/admin/reload", status_code=202)
+async def reload_models(x_admin_token: Optional[str] = Header(None)):
+    """Load the model files again in the background and swap them in once warm"""
+    check_admin_token(x_admin_token)
+    if not models.reload_in_background():
+        raise HTTPException(status_code=409, detail="A model reload is already in progress")
+    return {"status": "reloading", "version": models.status()['version']}
 
 @app.get("/api/users", response_model=List[User])
 async def get_users():
@@ -0,0 +1,321 @@
+"""
+Request Metrics
+Streaming latency histograms per route and per stage, request rates, a
+Prometheus text exporter, an ASGI middleware that feeds them and an opt-in
+sampling profiler that keeps stack samples of slow requests
+"""
+
+import contextvars
+import math
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .pipeline import StageTimer
+except ImportError:  # running from inside backend/ (uvicorn main:app)
+    from pipeline import StageTimer
+
+# Fine log-spaced buckets for quantiles: 8 per doubling (~9% relative error)
+# from 10us to ~170s
+_BUCKETS_PER_DOUBLING = 8
+_MIN_MS = 0.01
+_N_BUCKETS = 24 * _BUCKETS_PER_DOUBLING
+_UPPER_BOUNDS_MS = _MIN_MS * 2.0 ** (np.arange(1, _N_BUCKETS + 1) / _BUCKETS_PER_DOUBLING)
+
+# Exported Prometheus buckets (seconds)
+PROMETHEUS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Request-rate window
+RATE_WINDOW_SECONDS = 60
+
+
+class LatencyHistogram:
+    """Fixed-memory histogram of millisecond latencies"""
+
+    def __init__(self):
+        self.counts = np.zeros(_N_BUCKETS + 1, dtype=np.int64)
+        self.export_counts = np.zeros(len(PROMETHEUS_BUCKETS) + 1, dtype=np.int64)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        if ms <= _MIN_MS:
+            bucket = 0
+        else:
+            bucket = min(int(math.ceil(math.log2(ms / _MIN_MS) * _BUCKETS_PER_DOUBLING)) - 1, _N_BUCKETS)
+        self.counts[max(bucket, 0)] += 1
+        self.export_counts[np.searchsorted(PROMETHEUS_BUCKETS, ms / 1000)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (capped at the max seen)"""
+        return self.quantiles((q,))[0]
+
+    def quantiles(self, qs: Tuple[float, ...]) -> List[float]:
+        """quantile() for several q at once, over a single cumulative sum"""
+        if self.count == 0:
+            return [0.0] * len(qs)
+        buckets = np.searchsorted(np.cumsum(self.counts), np.asarray(qs) * self.count).tolist()
+        return [min(float(_UPPER_BOUNDS_MS[b]) if b < _N_BUCKETS else self.max_ms, self.max_ms) for b in buckets]
+
+    def summary(self) -> dict:
+        p50, p95, p99 = self.quantiles((0.50, 0.95, 0.99))
+        return {
+            'count': self.count,
+            'mean_ms': round(self.sum_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(p50, 3),
+            'p95_ms': round(p95, 3),
+            'p99_ms': round(p99, 3),
+            'max_ms': round(self.max_ms, 3),
+        }
+
+
+class RateCounter:
+    """Events per second over a sliding window of one-second slots"""
+
+    def __init__(self, window: int = RATE_WINDOW_SECONDS):
+        self.window = window
+        self.slots = np.zeros(window, dtype=np.int64)
+        self.slot_seconds = np.zeros(window, dtype=np.int64)
+
+    def add(self, now: float) -> None:
+        second = int(now)
+        slot = second % self.window
+        if self.slot_seconds[slot] != second:
+            self.slot_seconds[slot] = second
+            self.slots[slot] = 0
+        self.slots[slot] += 1
+
+    def rate(self, now: float) -> float:
+        recent = self.slot_seconds > int(now) - self.window
+        return float(self.slots[recent].sum()) / self.window
+
+
+class RequestMetrics:
+    """Per-route request latency, status counts and per-stage timings"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.routes: Dict[str, LatencyHistogram] = {}
+        self.rates: Dict[str, RateCounter] = {}
+        self.statuses: Counter = Counter()
+        self.stages: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.overall = LatencyHistogram()
+        self.overall_rate = RateCounter()
+
+    def observe(self, route: str, status: int, ms: float, stages: Optional[Dict[str, float]] = None) -> None:
+        now = time.time()
+        with self._lock:
+            if route not in self.routes:
+                self.routes[route] = LatencyHistogram()
+                self.rates[route] = RateCounter()
+            self.routes[route].observe(ms)
+            self.rates[route].add(now)
+            self.overall.observe(ms)
+            self.overall_rate.add(now)
+            self.statuses[(route, status)] += 1
+            for stage, stage_ms in (stages or {}).items():
+                key = (route, stage)
+                if key not in self.stages:
+                    self.stages[key] = LatencyHistogram()
+                self.stages[key].observe(stage_ms)
+
+    def summary(self) -> dict:
+        now = time.time()
+        with self._lock:
+            routes = {}
+            for route, histogram in self.routes.items():
+                routes[route] = {
+                    **histogram.summary(),
+                    'requests_per_second': round(self.rates[route].rate(now), 3),
+                    'stages': {
+                        stage: stage_histogram.summary()
+                        for (stage_route, stage), stage_histogram in self.stages.items()
+                        if stage_route == route
+                    },
+                }
+            return {
+                'uptime_seconds': round(now - self.started_at, 1),
+                'overall': {**self.overall.summary(), 'requests_per_second': round(self.overall_rate.rate(now), 3)},
+                'routes': routes,
+            }
+
+    def prometheus_text(self) -> str:
+        """Render in the Prometheus text exposition format"""
+        lines: List[str] = []
+
+        def histogram_lines(name: str, labels: str, histogram: LatencyHistogram):
+            cumulative = np.cumsum(histogram.export_counts)
+            for bound, count in zip(PROMETHEUS_BUCKETS, cumulative):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum_ms / 1000:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+        with self._lock:
+            lines.append("# HELP http_requests_total Requests by route and status code.")
+            lines.append("# TYPE http_requests_total counter")
+            for (route, status), count in sorted(self.statuses.items()):
+                lines.append(f'http_requests_total{{route="{route}",status="{status}"}} {count}')
+
+            lines.append("# HELP http_request_duration_seconds Request latency by route.")
+            lines.append("# TYPE http_request_duration_seconds histogram")
+            for route, histogram in sorted(self.routes.items()):
+                histogram_lines("http_request_duration_seconds", f'route="{route}"', histogram)
+
+            lines.append("# HELP request_stage_duration_seconds Time spent in each stage of a request.")
+            lines.append("# TYPE request_stage_duration_seconds histogram")
+            for (route, stage), histogram in sorted(self.stages.items()):
+                histogram_lines("request_stage_duration_seconds", f'route="{route}",stage="{stage}"', histogram)
+        return "\n".join(lines) + "\n"
+
+
+class SlowRequestProfiler:
+    """
+    Samples the serving thread's stack while requests are in flight and keeps
+    the collapsed stacks of requests slower than threshold_ms. Requests on
+    the same event loop share samples, so concurrent slow requests may show
+    each other's frames.
+    """
+
+    def __init__(self, threshold_ms: float, interval_ms: float = 5.0, keep: int = 20, max_depth: int = 30):
+        self.threshold_ms = threshold_ms
+        self.interval = interval_ms / 1000
+        self.max_depth = max_depth
+        self.slow_requests = deque(maxlen=keep)
+        self._active: Dict[int, Tuple[int, Counter]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._next_id = 0
+        threading.Thread(target=self._sample_loop, name="slow-request-profiler", daemon=True).start()
+
+    def start(self) -> int:
+        with self._lock:
+            self._next_id += 1
+            self._active[self._next_id] = (threading.get_ident(), Counter())
+        self._wake.set()
+        return self._next_id
+
+    def move(self, token: int, thread_id: int) -> Optional[int]:
+        """Sample another thread for this request (work handed to a pool); returns the previous one"""
+        with self._lock:
+            if token not in self._active:
+                return None
+            previous, samples = self._active[token]
+            self._active[token] = (thread_id, samples)
+            return previous
+
+    def finish(self, token: int, route: str, ms: float, stages: Optional[Dict[str, float]] = None) -> None:
+        with self._lock:
+            _, samples = self._active.pop(token, (None, Counter()))
+            if not self._active:
+                self._wake.clear()
+        if ms >= self.threshold_ms:
+            self.slow_requests.append({
+                'route': route,
+                'duration_ms': round(ms, 3),
+                'at': time.time(),
+                'stages': {name: round(stage_ms, 3) for name, stage_ms in (stages or {}).items()},
+                'samples': sum(samples.values()),
+                'stacks': [{'stack': stack, 'count': count} for stack, count in samples.most_common(10)],
+            })
+
+    def _collapse(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _sample_loop(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._active.values():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[self._collapse(frame)] += 1
+
+    def report(self) -> List[dict]:
+        return list(self.slow_requests)
+
+
+# Stage timer and profiler token of the request being served (set by LatencyMiddleware)
+_current_timer: contextvars.ContextVar = contextvars.ContextVar("stage_timer", default=None)
+_current_profile: contextvars.ContextVar = contextvars.ContextVar("profile", default=None)
+
+
+def stage_timer() -> StageTimer:
+    """The current request's StageTimer; stages recorded on it end up in the metrics"""
+    timer = _current_timer.get()
+    return timer if timer is not None else StageTimer()
+
+
+@contextmanager
+def follow_in_current_thread():
+    """Point the slow-request profiler at this thread while the request's work runs here"""
+    current = _current_profile.get()
+    if current is None:
+        yield
+        return
+    profiler, token = current
+    previous = profiler.move(token, threading.get_ident())
+    try:
+        yield
+    finally:
+        if previous is not None:
+            profiler.move(token, previous)
+
+
+class LatencyMiddleware:
+    """Plain ASGI middleware (no extra task per request) timing every HTTP request"""
+
+    def __init__(self, app, metrics: RequestMetrics, profiler: Optional[SlowRequestProfiler] = None):
+        self.app = app
+        self.metrics = metrics
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        timer = StageTimer()
+        reset = _current_timer.set(timer)
+        token = self.profiler.start() if self.profiler is not None else None
+        reset_profile = _current_profile.set((self.profiler, token)) if token is not None else None
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            _current_timer.reset(reset)
+            if reset_profile is not None:
+                _current_profile.reset(reset_profile)
+            # Route templates keep label cardinality bounded; unmatched paths share one label
+            route = scope.get('route')
+            route = route.path if route is not None else "unmatched"
+            self.metrics.observe(route, status, ms, timer.timings)
+            if token is not None:
+                self.profiler.finish(token, route, ms, timer.timings)
@@ -0,0 +1,180 @@
+"""
+Matrix Factorization Scoring Engine
+Extracts the SVD factor matrices once and scores a user against the whole
+catalog with a single matrix-vector product
+"""
+
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Factor model written by the training pipeline (backend/training.py)
+MF_MODEL_FILE = "mf_model.npz"
+
+
+def _float_matrix(values) -> np.ndarray:
+    """Keep float32/float64 arrays (incl. memory maps) as they are, convert the rest"""
+    values = np.asarray(values)
+    if values.dtype in (np.float32, np.float64) and values.flags['C_CONTIGUOUS']:
+        return values
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+class MFScorer:
+    """Biased matrix factorization scorer: r(u, i) = mu + b_u + b_i + p_u . q_i"""
+
+    def __init__(
+        self,
+        user_factors: Optional[np.ndarray],
+        item_factors: np.ndarray,
+        user_ids: Sequence,
+        item_ids: Sequence,
+        user_bias: Optional[np.ndarray] = None,
+        item_bias: Optional[np.ndarray] = None,
+        global_mean: float = 0.0,
+        rating_scale: Tuple[float, float] = (1.0, 5.0),
+    ):
+        self.item_factors = _float_matrix(item_factors)
+        self.user_factors = _float_matrix(user_factors) if user_factors is not None else None
+        self.user_bias = np.asarray(user_bias, dtype=np.float64) if user_bias is not None else None
+        self.item_bias = np.asarray(item_bias, dtype=np.float64) if item_bias is not None else None
+        self.global_mean = float(global_mean)
+        self.rating_scale = (float(rating_scale[0]), float(rating_scale[1]))
+        self.n_factors = self.item_factors.shape[1]
+
+        # Raw id -> inner id maps, built once instead of per prediction
+        self.user_index = {str(uid): i for i, uid in enumerate(user_ids)}
+        self.item_index = {str(iid): i for i, iid in enumerate(item_ids)}
+
+        # Catalog-aligned views, filled in by bind_catalog()
+        self.catalog_rows = None
+        self.catalog_factors = None
+        self.catalog_bias = None
+
+    @classmethod
+    def from_model(cls, model, user_embeddings: Optional[np.ndarray] = None) -> Optional["MFScorer"]:
+        """Build a scorer from a Surprise SVD or a sklearn TruncatedSVD model"""
+        if model is None:
+            return None
+
+        # Surprise SVD: pu, qi, bu, bi and the trainset id maps
+        if hasattr(model, 'pu') and hasattr(model, 'qi'):
+            trainset = model.trainset
+            biased = getattr(model, 'biased', True)
+            return cls(
+                user_factors=model.pu,
+                item_factors=model.qi,
+                user_ids=[trainset.to_raw_uid(i) for i in range(trainset.n_users)],
+                item_ids=[trainset.to_raw_iid(i) for i in range(trainset.n_items)],
+                user_bias=model.bu if biased else None,
+                item_bias=model.bi if biased else None,
+                global_mean=trainset.global_mean if biased else 0.0,
+                rating_scale=trainset.rating_scale,
+            )
+
+        # sklearn TruncatedSVD fitted on the user x item rating pivot (see notebook).
+        # Columns are the sorted MovieLens item ids, rows the sorted user ids.
+        if hasattr(model, 'components_'):
+            item_factors = np.asarray(model.components_).T
+            user_factors = None
+            if (
+                user_embeddings is not None
+                and np.ndim(user_embeddings) == 2
+                and np.shape(user_embeddings)[1] == item_factors.shape[1]
+            ):
+                user_factors = user_embeddings
+            n_users = len(user_factors) if user_factors is not None else 0
+            return cls(
+                user_factors=user_factors,
+                item_factors=item_factors,
+                user_ids=[str(i + 1) for i in range(n_users)],
+                item_ids=[str(i + 1) for i in range(item_factors.shape[0])],
+                rating_scale=(0.0, 5.0),
+            )
+
+        return None
+
+    def save(self, path: Path) -> None:
+        """Write the factors, biases and id maps as a pickle-free .npz"""
+        arrays = {
+            'item_factors': self.item_factors,
+            'item_ids': np.array(list(self.item_index), dtype=str),
+            'global_mean': np.float64(self.global_mean),
+            'rating_scale': np.array(self.rating_scale, dtype=np.float64),
+        }
+        if self.user_factors is not None:
+            arrays['user_factors'] = self.user_factors
+            arrays['user_ids'] = np.array(list(self.user_index), dtype=str)
+        if self.has_biases:
+            arrays['user_bias'] = self.user_bias
+            arrays['item_bias'] = self.item_bias
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["MFScorer"]:
+        """Scorer saved with save(), None if the file is missing"""
+        if not Path(path).exists():
+            return None
+        with np.load(path) as data:
+            return cls(
+                user_factors=data['user_factors'] if 'user_factors' in data else None,
+                item_factors=data['item_factors'],
+                user_ids=data['user_ids'] if 'user_ids' in data else [],
+                item_ids=data['item_ids'],
+                user_bias=data['user_bias'] if 'user_bias' in data else None,
+                item_bias=data['item_bias'] if 'item_bias' in data else None,
+                global_mean=float(data['global_mean']),
+                rating_scale=tuple(data['rating_scale']),
+            )
+
+    @property
+    def has_biases(self) -> bool:
+        return self.user_bias is not None and self.item_bias is not None
+
+    def bind_catalog(self, item_ids: Iterable) -> None:
+        """Precompute an item factor matrix aligned with the catalog row order"""
+        rows = np.array([self.item_index.get(str(iid), -1) for iid in item_ids], dtype=np.int64)
+        known = rows >= 0
+
+        factors = np.zeros((len(rows), self.n_factors), dtype=self.item_factors.dtype)
+        factors[known] = self.item_factors[rows[known]]
+        bias = np.zeros(len(rows), dtype=np.float64)
+        if self.item_bias is not None:
+            bias[known] = self.item_bias[rows[known]]
+
+        self.catalog_rows = rows
+        self.catalog_factors = factors
+        self.catalog_bias = bias
+
+    def score_catalog(self, user_id: str) -> Optional[np.ndarray]:
+        """
+        Score a user against every catalog item, normalized to 0-1.
+        Returns None when the model has nothing to say about this user.
+        """
+        if self.catalog_factors is None:
+            return None
+
+        inner = self.user_index.get(str(user_id)) if self.user_factors is not None else None
+        if inner is None and not self.has_biases:
+            return None
+
+        est = np.full(len(self.catalog_rows), self.global_mean, dtype=np.float64)
+        est += self.catalog_bias
+        if inner is not None:
+            est += self.catalog_factors @ self.user_factors[inner]
+            if self.user_bias is not None:
+                est += self.user_bias[inner]
+
+        low, high = self.rating_scale
+        return np.clip(est, low, high) / high
+
+    def score_rows(self, user_rows: np.ndarray) -> np.ndarray:
+        """Scores of many known users (inner rows) against the catalog, one row per user"""
+        est = self.user_factors[user_rows] @ self.catalog_factors.T
+        est += self.global_mean + self.catalog_bias
+        if self.user_bias is not None:
+            est += self.user_bias[user_rows, None]
+        low, high = self.rating_scale
+        return np.clip(est, low, high, out=est) / high
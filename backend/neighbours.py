@@ -0,0 +1,193 @@
+"""
+Item-to-Item Neighbour Table
+Offline build of the top-K most similar items per item (TF-IDF, genre and
+embedding similarity, blended), stored as a compact int32 index matrix plus
+a float16 score matrix that the backend memory-maps at startup.
+
+Rebuild after retraining with:  python -m backend.neighbours
+"""
+
+import json
+import pickle
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .ann import l2_normalize
+    from .artifacts import artifacts_version, catalog_checksum
+except ImportError:  # running from inside backend/ (uvicorn main:app)
+    from ann import l2_normalize
+    from artifacts import artifacts_version, catalog_checksum
+
+INDEX_FILE = "item_neighbours_idx.npy"
+SCORES_FILE = "item_neighbours_scores.npy"
+META_FILE = "item_neighbours.json"
+
+NEIGHBOURS_K = 50
+
+# Contribution of each similarity to the blended score
+BLEND_WEIGHTS = {
+    'tfidf': 0.3,
+    'genre': 0.5,
+    'embedding': 0.2,
+}
+
+
+def build_neighbour_table(
+    genre_matrix,
+    tfidf_matrix=None,
+    embeddings: Optional[np.ndarray] = None,
+    k: int = NEIGHBOURS_K,
+    block_size: Optional[int] = None,
+    weights: Optional[Dict[str, float]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Blend the available similarities and keep the top k per item.
+    Works in row blocks so memory stays at block_size x n_items; by default
+    the block is sized to keep that around 16M scores.
+    """
+    weights = dict(weights or BLEND_WEIGHTS)
+    if tfidf_matrix is None:
+        weights.pop('tfidf')
+    if embeddings is None:
+        weights.pop('embedding')
+    total = sum(weights.values())
+
+    genre_matrix = genre_matrix.tocsr().astype(np.float32)
+    genre_counts = np.asarray(genre_matrix.sum(axis=1)).ravel()
+    if tfidf_matrix is not None:
+        tfidf_matrix = tfidf_matrix.tocsr().astype(np.float32)
+    if embeddings is not None:
+        embeddings = l2_normalize(embeddings)
+
+    n_items = genre_matrix.shape[0]
+    block_size = block_size or max(1, min(1024, (1 << 24) // max(n_items, 1)))
+    k = min(k, n_items - 1)
+    indices = np.full((n_items, max(k, 0)), -1, dtype=np.int32)
+    scores = np.zeros((n_items, max(k, 0)), dtype=np.float16)
+    if k <= 0:
+        return indices, scores
+
+    for start in range(0, n_items, block_size):
+        stop = min(start + block_size, n_items)
+
+        inter = (genre_matrix[start:stop] @ genre_matrix.T).toarray()
+        union = genre_counts[start:stop, None] + genre_counts[None, :] - inter
+        block = weights['genre'] * (inter / np.maximum(union, 1))
+
+        if 'tfidf' in weights:
+            block += weights['tfidf'] * (tfidf_matrix[start:stop] @ tfidf_matrix.T).toarray()
+        if 'embedding' in weights:
+            block += weights['embedding'] * np.clip(embeddings[start:stop] @ embeddings.T, 0, 1)
+        block /= total
+
+        # An item is never its own neighbour
+        block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+
+        part = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        part_scores = np.take_along_axis(block, part, axis=1)
+        order = np.argsort(-part_scores, axis=1, kind='stable')
+        indices[start:stop] = np.take_along_axis(part, order, axis=1)
+        scores[start:stop] = np.take_along_axis(part_scores, order, axis=1)
+
+    return indices, scores
+
+
+def save_neighbour_table(models_dir: Path, indices: np.ndarray, scores: np.ndarray, item_ids) -> None:
+    """Write the table with the artifacts version and catalog it belongs to (export the artifacts first)"""
+    models_dir = Path(models_dir)
+    np.save(models_dir / INDEX_FILE, indices.astype(np.int32))
+    np.save(models_dir / SCORES_FILE, scores.astype(np.float16))
+    meta = {
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        'model_version': artifacts_version(models_dir),
+        'catalog': catalog_checksum(item_ids),
+        'items': int(indices.shape[0]),
+        'k': int(indices.shape[1]),
+    }
+    (models_dir / META_FILE).write_text(json.dumps(meta, indent=2))
+
+
+class NeighbourTable:
+    """Memory-mapped neighbour table; a lookup is a slice of one row"""
+
+    def __init__(self, indices: np.ndarray, scores: np.ndarray):
+        self.indices = indices
+        self.scores = scores
+        self.k = indices.shape[1]
+
+    @classmethod
+    def load(cls, models_dir: Path, item_ids, model_version: Optional[str]) -> Optional["NeighbourTable"]:
+        """Open the saved table, or None if missing or built for another model version or catalog"""
+        models_dir = Path(models_dir)
+        paths = [models_dir / name for name in (INDEX_FILE, SCORES_FILE, META_FILE)]
+        if not all(path.exists() for path in paths):
+            return None
+        try:
+            indices = np.load(paths[0], mmap_mode='r')
+            scores = np.load(paths[1], mmap_mode='r')
+            meta = json.loads(paths[2].read_text())
+        except Exception as e:
+            print(f"Error loading neighbour table: {e}")
+            return None
+        if indices.shape[0] != len(item_ids) or indices.shape != scores.shape:
+            print(f"Warning: neighbour table has {indices.shape[0]} rows, catalog has {len(item_ids)}; ignoring it")
+            return None
+        if meta.get('model_version') != model_version:
+            print(f"Warning: neighbour table was built for model {meta.get('model_version')}, "
+                  f"serving {model_version}; ignoring it until it is rebuilt")
+            return None
+        if meta.get('catalog') != catalog_checksum(item_ids):
+            print("Warning: neighbour table was built for another catalog; ignoring it until it is rebuilt")
+            return None
+        return cls(indices, scores)
+
+    def neighbours(self, row: int, k: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k neighbour rows and blended scores of an item, best first"""
+        k = self.k if k is None else min(k, self.k)
+        rows = np.asarray(self.indices[row, :k], dtype=np.int64)
+        scores = np.asarray(self.scores[row, :k], dtype=np.float64)
+        valid = rows >= 0
+        return rows[valid], scores[valid]
+
+
+def build_from_models_dir(models_dir: Path, k: int = NEIGHBOURS_K) -> None:
+    """Rebuild the neighbour table from the artifacts already in models_dir"""
+    import pandas as pd
+
+    try:
+        from .item_store import ItemStore
+    except ImportError:
+        from item_store import ItemStore
+
+    models_dir = Path(models_dir)
+    start = time.perf_counter()
+    items_df = pd.read_csv(models_dir / "items_metadata.csv")
+    store = ItemStore(items_df)
+
+    tfidf_matrix = None
+    tfidf_path = models_dir / "tfidf_vectorizer.pkl"
+    if tfidf_path.exists():
+        with open(tfidf_path, 'rb') as f:
+            tfidf = pickle.load(f)
+        tfidf_matrix = tfidf.transform(items_df['title'].fillna('') + " " + items_df['genres'].fillna(''))
+
+    embeddings = None
+    embeddings_path = models_dir / "item_embeddings.pkl"
+    if embeddings_path.exists():
+        with open(embeddings_path, 'rb') as f:
+            embeddings = np.asarray(pickle.load(f))
+        if len(embeddings) != store.size:
+            embeddings = None
+
+    indices, scores = build_neighbour_table(store.genre_matrix, tfidf_matrix, embeddings, k=k)
+    save_neighbour_table(models_dir, indices, scores, store.ids)
+    print(f"Built neighbour table for {store.size} items (k={indices.shape[1]}) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    build_from_models_dir(Path(__file__).parent.parent / "models")
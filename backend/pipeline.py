@@ -0,0 +1,107 @@
+"""
+Candidate Generation Pipeline
+Cheap retrieval sources (MF, popularity, genre affinity, item neighbours) are
+unioned into a few hundred candidates before features and ranking run
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .ann import top_k_indices
+except ImportError:  # running from inside backend/ (uvicorn main:app)
+    from ann import top_k_indices
+
+# Candidates pulled from each source before deduplication
+DEFAULT_BUDGETS = {
+    'mf': 200,
+    'popularity': 100,
+    'genre': 100,
+    'neighbours': 100,
+}
+
+
+def parse_budgets(spec: str) -> Dict[str, int]:
+    """Parse "mf=200,popularity=50" overrides on top of the default budgets"""
+    budgets = dict(DEFAULT_BUDGETS)
+    for part in spec.split(','):
+        if '=' not in part:
+            continue
+        name, value = part.split('=', 1)
+        name = name.strip()
+        if name in budgets:
+            budgets[name] = max(0, int(value))
+    return budgets
+
+
+class StageTimer:
+    """Wall-clock timings (ms) for each named stage of a request"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def server_timing(self) -> str:
+        """Render as a Server-Timing header value"""
+        return ", ".join(f"{name};dur={ms:.2f}" for name, ms in self.timings.items())
+
+
+class CandidateGenerator:
+    """Union of per-source top-K candidate lists for one user"""
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, seed_items: int = 5):
+        self.budgets = dict(budgets or DEFAULT_BUDGETS)
+        self.seed_items = seed_items
+
+    def generate(
+        self,
+        store,
+        mf_scores: Optional[np.ndarray] = None,
+        ann_index=None,
+        min_candidates: int = 0,
+    ) -> Tuple[np.ndarray, Dict[str, int]]:
+        """Return deduplicated candidate rows and how many each source contributed"""
+        pools = {}
+
+        if mf_scores is not None:
+            if self.budgets.get('mf'):
+                pools['mf'] = top_k_indices(mf_scores, self.budgets['mf'])
+            if self.budgets.get('genre'):
+                pools['genre'] = top_k_indices(self._genre_affinity(store, mf_scores), self.budgets['genre'])
+            if ann_index is not None and self.budgets.get('neighbours'):
+                pools['neighbours'] = self._neighbours(ann_index, mf_scores, self.budgets['neighbours'])
+
+        # Popularity always runs so unknown users still get a full list
+        popular = max(self.budgets.get('popularity', 0), min_candidates)
+        if popular:
+            pools['popularity'] = store.sort_orders['popularity'][:popular]
+
+        if not pools:
+            return np.empty(0, dtype=np.int64), {}
+        rows = np.unique(np.concatenate(list(pools.values())).astype(np.int64))
+        return rows, {name: len(pool) for name, pool in pools.items()}
+
+    def _genre_affinity(self, store, mf_scores: np.ndarray) -> np.ndarray:
+        """Score items by the user's mean predicted rating for each of their genres"""
+        genre_items = np.asarray(store.genre_matrix.sum(axis=0)).ravel()
+        genre_means = (store.genre_matrix.T @ mf_scores) / np.maximum(genre_items, 1)
+        affinity = genre_means - mf_scores.mean()
+        return (store.genre_matrix @ affinity) / np.maximum(store.genre_counts, 1)
+
+    def _neighbours(self, ann_index, mf_scores: np.ndarray, budget: int) -> np.ndarray:
+        """Nearest neighbours of the user's top MF items"""
+        seeds = top_k_indices(mf_scores, self.seed_items)
+        if len(seeds) == 0:
+            return np.empty(0, dtype=np.int64)
+        per_seed = max(1, budget // len(seeds))
+        return np.concatenate([ann_index.search_item(seed, per_seed)[0] for seed in seeds])
@@ -0,0 +1,126 @@
+"""
+Ranking Stage
+Scores a whole candidate set in one call: the ranking model sees an (N, 6)
+feature matrix instead of one reshaped row per item
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+# Column order the ranking model was trained on (see regenerate_models.py)
+RANKING_FEATURES = [
+    'svdScore',
+    'contentSimilarity',
+    'userItemSimilarity',
+    'popularity',
+    'recency',
+    'demographicMatch',
+]
+
+# Weighted average used when no ranking model is available
+FALLBACK_WEIGHTS = {
+    'svdScore': 0.3,
+    'contentSimilarity': 0.2,
+    'userItemSimilarity': 0.2,
+    'popularity': 0.15,
+    'recency': 0.05,
+    'demographicMatch': 0.1,
+}
+
+DEFAULT_FEATURE_VALUE = 0.5
+
+
+def feature_matrix(features: Dict[str, np.ndarray], n_rows: int) -> np.ndarray:
+    """Stack feature columns into an (N, 6) matrix, filling missing ones with 0.5"""
+    X = np.full((n_rows, len(RANKING_FEATURES)), DEFAULT_FEATURE_VALUE, dtype=np.float64)
+    for col, name in enumerate(RANKING_FEATURES):
+        values = features.get(name)
+        if values is not None:
+            X[:, col] = values
+    return X
+
+
+class Ranker:
+    """Base ranking stage: maps an (N, 6) feature matrix to N scores in [0, 1]"""
+
+    name = 'base'
+
+    def score_matrix(self, X: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def score(self, features: Dict[str, np.ndarray], n_rows: int) -> np.ndarray:
+        return np.clip(self.score_matrix(feature_matrix(features, n_rows)), 0, 1)
+
+
+class WeightedRanker(Ranker):
+    """Fixed weighted average of the features"""
+
+    name = 'weighted'
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        weights = weights or FALLBACK_WEIGHTS
+        self.weights = np.array([weights.get(name, 0.0) for name in RANKING_FEATURES])
+
+    def score_matrix(self, X: np.ndarray) -> np.ndarray:
+        return X @ self.weights
+
+
+class LinearRanker(Ranker):
+    """
+    Linear model evaluated directly from its coefficients, skipping sklearn's
+    per-call input validation. Logistic models go through a sigmoid.
+    """
+
+    name = 'linear'
+
+    def __init__(self, coef: np.ndarray, intercept: float, logistic: bool = True):
+        self.coef = np.asarray(coef, dtype=np.float64).ravel()
+        self.intercept = float(intercept)
+        self.logistic = logistic
+
+    def score_matrix(self, X: np.ndarray) -> np.ndarray:
+        z = X @ self.coef + self.intercept
+        if self.logistic:
+            return 1.0 / (1.0 + np.exp(-z))
+        return z
+
+
+class EstimatorRanker(Ranker):
+    """Any sklearn-style estimator (e.g. a GBDT), called once per candidate set"""
+
+    name = 'estimator'
+
+    def __init__(self, model, fallback: Optional[Ranker] = None):
+        self.model = model
+        self.fallback = fallback or WeightedRanker()
+
+    def score_matrix(self, X: np.ndarray) -> np.ndarray:
+        try:
+            if hasattr(self.model, 'predict_proba'):
+                return self.model.predict_proba(X)[:, 1]
+            return np.asarray(self.model.predict(X), dtype=np.float64)
+        except Exception as e:
+            print(f"Ranking error: {e}")
+            return self.fallback.score_matrix(X)
+
+
+def make_ranker(model) -> Ranker:
+    """Pick the cheapest ranking stage that reproduces the model's scores"""
+    if model is None:
+        return WeightedRanker()
+
+    coef = getattr(model, 'coef_', None)
+    intercept = getattr(model, 'intercept_', None)
+    if coef is not None and getattr(model, 'n_features_in_', len(RANKING_FEATURES)) == len(RANKING_FEATURES):
+        coef = np.asarray(coef)
+        intercept = np.ravel(intercept if intercept is not None else [0.0])
+        if hasattr(model, 'predict_proba'):
+            # Binary one-vs-rest only; multinomial/multiclass go through the estimator
+            binary = coef.ndim == 2 and coef.shape[0] == 1 and len(getattr(model, 'classes_', [])) == 2
+            if binary and getattr(model, 'multi_class', 'auto') in ('auto', 'ovr'):
+                return LinearRanker(coef[0], intercept[0], logistic=True)
+        elif coef.ndim == 1 or coef.shape[0] == 1:
+            return LinearRanker(coef.ravel(), intercept[0], logistic=False)
+
+    return EstimatorRanker(model)
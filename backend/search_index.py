@@ -0,0 +1,93 @@
+"""
+Inverted Index
+Token -> sorted item rows, stored as one flat posting array with offsets over
+a sorted vocabulary, so exact and prefix (typeahead) lookups are a binary
+search plus a slice
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Above this share of the catalog, unions use a dense mask instead of a sort
+_DENSE_UNION_FRACTION = 0.125
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens with accents stripped ("Amélie" -> "amelie")"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _TOKEN_RE.findall(text)
+
+
+def unique_rows(rows: np.ndarray, size: int) -> np.ndarray:
+    """Sorted unique rows out of concatenated posting lists"""
+    if len(rows) > size * _DENSE_UNION_FRACTION:
+        mask = np.zeros(size, dtype=bool)
+        mask[rows] = True
+        return np.flatnonzero(mask).astype(np.int32)
+    return np.unique(rows)
+
+
+def intersect_rows(postings: List[np.ndarray]) -> np.ndarray:
+    """Intersection of sorted unique row arrays, smallest first"""
+    postings = sorted(postings, key=len)
+    rows = postings[0]
+    for other in postings[1:]:
+        if len(rows) == 0:
+            break
+        rows = np.intersect1d(rows, other, assume_unique=True)
+    return rows
+
+
+class PostingIndex:
+    """Sorted vocabulary with contiguous posting lists of row ids"""
+
+    def __init__(self, documents: Iterable[Iterable[str]], size: int):
+        self.size = size
+        postings: Dict[str, List[int]] = {}
+        for row, terms in enumerate(documents):
+            for term in set(terms):
+                postings.setdefault(term, []).append(row)
+
+        terms = sorted(postings)
+        self.vocabulary = np.array(terms, dtype=str) if terms else np.empty(0, dtype='<U1')
+        lengths = np.array([len(postings[t]) for t in terms], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        # Rows were appended in increasing order, so each list is already sorted
+        self.rows = np.fromiter(
+            (row for t in terms for row in postings[t]), dtype=np.int32, count=int(self.offsets[-1])
+        )
+
+    def _span(self, lo: int, hi: int) -> np.ndarray:
+        return self.rows[self.offsets[lo]:self.offsets[hi]]
+
+    def lookup(self, term: str) -> np.ndarray:
+        """Rows containing exactly this term"""
+        i = int(np.searchsorted(self.vocabulary, term))
+        if i < len(self.vocabulary) and self.vocabulary[i] == term:
+            return self._span(i, i + 1)
+        return np.empty(0, dtype=np.int32)
+
+    def prefix(self, prefix: str) -> np.ndarray:
+        """Rows containing any term that starts with prefix"""
+        lo = int(np.searchsorted(self.vocabulary, prefix, side='left'))
+        hi = int(np.searchsorted(self.vocabulary, prefix + '\U0010ffff', side='left'))
+        if hi - lo <= 1:
+            return self._span(lo, hi)
+        # Matching terms are adjacent in the vocabulary, so their postings are one slice
+        return unique_rows(self._span(lo, hi), self.size)
+
+    def search(self, query: str) -> Optional[np.ndarray]:
+        """
+        Rows matching every token of query, each as a prefix (typeahead).
+        None when the query has no tokens.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        return intersect_rows([self.prefix(token) for token in dict.fromkeys(tokens)])
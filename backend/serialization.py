@@ -0,0 +1,42 @@
+"""
+Response Serialization
+Fast JSON encoding for large payloads that skips response-model validation:
+orjson when installed, the stdlib encoder (compact separators) otherwise.
+Immutable parts of a response (item payloads) are rendered once and spliced
+in as bytes.
+"""
+
+import json
+from typing import Any, Iterable
+
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # optional dependency; the stdlib encoder is ~5x slower
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Encode plain Python data (dicts, lists, str, int, float) to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_array(fragments: Iterable[bytes]) -> bytes:
+    """JSON array from already-encoded elements"""
+    return b"[" + b",".join(fragments) + b"]"
+
+
+class RawJSONResponse(Response):
+    """Response for a body that is already JSON bytes"""
+
+    media_type = "application/json"
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps(); content must already be plain data"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
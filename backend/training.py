@@ -0,0 +1,583 @@
+"""
+Training Pipeline
+Builds the model set the backend serves from a MovieLens ratings file, in
+stages: ratings (streamed in chunks into a CSR matrix with a held-out
+sample), items (catalog from the movies file and rating counts), content
+(TF-IDF), demographics (encoders and affinity table, given a users file),
+mf (biased ALS, see als.py), ranker (logistic regression on the served
+features of held-out ratings), artifacts, neighbours and optionally the
+user top-N table. Each stage stores a fingerprint of its inputs and
+parameters in the cache directory and is skipped while they are unchanged.
+Wall time per stage goes to models/training_report.json.
+
+    python -m backend.training --ratings ml-25m/ratings.csv --movies ml-25m/movies.csv
+    python -m backend.training --ratings ml-1m/ratings.dat --movies ml-1m/movies.dat --users ml-1m/users.dat --topn
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+try:
+    from .als import ALS_FACTORS, ALS_ITERATIONS, ALS_REGULARIZATION, rmse, train_als
+    from .ann import l2_normalize
+    from .artifacts import ARTIFACTS_DIRNAME, MANIFEST_FILE, export_artifacts
+    from .batch import block_size_for, row_top_k
+    from .content import ContentEngine, l2_normalize_rows
+    from .demographics import AFFINITY_FILE, USERS_FILE, LabelIndex, build_affinity_table, save_users
+    from .evaluation import RATINGS_CHUNK, RELEVANCE_THRESHOLD, iter_ratings
+    from .item_store import ItemStore
+    from .mf import MF_MODEL_FILE, MFScorer
+    from .neighbours import INDEX_FILE as NEIGHBOURS_INDEX_FILE, META_FILE as NEIGHBOURS_META_FILE
+    from .neighbours import SCORES_FILE as NEIGHBOURS_SCORES_FILE, build_from_models_dir
+    from .ranking import DEFAULT_FEATURE_VALUE, RANKING_FEATURES
+    from .user_topn import INDEX_FILE as TOPN_INDEX_FILE, META_FILE as TOPN_META_FILE, TOPN, build_user_topn
+except ImportError:  # running from inside backend/ (uvicorn main:app)
+    from als import ALS_FACTORS, ALS_ITERATIONS, ALS_REGULARIZATION, rmse, train_als
+    from ann import l2_normalize
+    from artifacts import ARTIFACTS_DIRNAME, MANIFEST_FILE, export_artifacts
+    from batch import block_size_for, row_top_k
+    from content import ContentEngine, l2_normalize_rows
+    from demographics import AFFINITY_FILE, USERS_FILE, LabelIndex, build_affinity_table, save_users
+    from evaluation import RATINGS_CHUNK, RELEVANCE_THRESHOLD, iter_ratings
+    from item_store import ItemStore
+    from mf import MF_MODEL_FILE, MFScorer
+    from neighbours import INDEX_FILE as NEIGHBOURS_INDEX_FILE, META_FILE as NEIGHBOURS_META_FILE
+    from neighbours import SCORES_FILE as NEIGHBOURS_SCORES_FILE, build_from_models_dir
+    from ranking import DEFAULT_FEATURE_VALUE, RANKING_FEATURES
+    from user_topn import INDEX_FILE as TOPN_INDEX_FILE, META_FILE as TOPN_META_FILE, TOPN, build_user_topn
+
+# Bump when a stage's output format or algorithm changes, to invalidate the cache
+PIPELINE_VERSION = 1
+REPORT_FILE = "training_report.json"
+CACHE_DIRNAME = ".training_cache"
+RATINGS_FILE = "ratings.npz"
+
+STAGES = ('ratings', 'items', 'content', 'demographics', 'mf', 'ranker', 'artifacts', 'neighbours', 'topn')
+
+# Share of ratings held out of MF training; the ranker learns from them
+HOLDOUT = 0.01
+# Held-out ratings used for the ranker (as many random negatives are added)
+RANKER_SAMPLES = 200_000
+# Users they come from; each costs a full-catalog scoring for its content profile
+RANKER_USERS = 20_000
+# Top MF items per user averaged into the content profile (main.CONTENT_PROFILE_ITEMS)
+PROFILE_ITEMS = 5
+
+# ml-100k u.item flags these genres in columns 5..23
+ML100K_GENRES = [
+    "unknown", "Action", "Adventure", "Animation", "Children's", "Comedy", "Crime", "Documentary", "Drama",
+    "Fantasy", "Film-Noir", "Horror", "Musical", "Mystery", "Romance", "Sci-Fi", "Thriller", "War", "Western",
+]
+# ml-1m users.dat stores occupations as these codes
+ML1M_OCCUPATIONS = [
+    "other", "academic/educator", "artist", "clerical/admin", "college/grad student", "customer service",
+    "doctor/health care", "executive/managerial", "farmer", "homemaker", "K-12 student", "lawyer", "programmer",
+    "retired", "sales/marketing", "scientist", "self-employed", "technician/engineer", "tradesman/craftsman",
+    "unemployed", "writer",
+]
+YEAR_SUFFIX = re.compile(r"\s*\((\d{4})\)\s*$")
+
+
+# ===== Stage Cache =====
+
+def file_stamp(path: Optional[Path]) -> Optional[dict]:
+    """Identity of an input file for fingerprints (size and mtime, not a full hash)"""
+    if path is None:
+        return None
+    stat = Path(path).stat()
+    return {'path': str(Path(path).resolve()), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class StageRunner:
+    """Runs stages whose fingerprint changed or whose outputs are missing, and times them"""
+
+    def __init__(self, cache_dir: Path, force: Sequence[str] = ()):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.force = set(force)
+        # Stage -> id of the build its outputs came from
+        self.builds: Dict[str, str] = {}
+        self.report: List[dict] = []
+
+    def run(self, name: str, inputs: dict, outputs: Sequence[Path], build: Callable[[], dict]) -> None:
+        """
+        inputs are the stage parameters and file stamps; upstream stages are
+        referenced by name. build() returns the stage's details for the report.
+        """
+        inputs = dict(inputs)
+        inputs['upstream'] = {stage: self.builds[stage] for stage in inputs.pop('after', ())}
+        key = json.dumps({'stage': name, 'version': PIPELINE_VERSION, 'inputs': inputs}, sort_keys=True, default=str)
+        fingerprint = hashlib.sha256(key.encode()).hexdigest()[:16]
+
+        record_path = self.cache_dir / f"{name}.json"
+        record = json.loads(record_path.read_text()) if record_path.exists() else {}
+        fresh = (
+            record.get('fingerprint') == fingerprint and 'build' in record
+            and all(Path(p).exists() for p in outputs)
+            and name not in self.force and 'all' not in self.force
+        )
+        if fresh:
+            print(f"[{name}] up to date ({fingerprint}), skipped")
+            self.builds[name] = record['build']
+            self.report.append({'stage': name, 'status': 'cached', 'seconds': 0.0,
+                                'built_seconds': record.get('seconds'), 'details': record.get('details', {})})
+            return
+
+        print(f"[{name}] running...")
+        began = time.perf_counter()
+        details = build() or {}
+        seconds = round(time.perf_counter() - began, 3)
+        # Downstream stages depend on this build, so a forced rebuild invalidates them too
+        self.builds[name] = f"{fingerprint}-{time.time_ns():x}"
+        record = {'fingerprint': fingerprint, 'build': self.builds[name], 'seconds': seconds, 'details': details,
+                  'completed_at': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+        record_path.write_text(json.dumps(record, indent=2))
+        print(f"[{name}] done in {seconds:.2f}s")
+        self.report.append({'stage': name, 'status': 'built', 'seconds': seconds, 'details': details})
+
+
+# ===== Stages =====
+
+def build_ratings(ratings_path: Path, output: Path, holdout: float, seed: int, chunk_size: int = RATINGS_CHUNK) -> dict:
+    """Stream the ratings file into a train CSR (dense user/item rows) plus held-out triples"""
+    users, items, values = [], [], []
+    for chunk in iter_ratings(ratings_path, chunk_size):
+        users.append(chunk['user_id'].to_numpy(dtype=np.int64))
+        items.append(chunk['item_id'].to_numpy(dtype=np.int64))
+        values.append(chunk['rating'].to_numpy(dtype=np.float32))
+    users, items, values = np.concatenate(users), np.concatenate(items), np.concatenate(values)
+
+    user_ids, user_rows = np.unique(users, return_inverse=True)
+    item_ids, item_rows = np.unique(items, return_inverse=True)
+    user_rows, item_rows = user_rows.astype(np.int32), item_rows.astype(np.int32)
+    del users, items
+
+    # Catalog statistics come from every rating, held out or not
+    item_counts = np.bincount(item_rows, minlength=len(item_ids))
+    item_sums = np.bincount(item_rows, weights=values, minlength=len(item_ids))
+
+    test = np.random.RandomState(seed).rand(len(values)) < holdout
+    train = sparse.csr_matrix(
+        (values[~test], (user_rows[~test], item_rows[~test])), shape=(len(user_ids), len(item_ids))
+    )
+    with open(output, 'wb') as f:
+        np.savez(
+            f,
+            indptr=train.indptr, indices=train.indices, data=train.data,
+            user_ids=user_ids, item_ids=item_ids, item_counts=item_counts, item_sums=item_sums,
+            test_users=user_rows[test], test_items=item_rows[test], test_ratings=values[test],
+        )
+    return {'ratings': int(len(values)), 'train': int(train.nnz), 'holdout': int(test.sum()),
+            'users': int(len(user_ids)), 'items': int(len(item_ids))}
+
+
+def load_rating_data(path: Path) -> dict:
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files}
+    arrays['train'] = sparse.csr_matrix(
+        (arrays.pop('data'), arrays.pop('indices'), arrays.pop('indptr')),
+        shape=(len(arrays['user_ids']), len(arrays['item_ids'])),
+    )
+    return arrays
+
+
+def read_movies(path: Path) -> pd.DataFrame:
+    """id, title and pipe-separated genres from movies.csv, movies.dat or ml-100k u.item"""
+    path = Path(path)
+    if path.suffix == ".csv":
+        movies = pd.read_csv(path)
+        movies.columns = ['id', 'title', 'genres'] + list(movies.columns[3:])
+    elif path.suffix == ".dat":
+        movies = pd.read_csv(path, sep="::", engine="python", header=None, names=['id', 'title', 'genres'],
+                             encoding="latin-1")
+    else:
+        movies = pd.read_csv(path, sep="|", header=None, encoding="latin-1")
+        flags = movies.iloc[:, 5:5 + len(ML100K_GENRES)].to_numpy(dtype=bool)
+        movies = pd.DataFrame({
+            'id': movies[0],
+            'title': movies[1],
+            'genres': ["|".join(g for g, on in zip(ML100K_GENRES, row) if on) for row in flags],
+        })
+    movies['genres'] = movies['genres'].fillna('').replace("(no genres listed)", "")
+    return movies[['id', 'title', 'genres']].drop_duplicates('id')
+
+
+def build_items(ratings_file: Path, movies_path: Optional[Path], output: Path) -> dict:
+    """Catalog of the rated items in model order: titles and genres, year, popularity and votes"""
+    with np.load(ratings_file) as data:
+        item_ids, counts, sums = data['item_ids'], data['item_counts'], data['item_sums']
+        rating_max = float(data['data'].max())
+
+    items = pd.DataFrame({'id': item_ids})
+    if movies_path is not None:
+        items = items.merge(read_movies(movies_path), on='id', how='left')
+    else:
+        items['title'], items['genres'] = None, ''
+    described = int(items['title'].notna().sum())
+    items['title'] = items['title'].fillna(pd.Series([f"Item {i}" for i in item_ids]))
+    items['genres'] = items['genres'].fillna('')
+
+    # "Toy Story (1995)" -> title "Toy Story", year 1995
+    years = items['title'].str.extract(YEAR_SUFFIX, expand=False).astype(float)
+    items['title'] = items['title'].str.replace(YEAR_SUFFIX, "", regex=True)
+    items['year'] = years.fillna(years.median() if years.notna().any() else 2000).astype(int)
+
+    items['popularity'] = 100 * np.log1p(counts) / np.log1p(max(counts.max(), 1))
+    items['description'] = items['genres'].str.replace("|", ", ", regex=False)
+    items['vote_average'] = np.where(counts > 0, sums / np.maximum(counts, 1), 0) * 10 / rating_max
+    items['vote_count'] = counts
+    items = items[['id', 'title', 'genres', 'popularity', 'year', 'description', 'vote_average', 'vote_count']]
+    items.to_csv(output, index=False)
+    return {'items': len(items), 'with_metadata': described}
+
+
+def item_text(items_df: pd.DataFrame) -> pd.Series:
+    return items_df['title'].fillna('') + " " + items_df['genres'].fillna('')
+
+
+def build_content(items_path: Path, output: Path) -> dict:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    tfidf = TfidfVectorizer(stop_words='english')
+    tfidf.fit(item_text(pd.read_csv(items_path)))
+    with open(output, 'wb') as f:
+        pickle.dump(tfidf, f)
+    return {'terms': len(tfidf.vocabulary_)}
+
+
+def read_users(path: Path) -> pd.DataFrame:
+    """id, gender and occupation from ml-100k u.user or ml-1m users.dat"""
+    path = Path(path)
+    if path.suffix == ".dat":
+        users = pd.read_csv(path, sep="::", engine="python", header=None,
+                            names=['id', 'gender', 'age', 'occupation', 'zip'])
+        users['occupation'] = users['occupation'].map(dict(enumerate(ML1M_OCCUPATIONS)))
+    else:
+        users = pd.read_csv(path, sep="|", header=None, names=['id', 'age', 'gender', 'occupation', 'zip'])
+    users['gender'] = users['gender'].map({'M': 'male', 'F': 'female'})
+    return users[['id', 'gender', 'occupation']].dropna()
+
+
+def user_codes(users: pd.DataFrame, user_ids: np.ndarray, genders: LabelIndex, occupations: LabelIndex):
+    """Gender and occupation codes of the model's users in inner order (-1 when unknown)"""
+    known = users.set_index('id').reindex(user_ids)
+    encode = lambda index, labels: np.array(
+        [index.encode(label) if isinstance(label, str) else -1 for label in labels], dtype=np.int64
+    )
+    return encode(genders, known['gender']), encode(occupations, known['occupation'])
+
+
+def build_demographics(ratings_file: Path, users_path: Optional[Path], models_dir: Path) -> dict:
+    """
+    Gender/occupation encoders, the (gender x occupation x item) affinity
+    table from the train ratings and the users' labels for serving; without a
+    users file a stale table is removed
+    """
+    from sklearn.preprocessing import LabelEncoder
+
+    affinity_path = models_dir / AFFINITY_FILE
+    if users_path is None:
+        affinity_path.unlink(missing_ok=True)
+        (models_dir / USERS_FILE).unlink(missing_ok=True)
+        return {'users': 0}
+
+    users = read_users(users_path)
+    encoders = {}
+    for name in ('gender', 'occupation'):
+        encoders[name] = LabelEncoder().fit(sorted(users[name].unique()))
+        with open(models_dir / f"{name}_encoder.pkl", 'wb') as f:
+            pickle.dump(encoders[name], f)
+    genders, occupations = LabelIndex.from_encoder(encoders['gender']), LabelIndex.from_encoder(encoders['occupation'])
+
+    data = load_rating_data(ratings_file)
+    gender_codes, occupation_codes = user_codes(users, data['user_ids'], genders, occupations)
+    table = build_affinity_table(
+        data['train'], gender_codes, occupation_codes, len(genders), len(occupations), RELEVANCE_THRESHOLD
+    )
+    np.save(affinity_path, table)
+    save_users(models_dir / USERS_FILE, users['id'], users['gender'], users['occupation'])
+    return {
+        'users': int((gender_codes >= 0).sum()),
+        'genders': genders.classes,
+        'occupations': len(occupations),
+        'table_mb': round(table.nbytes / 2**20, 2),
+    }
+
+
+def build_mf(ratings_file: Path, models_dir: Path, factors: int, iterations: int, regularization: float,
+             workers: int, seed: int) -> dict:
+    """ALS on the train ratings; writes the MF model and the served user/item embeddings"""
+    data = load_rating_data(ratings_file)
+    history: List[float] = []
+    scorer = train_als(
+        data['train'], data['user_ids'], data['item_ids'], factors=factors, iterations=iterations,
+        regularization=regularization, workers=workers, seed=seed, history=history,
+    )
+    scorer.save(models_dir / MF_MODEL_FILE)
+
+    # Embedding rows follow the raw MovieLens user ids 1..n (see EmbeddingScorer); gaps stay zero
+    user_ids = data['user_ids']
+    user_embeddings = np.zeros((int(user_ids.max()), factors), dtype=np.float32)
+    user_embeddings[user_ids - 1] = scorer.user_factors
+    with open(models_dir / "user_embeddings.pkl", 'wb') as f:
+        pickle.dump(user_embeddings, f)
+    with open(models_dir / "item_embeddings.pkl", 'wb') as f:
+        pickle.dump(scorer.item_factors, f)
+
+    # A top-N table from the previous model would keep being served
+    for name in (TOPN_INDEX_FILE, TOPN_META_FILE):
+        (models_dir / name).unlink(missing_ok=True)
+
+    return {
+        'factors': factors,
+        'iterations': iterations,
+        'regularization': regularization,
+        'workers': workers,
+        'seconds_per_iteration': [round(s, 3) for s in history],
+        'train_rmse': round(rmse(scorer, *_coo(data['train'])), 4),
+        'holdout_rmse': round(rmse(scorer, data['test_users'], data['test_items'], data['test_ratings']), 4),
+    }
+
+
+def _coo(matrix: sparse.csr_matrix):
+    rows = np.repeat(np.arange(matrix.shape[0], dtype=np.int32), np.diff(matrix.indptr))
+    return rows, matrix.indices, matrix.data
+
+
+def ranking_features(scorer: MFScorer, store: ItemStore, content: ContentEngine,
+                     users: np.ndarray, items: np.ndarray, demographic: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    The serving features (RANKING_FEATURES order) for (inner user, catalog row)
+    pairs, computed the way recommend_for_user does for a known user.
+    demographic holds the pairs' group affinities when users have demographics.
+    """
+    low, high = scorer.rating_scale
+    est = np.einsum('ij,ij->i', scorer.user_factors[users], scorer.catalog_factors[items])
+    est += scorer.global_mean + scorer.catalog_bias[items] + scorer.user_bias[users]
+    svd = np.clip(est, low, high) / high
+
+    # Content profile: score-weighted TF-IDF centroid of each user's top MF items
+    unique_users, positions = np.unique(users, return_inverse=True)
+    weights, block_size = [], block_size_for(store.size)
+    for start in range(0, len(unique_users), block_size):
+        block = unique_users[start:start + block_size]
+        rows, scores = row_top_k(scorer.score_rows(block), PROFILE_ITEMS)
+        weights.append(sparse.csr_matrix(
+            (scores.ravel(), rows.ravel(), np.arange(0, rows.size + 1, rows.shape[1])),
+            shape=(len(block), store.size),
+        ))
+    profiles = l2_normalize_rows(sparse.vstack(weights) @ content.matrix)
+    content_similarity = np.asarray(profiles[positions].multiply(content.matrix[items]).sum(axis=1)).ravel()
+
+    user_vectors = l2_normalize(scorer.user_factors[users])
+    item_vectors = l2_normalize(scorer.catalog_factors[items])
+    user_item = np.clip(np.einsum('ij,ij->i', user_vectors, item_vectors), 0, 1)
+
+    features = {
+        'svdScore': svd,
+        'contentSimilarity': content_similarity,
+        'userItemSimilarity': user_item,
+        'popularity': store.popularity_norm[items],
+        'recency': store.recency[items],
+        'demographicMatch': demographic if demographic is not None else np.full(len(users), DEFAULT_FEATURE_VALUE),
+    }
+    return np.column_stack([features[name] for name in RANKING_FEATURES])
+
+
+def build_ranker(ratings_file: Path, models_dir: Path, users_path: Optional[Path], samples: int, seed: int) -> dict:
+    """
+    Logistic regression on held-out ratings: liked (>= RELEVANCE_THRESHOLD)
+    against disliked ones and as many random catalog items
+    """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import roc_auc_score
+
+    with np.load(ratings_file) as data:
+        users, items, ratings = data['test_users'], data['test_items'], data['test_ratings']
+    if len(users) == 0:
+        raise ValueError("No held-out ratings to train the ranker on; use a holdout > 0")
+
+    items_df = pd.read_csv(models_dir / "items_metadata.csv")
+    store = ItemStore(items_df)
+    with open(models_dir / "tfidf_vectorizer.pkl", 'rb') as f:
+        content = ContentEngine(pickle.load(f).transform(item_text(items_df)))
+    scorer = MFScorer.load(models_dir / MF_MODEL_FILE)
+    scorer.bind_catalog(items_df['id'])
+
+    rng = np.random.RandomState(seed)
+    unique_users = np.unique(users)
+    if len(unique_users) > RANKER_USERS:
+        keep = np.isin(users, rng.choice(unique_users, RANKER_USERS, replace=False))
+        users, items, ratings = users[keep], items[keep], ratings[keep]
+    if len(users) > samples:
+        keep = rng.choice(len(users), samples, replace=False)
+        users, items, ratings = users[keep], items[keep], ratings[keep]
+    # Inner item ids are the catalog rows: the items stage writes the catalog in model order
+    users = np.concatenate([users, users])
+    items = np.concatenate([items, rng.randint(0, store.size, len(items))])
+    labels = np.concatenate([ratings >= RELEVANCE_THRESHOLD, np.zeros(len(ratings), dtype=bool)]).astype(int)
+
+    demographic = None
+    if users_path is not None and (models_dir / AFFINITY_FILE).exists():
+        genders, occupations = (
+            LabelIndex.from_encoder(pickle.loads((models_dir / f"{name}_encoder.pkl").read_bytes()))
+            for name in ('gender', 'occupation')
+        )
+        with np.load(ratings_file) as data:
+            user_ids = data['user_ids']
+        gender_codes, occupation_codes = user_codes(read_users(users_path), user_ids, genders, occupations)
+        table = np.load(models_dir / AFFINITY_FILE)
+        demographic = table[gender_codes[users], occupation_codes[users], items].astype(np.float64)
+        # Users without demographics get the default value, as they do when served
+        known = (gender_codes[users] >= 0) & (occupation_codes[users] >= 0)
+        demographic[~known] = DEFAULT_FEATURE_VALUE
+
+    X = ranking_features(scorer, store, content, users, items, demographic)
+    test = rng.rand(len(labels)) < 0.2
+    model = LogisticRegression(max_iter=1000)
+    model.fit(X[~test], labels[~test])
+    # Features that never vary here (demographics) get no weight at serving time
+    constant = X.std(axis=0) == 0
+    model.intercept_ += model.coef_[:, constant] @ X[0, constant]
+    model.coef_[:, constant] = 0.0
+    auc = roc_auc_score(labels[test], model.predict_proba(X[test])[:, 1]) if len(set(labels[test])) > 1 else None
+    with open(models_dir / "ranking_model.pkl", 'wb') as f:
+        pickle.dump(model, f)
+    return {
+        'samples': int(len(labels)),
+        'positives': int(labels.sum()),
+        'holdout_auc': round(float(auc), 4) if auc is not None else None,
+        'coefficients': {name: round(float(c), 4) for name, c in zip(RANKING_FEATURES, model.coef_[0])},
+    }
+
+
+# ===== Pipeline =====
+
+def train(
+    ratings_path: Path,
+    models_dir: Path,
+    movies_path: Optional[Path] = None,
+    users_path: Optional[Path] = None,
+    cache_dir: Optional[Path] = None,
+    factors: int = ALS_FACTORS,
+    iterations: int = ALS_ITERATIONS,
+    regularization: float = ALS_REGULARIZATION,
+    holdout: float = HOLDOUT,
+    ranker_samples: int = RANKER_SAMPLES,
+    topn: Optional[int] = None,
+    workers: Optional[int] = None,
+    seed: int = 42,
+    force: Sequence[str] = (),
+) -> dict:
+    """Run every stage (user top-N only when topn is given) and write the training report"""
+    models_dir = Path(models_dir)
+    models_dir.mkdir(parents=True, exist_ok=True)
+    cache_dir = Path(cache_dir) if cache_dir is not None else models_dir / CACHE_DIRNAME
+    workers = workers or os.cpu_count() or 1
+    runner = StageRunner(cache_dir, force)
+    began = time.perf_counter()
+
+    ratings_file = cache_dir / RATINGS_FILE
+    items_path = models_dir / "items_metadata.csv"
+    tfidf_path = models_dir / "tfidf_vectorizer.pkl"
+
+    runner.run(
+        'ratings', {'file': file_stamp(ratings_path), 'holdout': holdout, 'seed': seed}, [ratings_file],
+        lambda: build_ratings(ratings_path, ratings_file, holdout, seed),
+    )
+    runner.run(
+        'items', {'movies': file_stamp(movies_path), 'after': ['ratings']}, [items_path],
+        lambda: build_items(ratings_file, movies_path, items_path),
+    )
+    runner.run(
+        'content', {'after': ['items']}, [tfidf_path],
+        lambda: build_content(items_path, tfidf_path),
+    )
+    runner.run(
+        'demographics', {'users': file_stamp(users_path), 'after': ['ratings']},
+        [models_dir / AFFINITY_FILE, models_dir / USERS_FILE] if users_path is not None else [],
+        lambda: build_demographics(ratings_file, users_path, models_dir),
+    )
+    runner.run(
+        'mf',
+        {'factors': factors, 'iterations': iterations, 'regularization': regularization, 'seed': seed,
+         'after': ['ratings']},
+        [models_dir / MF_MODEL_FILE, models_dir / "user_embeddings.pkl", models_dir / "item_embeddings.pkl"],
+        lambda: build_mf(ratings_file, models_dir, factors, iterations, regularization, workers, seed),
+    )
+    runner.run(
+        'ranker',
+        {'samples': ranker_samples, 'users': RANKER_USERS, 'seed': seed,
+         'after': ['items', 'content', 'demographics', 'mf']},
+        [models_dir / "ranking_model.pkl"],
+        lambda: build_ranker(ratings_file, models_dir, users_path, ranker_samples, seed),
+    )
+    runner.run(
+        'artifacts', {'after': ['items', 'content', 'demographics', 'mf', 'ranker']},
+        [models_dir / ARTIFACTS_DIRNAME / MANIFEST_FILE],
+        lambda: {'version': export_artifacts(models_dir, pd.read_csv(items_path))},
+    )
+    # The neighbour table records the artifacts version it was built against
+    runner.run(
+        'neighbours', {'after': ['items', 'content', 'mf', 'artifacts']},
+        [models_dir / NEIGHBOURS_INDEX_FILE, models_dir / NEIGHBOURS_SCORES_FILE, models_dir / NEIGHBOURS_META_FILE],
+        lambda: build_from_models_dir(models_dir),
+    )
+    if topn:
+        runner.run(
+            'topn', {'n': topn, 'after': ['mf', 'items', 'artifacts']}, [models_dir / TOPN_INDEX_FILE],
+            lambda: build_user_topn(models_dir, topn, workers),
+        )
+
+    report = {
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        'ratings': str(ratings_path),
+        'movies': str(movies_path) if movies_path is not None else None,
+        'users': str(users_path) if users_path is not None else None,
+        'workers': workers,
+        'total_seconds': round(time.perf_counter() - began, 3),
+        'stages': runner.report,
+    }
+    (models_dir / REPORT_FILE).write_text(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the served models from a MovieLens ratings file")
+    parser.add_argument("--ratings", type=Path, required=True,
+                        help="u.data (ml-100k), ratings.dat (ml-1m) or ratings.csv (ml-20m/25m)")
+    parser.add_argument("--movies", type=Path, default=None, help="u.item, movies.dat or movies.csv")
+    parser.add_argument("--users", type=Path, default=None, help="u.user or users.dat, for demographic affinities")
+    parser.add_argument("--models-dir", type=Path, default=Path(__file__).parent.parent / "models")
+    parser.add_argument("--cache-dir", type=Path, default=None, help=f"default: <models-dir>/{CACHE_DIRNAME}")
+    parser.add_argument("--factors", type=int, default=ALS_FACTORS)
+    parser.add_argument("--iterations", type=int, default=ALS_ITERATIONS)
+    parser.add_argument("--regularization", type=float, default=ALS_REGULARIZATION)
+    parser.add_argument("--holdout", type=float, default=HOLDOUT, help="share of ratings kept for the ranker")
+    parser.add_argument("--ranker-samples", type=int, default=RANKER_SAMPLES)
+    parser.add_argument("--topn", type=int, nargs="?", const=TOPN, default=None,
+                        help=f"also precompute the user top-N table (default n: {TOPN})")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", nargs="*", default=[], choices=STAGES + ('all',), help="stages to rebuild")
+    args = parser.parse_args()
+
+    report = train(
+        args.ratings, args.models_dir, args.movies, args.users, args.cache_dir, args.factors, args.iterations,
+        args.regularization, args.holdout, args.ranker_samples, args.topn, args.workers, args.seed, args.force,
+    )
+    print(f"\n{'stage':<14}{'status':<9}{'seconds':>9}")
+    for stage in report['stages']:
+        print(f"{stage['stage']:<14}{stage['status']:<9}{stage['seconds']:>9.2f}")
+    print(f"{'total':<23}{report['total_seconds']:>9.2f}")
@@ -0,0 +1,173 @@
+"""
+Precomputed User Top-N
+Offline job that scores every known user against the whole catalog (SVD
+factors, in user blocks across a process pool) and keeps the best N items
+per user as an int32 row matrix plus a float16 score matrix. The backend
+memory-maps the table and uses it as the candidate set for those users.
+
+Rebuild after retraining with:  python precompute_recommendations.py
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    from .artifacts import ARTIFACTS_DIRNAME, ArtifactStore, artifacts_version, catalog_checksum, load_model_file
+    from .batch import block_size_for, map_blocks, row_top_k, worker_state
+    from .mf import MF_MODEL_FILE, MFScorer
+except ImportError:  # running from inside backend/ (uvicorn main:app)
+    from artifacts import ARTIFACTS_DIRNAME, ArtifactStore, artifacts_version, catalog_checksum, load_model_file
+    from batch import block_size_for, map_blocks, row_top_k, worker_state
+    from mf import MF_MODEL_FILE, MFScorer
+
+INDEX_FILE = "user_topn_idx.npy"
+SCORES_FILE = "user_topn_scores.npy"
+USERS_FILE = "user_topn_users.npy"
+META_FILE = "user_topn.json"
+
+TOPN = 200
+
+
+def load_mf_scorer(models_dir: Path) -> Optional[MFScorer]:
+    """The MF scorer the backend would serve from models_dir, bound to its catalog"""
+    import pandas as pd
+
+    models_dir = Path(models_dir)
+    artifacts = ArtifactStore.open(models_dir / ARTIFACTS_DIRNAME)
+    if artifacts is not None:
+        scorer = artifacts.mf_scorer()
+    else:
+        scorer = MFScorer.load(models_dir / MF_MODEL_FILE) or MFScorer.from_model(
+            load_model_file(models_dir / "svd_sklearn.pkl"),
+            load_model_file(models_dir / "user_embeddings.pkl"),
+        )
+    if scorer is not None:
+        scorer.bind_catalog(pd.read_csv(models_dir / "items_metadata.csv")['id'])
+    return scorer
+
+
+def _score_block(bounds) -> Tuple[int, np.ndarray, np.ndarray]:
+    start, stop = bounds
+    state = worker_state()
+    rows, scores = row_top_k(state['scorer'].score_rows(np.arange(start, stop)), state['n'])
+    return start, rows.astype(np.int32), scores.astype(np.float16)
+
+
+def build_user_topn(
+    models_dir: Path,
+    n: int = TOPN,
+    workers: Optional[int] = None,
+    block_size: Optional[int] = None,
+) -> Optional[dict]:
+    """
+    Score all users of the MF model and write the top-N table into models_dir.
+    Returns the run report (also written to META_FILE), None without user factors.
+    The report records the artifacts version and catalog the table belongs to.
+    """
+    import pandas as pd
+
+    models_dir = Path(models_dir)
+    workers = workers or os.cpu_count() or 1
+    began = time.perf_counter()
+
+    scorer = load_mf_scorer(models_dir)
+    if scorer is None or scorer.user_factors is None:
+        print("No SVD user factors in models/; nothing to precompute")
+        return None
+    load_seconds = time.perf_counter() - began
+
+    n_users, n_items = len(scorer.user_factors), len(scorer.catalog_rows)
+    n = min(n, n_items)
+    block_size = block_size or block_size_for(n_items)
+    blocks = [(start, min(start + block_size, n_users)) for start in range(0, n_users, block_size)]
+
+    # Written block by block straight into the memory-mapped output files
+    indices = np.lib.format.open_memmap(models_dir / INDEX_FILE, mode='w+', dtype=np.int32, shape=(n_users, n))
+    scores = np.lib.format.open_memmap(models_dir / SCORES_FILE, mode='w+', dtype=np.float16, shape=(n_users, n))
+
+    scoring_began = time.perf_counter()
+    for start, block_rows, block_scores in map_blocks(_score_block, blocks, {'scorer': scorer, 'n': n}, workers):
+        indices[start:start + len(block_rows)] = block_rows
+        scores[start:start + len(block_rows)] = block_scores
+    indices.flush()
+    scores.flush()
+    scoring_seconds = time.perf_counter() - scoring_began
+    del indices, scores
+
+    user_ids = sorted(scorer.user_index, key=scorer.user_index.get)
+    np.save(models_dir / USERS_FILE, np.array(user_ids, dtype=str))
+
+    report = {
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        'model_version': artifacts_version(models_dir),
+        'catalog': catalog_checksum(pd.read_csv(models_dir / "items_metadata.csv")['id']),
+        'users': n_users,
+        'items': n_items,
+        'n': n,
+        'workers': workers,
+        'block_size': block_size,
+        'load_seconds': round(load_seconds, 3),
+        'scoring_seconds': round(scoring_seconds, 3),
+        'total_seconds': round(time.perf_counter() - began, 3),
+        'users_per_second': round(n_users / scoring_seconds, 1) if scoring_seconds > 0 else 0.0,
+        'scores_per_second': round(n_users * n_items / scoring_seconds, 1) if scoring_seconds > 0 else 0.0,
+        'table_mb': round(n_users * n * 6 / 2**20, 2),
+    }
+    (models_dir / META_FILE).write_text(json.dumps(report, indent=2))
+    return report
+
+
+class UserTopN:
+    """Memory-mapped top-N table; a lookup is a dict hit plus a slice of one row"""
+
+    def __init__(self, user_ids, indices: np.ndarray, scores: np.ndarray, meta: Optional[dict] = None):
+        self.user_index = {str(uid): i for i, uid in enumerate(user_ids)}
+        self.indices = indices
+        self.scores = scores
+        self.n = indices.shape[1]
+        self.meta = meta or {}
+
+    @classmethod
+    def load(cls, models_dir: Path, item_ids, model_version: Optional[str]) -> Optional["UserTopN"]:
+        """
+        Open the saved table, or None if missing or built for another model
+        version or catalog (a retrain without rerunning the precompute).
+        """
+        models_dir = Path(models_dir)
+        paths = [models_dir / name for name in (INDEX_FILE, SCORES_FILE, USERS_FILE, META_FILE)]
+        if not all(path.exists() for path in paths):
+            return None
+        try:
+            indices = np.load(paths[0], mmap_mode='r')
+            scores = np.load(paths[1], mmap_mode='r')
+            user_ids = np.load(paths[2])
+            meta = json.loads(paths[3].read_text())
+        except Exception as e:
+            print(f"Error loading user top-N table: {e}")
+            return None
+        if indices.shape != scores.shape or indices.shape[0] != len(user_ids):
+            print("Warning: user top-N table files don't match each other; ignoring it")
+            return None
+        if meta.get('model_version') != model_version:
+            print(f"Warning: user top-N table was built for model {meta.get('model_version')}, "
+                  f"serving {model_version}; ignoring it until it is rebuilt")
+            return None
+        if meta.get('catalog') != catalog_checksum(item_ids):
+            print("Warning: user top-N table was built for another catalog; ignoring it until it is rebuilt")
+            return None
+        return cls(user_ids, indices, scores, meta)
+
+    def lookup(self, user_id: str, min_n: int = 0) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Precomputed rows and SVD scores of a user, best first; None if not covered"""
+        row = self.user_index.get(str(user_id))
+        if row is None or self.n < min_n:
+            return None
+        rows = np.asarray(self.indices[row], dtype=np.int64)
+        scores = np.asarray(self.scores[row], dtype=np.float64)
+        valid = rows >= 0
+        return rows[valid], scores[valid]
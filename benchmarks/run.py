@@ -0,0 +1,331 @@
+"""
+API Latency Benchmark
+Generates synthetic catalogs with regenerate_models.py, serves the FastAPI app
+in-process through an ASGI transport (no sockets) and reports p50/p95/p99
+latency, throughput and peak RSS per endpoint. Results can be saved as a
+baseline and later runs compared against it.
+
+Run from the project root:
+    python -m benchmarks.run                          # 1k, 10k, 100k items
+    python -m benchmarks.run --sizes 1000 --save-baseline
+    python -m benchmarks.run --compare benchmarks/baseline.json
+
+Each catalog size is benchmarked in a fresh subprocess so RSS numbers are
+not polluted by previous sizes. Generated catalogs are cached under
+benchmarks/.data/ and reused by later runs.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+DATA_DIR = Path(__file__).parent / ".data"
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+# Relative slack before a change counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+# Latency changes smaller than this are noise, whatever the relative change
+MIN_DELTA_MS = 1.0
+
+SEED = 42
+
+# User ids per /api/recommend/batch request
+BATCH_USERS = 100
+
+
+def users_for(num_items: int) -> int:
+    """User base size that goes with a catalog size"""
+    return max(50, num_items // 10)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def prepare_catalog(num_items: int, rebuild: bool = False) -> Path:
+    """Generate (or reuse) a full model set for a synthetic catalog"""
+    models_dir = DATA_DIR / f"items_{num_items}"
+    if rebuild or not (models_dir / "artifacts" / "manifest.json").exists():
+        from regenerate_models import regenerate
+
+        start = time.perf_counter()
+        regenerate(models_dir, num_items=num_items, num_users=users_for(num_items), train_svd=True, seed=SEED)
+        print(f"Generated {num_items} item catalog in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return models_dir
+
+
+def endpoint_requests(num_items: int, num_users: int, n: int) -> Dict[str, List[dict]]:
+    """n requests per endpoint, cycling through varied ids and parameters"""
+    rng = np.random.RandomState(SEED)
+    item_ids = rng.randint(1, num_items + 1, n)
+    user_ids = rng.randint(1, num_users + 1, n)
+    genres = ['Drama', 'Action', 'Comedy', 'Sci-Fi', 'Thriller', 'Romance']
+    searches = ['the', 'god', 'star', 'war', 'love', 'x']
+    sorts = ['popularity', 'year', 'title']
+    occupations = ['engineer', 'doctor', 'artist', 'student', 'teacher']
+
+    def get(url):
+        return {'method': 'GET', 'url': url}
+
+    return {
+        'health': [get("/api/health") for _ in range(n)],
+        'items': [
+            get(f"/api/items?genre={genres[i % len(genres)]}&sort_by={sorts[i % len(sorts)]}&limit=50")
+            for i in range(n)
+        ],
+        'items_search': [get(f"/api/items?search={searches[i % len(searches)]}&limit=50") for i in range(n)],
+        'item_detail': [get(f"/api/items/{i}") for i in item_ids],
+        'recommend_user': [get(f"/api/recommend/user/{u}?limit=10") for u in user_ids],
+        'similar': [get(f"/api/similar/{i}?limit=6") for i in item_ids],
+        'cold_start': [
+            {
+                'method': 'POST',
+                'url': "/api/recommend/cold-start?limit=10",
+                'json': {
+                    'gender': ['male', 'female', 'other'][i % 3],
+                    'occupation': occupations[i % len(occupations)],
+                    'interests': [genres[i % len(genres)], genres[(i + 2) % len(genres)]],
+                },
+            }
+            for i in range(n)
+        ],
+        'batch': [
+            {
+                'method': 'POST',
+                'url': "/api/recommend/batch",
+                'json': {'userIds': [str(u) for u in rng.randint(1, num_users + 1, BATCH_USERS)], 'limit': 10},
+            }
+            for _ in range(n)
+        ],
+        # Folds into a user's factors; later requests for that user see the new revision
+        'ratings': [
+            {
+                'method': 'POST',
+                'url': "/api/ratings",
+                'json': {
+                    'userId': str(u),
+                    'ratings': [{'itemId': str(i), 'rating': int(r)}
+                                for i, r in zip(rng.randint(1, num_items + 1, 5), rng.randint(1, 6, 5))],
+                },
+            }
+            for u in user_ids
+        ],
+        'stats_performance': [get("/api/stats/performance") for _ in range(n)],
+        'metrics': [get("/api/metrics") for _ in range(n)],
+        'stats_scoring': [get("/api/stats/scoring") for _ in range(n)],
+        'users': [get("/api/users") for _ in range(n)],
+    }
+
+
+def summarize(latencies_ms: List[float], wall_s: float, errors: int) -> dict:
+    values = np.asarray(latencies_ms)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) if len(values) else (0.0, 0.0, 0.0)
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'mean_ms': round(float(values.mean()), 3) if len(values) else 0.0,
+        'throughput_rps': round(len(values) / wall_s, 1) if wall_s > 0 else 0.0,
+    }
+
+
+async def run_endpoint(client, requests: List[dict], concurrency: int, warmup: int) -> dict:
+    """Fire requests with bounded concurrency; latency is measured per request"""
+    for spec in requests[:warmup]:
+        await client.request(**spec)
+
+    queue = list(reversed(requests))
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            spec = queue.pop()
+            start = time.perf_counter()
+            response = await client.request(**spec)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+async def benchmark_app(num_items: int, n: int, concurrency: int, warmup: int, endpoints: Optional[List[str]]) -> dict:
+    """Load the app against MODELS_DIR (set by the caller) and benchmark every endpoint"""
+    import httpx
+    from backend.main import app, models, startup_event
+
+    rss_before_load = peak_rss_mb()
+    start = time.perf_counter()
+    await startup_event()
+    load_s = time.perf_counter() - start
+    rss_after_load = peak_rss_mb()
+
+    snapshot = models.snapshot
+    num_users = len(snapshot.mf_scorer.user_index) if snapshot.mf_scorer is not None else users_for(num_items)
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name, requests in endpoint_requests(num_items, num_users, n).items():
+            if endpoints and name not in endpoints:
+                continue
+            results[name] = await run_endpoint(client, requests, concurrency, warmup)
+            results[name]['peak_rss_mb'] = round(peak_rss_mb(), 1)
+            print(f"  {name:<18} p50 {results[name]['p50_ms']:>8.2f}ms  p95 {results[name]['p95_ms']:>8.2f}ms  "
+                  f"p99 {results[name]['p99_ms']:>8.2f}ms  {results[name]['throughput_rps']:>8.1f} req/s",
+                  file=sys.stderr)
+
+    return {
+        'items': num_items,
+        'users': num_users,
+        'load_seconds': round(load_s, 3),
+        'rss_before_load_mb': round(rss_before_load, 1),
+        'rss_after_load_mb': round(rss_after_load, 1),
+        'model_version': snapshot.version,
+        'endpoints': results,
+    }
+
+
+def run_size(num_items: int, args) -> dict:
+    """Benchmark one catalog size in a fresh interpreter"""
+    models_dir = prepare_catalog(num_items, rebuild=args.rebuild)
+    env = dict(os.environ, MODELS_DIR=str(models_dir))
+    # Measure computation, not the result cache, unless asked otherwise
+    if not args.with_cache:
+        env['RESULT_CACHE_SIZE'] = "0"
+    command = [
+        sys.executable, "-m", "benchmarks.run", "--worker",
+        "--sizes", str(num_items),
+        "--requests", str(args.requests),
+        "--concurrency", str(args.concurrency),
+        "--warmup", str(args.warmup),
+    ]
+    if args.endpoints:
+        command += ["--endpoints", ",".join(args.endpoints)]
+    print(f"Benchmarking {num_items} items...", file=sys.stderr)
+    completed = subprocess.run(command, cwd=ROOT, env=env, stdout=subprocess.PIPE, check=True, text=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions of p95/p99 latency or throughput beyond the tolerance (and MIN_DELTA_MS)"""
+    regressions = []
+    for size, result in current['sizes'].items():
+        base = baseline.get('sizes', {}).get(size)
+        if base is None:
+            continue
+        for name, stats in result['endpoints'].items():
+            base_stats = base['endpoints'].get(name)
+            if base_stats is None:
+                continue
+            def slower(metric):
+                return (
+                    stats[metric] > base_stats[metric] * (1 + tolerance)
+                    and stats[metric] - base_stats[metric] > MIN_DELTA_MS
+                )
+
+            for metric in ('p95_ms', 'p99_ms'):
+                if slower(metric):
+                    regressions.append(
+                        f"{size} items / {name}: {metric} {stats[metric]:.2f} vs baseline {base_stats[metric]:.2f}"
+                    )
+            if stats['throughput_rps'] < base_stats['throughput_rps'] * (1 - tolerance) and slower('mean_ms'):
+                regressions.append(
+                    f"{size} items / {name}: throughput {stats['throughput_rps']:.1f} "
+                    f"vs baseline {base_stats['throughput_rps']:.1f} req/s"
+                )
+            if stats['errors'] > base_stats['errors']:
+                regressions.append(f"{size} items / {name}: {stats['errors']} errors vs baseline {base_stats['errors']}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated catalog sizes (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per endpoint")
+    parser.add_argument("--endpoints", type=lambda s: s.split(','), default=None,
+                        help="only run these endpoints (comma-separated)")
+    parser.add_argument("--with-cache", action="store_true", help="keep the result cache enabled")
+    parser.add_argument("--rebuild", action="store_true", help="regenerate cached synthetic catalogs")
+    parser.add_argument("--output", type=Path, help="write the results JSON here")
+    parser.add_argument("--compare", type=Path, nargs='?', const=DEFAULT_BASELINE,
+                        help="baseline JSON to compare against; exits 1 on regression")
+    parser.add_argument("--save-baseline", type=Path, nargs='?', const=DEFAULT_BASELINE,
+                        help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative slowdown before failing (default: %(default)s)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+
+    if args.worker:
+        result = asyncio.run(benchmark_app(sizes[0], args.requests, args.concurrency, args.warmup, args.endpoints))
+        print(json.dumps(result))
+        return 0
+
+    results = {
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'settings': {
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'result_cache': args.with_cache,
+        },
+        'sizes': {str(size): run_size(size, args) for size in sizes},
+    }
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2))
+        print(f"Saved baseline to {args.save_baseline}", file=sys.stderr)
+    if args.compare:
+        if not args.compare.exists():
+            print(f"No baseline at {args.compare}", file=sys.stderr)
+            return 1
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            print("Performance regressions:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print(f"No regressions against {args.compare} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+"""
+Nightly job: materialise the top-N recommendations of every known user into
+models/ (see backend/user_topn.py). The server picks the table up on its next
+(re)load and serves those users' candidates from it.
+
+    python precompute_recommendations.py --n 200 --workers 8
+"""
+
+import argparse
+from pathlib import Path
+
+from backend.user_topn import TOPN, build_user_topn
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute top-N recommendations for all users")
+    parser.add_argument("--models-dir", type=Path, default=Path(__file__).parent / "models")
+    parser.add_argument("--n", type=int, default=TOPN, help="items kept per user")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--block-size", type=int, default=None, help="users scored per task (default: auto)")
+    args = parser.parse_args()
+
+    report = build_user_topn(args.models_dir, args.n, args.workers, args.block_size)
+    if report is not None:
+        print(f"Scored {report['users']} users x {report['items']} items in {report['scoring_seconds']:.2f}s "
+              f"({report['users_per_second']:.0f} users/s, {report['scores_per_second'] / 1e6:.1f}M scores/s, "
+              f"{report['workers']} workers)")
+        print(f"Wrote top-{report['n']} table ({report['table_mb']} MB) in {report['total_seconds']:.2f}s")
@@ -1,22 +1,14 @@
-
 import pandas as pd
 import numpy as np
 import pickle
 from pathlib import Path
+from sklearn.decomposition import TruncatedSVD
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import LabelEncoder
 from sklearn.linear_model import LogisticRegression
+from scipy import sparse
 
-# Configuration
-MODELS_DIR = Path("models").resolve()
-MODELS_DIR.mkdir(parents=True, exist_ok=True)
-
-print(f"Regenerating models in: {MODELS_DIR}")
-
-# 1. Create Synthetic Item Metadata
-print("Generating items_metadata.csv...")
-
-real_movies = [
+REAL_MOVIES = [
     ("The Shawshank Redemption", "Drama"),
     ("The Godfather", "Crime|Drama"),
     ("The Dark Knight", "Action|Crime|Drama"),
@@ -121,67 +113,137 @@ real_movies = [
     ("To Kill a Mockingbird", "Crime|Drama")
 ]
 
-num_items = len(real_movies)
-items_data = {
-    'id': range(1, num_items + 1),
-    'title': [movie[0] for movie in real_movies],
-    'genres': [movie[1] for movie in real_movies],
-    'popularity': np.random.uniform(10, 100, num_items),
-    'year': np.random.randint(1970, 2024, num_items),
-    'description': [f"Description for {movie[0]}" for movie in real_movies],
-    'vote_average': np.random.uniform(5, 10, num_items),
-    'vote_count': np.random.randint(100, 1000, num_items)
-}
-items_df = pd.DataFrame(items_data)
-items_df.to_csv(MODELS_DIR / "items_metadata.csv", index=False)
-print(f"Generated {num_items} items.")
-print("Done.")
-
-# 2. Train TfidfVectorizer
-print("Training TfidfVectorizer...")
-tfidf = TfidfVectorizer(stop_words='english')
-tfidf.fit(items_df['title'] + " " + items_df['genres'])
-with open(MODELS_DIR / "tfidf_vectorizer.pkl", 'wb') as f:
-    pickle.dump(tfidf, f)
-print("Done.")
-
-# 3. Train Encoders
-print("Training LabelEncoders...")
-genders = ['male', 'female', 'other']
-occupations = ['engineer', 'doctor', 'artist', 'student', 'teacher', 'other', 'manager', 'scientist', 'lawyer', 'writer']
-
-gender_encoder = LabelEncoder()
-gender_encoder.fit(genders)
-with open(MODELS_DIR / "gender_encoder.pkl", 'wb') as f:
-    pickle.dump(gender_encoder, f)
-
-occupation_encoder = LabelEncoder()
-occupation_encoder.fit(occupations)
-with open(MODELS_DIR / "occupation_encoder.pkl", 'wb') as f:
-    pickle.dump(occupation_encoder, f)
-print("Done.")
-
-# 4. Train Ranking Model
-# Features: svdScore, contentSimilarity, userItemSimilarity, popularity, recency, demographicMatch
-print("Training Ranking Model (Logistic Regression)...")
-X_train = np.random.rand(100, 6) # 100 samples, 6 features
-y_train = np.random.randint(0, 2, 100) # Binary target
-rank_model = LogisticRegression()
-rank_model.fit(X_train, y_train)
-
-with open(MODELS_DIR / "ranking_model.pkl", 'wb') as f:
-    pickle.dump(rank_model, f)
-print("Done.")
-
-# 5. Dummy Embeddings (Optional but good to have)
-print("Generating Dummy Embeddings...")
-item_embeddings = np.random.rand(num_items, 32)
-with open(MODELS_DIR / "item_embeddings.pkl", 'wb') as f:
-    pickle.dump(item_embeddings, f)
-
-user_embeddings = np.random.rand(50, 32) # Assume 50 users
-with open(MODELS_DIR / "user_embeddings.pkl", 'wb') as f:
-    pickle.dump(user_embeddings, f)
-print("Done.")
-
-print("\nAll models regenerated successfully!")
+GENDERS = ['male', 'female', 'other']
+OCCUPATIONS = ['engineer', 'doctor', 'artist', 'student', 'teacher', 'other', 'manager', 'scientist', 'lawyer', 'writer']
+
+EMBEDDING_DIM = 32
+
+
+def make_items(num_items=None, rng=np.random):
+    """Synthetic item metadata; catalogs larger than REAL_MOVIES reuse titles as numbered sequels"""
+    num_items = num_items or len(REAL_MOVIES)
+    movies = [REAL_MOVIES[i % len(REAL_MOVIES)] for i in range(num_items)]
+    titles = [
+        title if i < len(REAL_MOVIES) else f"{title} {i // len(REAL_MOVIES) + 1}"
+        for i, (title, _) in enumerate(movies)
+    ]
+    return pd.DataFrame({
+        'id': range(1, num_items + 1),
+        'title': titles,
+        'genres': [genres for _, genres in movies],
+        'popularity': rng.uniform(10, 100, num_items),
+        'year': rng.randint(1970, 2024, num_items),
+        'description': [f"Description for {title}" for title in titles],
+        'vote_average': rng.uniform(5, 10, num_items),
+        'vote_count': rng.randint(100, 1000, num_items)
+    })
+
+
+def make_ratings(num_users, items_df, ratings_per_user=20, rng=np.random):
+    """Sparse user x item rating matrix, biased towards popular items"""
+    num_items = len(items_df)
+    weights = items_df['popularity'].to_numpy() / items_df['popularity'].sum()
+    per_user = min(ratings_per_user, num_items)
+    rows = np.repeat(np.arange(num_users), per_user)
+    cols = np.concatenate([rng.choice(num_items, per_user, replace=False, p=weights) for _ in range(num_users)])
+    values = rng.randint(1, 6, len(rows)).astype(np.float32)
+    return sparse.csr_matrix((values, (rows, cols)), shape=(num_users, num_items))
+
+
+def regenerate(models_dir, num_items=None, num_users=50, train_svd=False, seed=None):
+    """
+    Write the full model set into models_dir. train_svd also fits a TruncatedSVD
+    on synthetic ratings (the shipped svd_sklearn.pkl comes from the notebook),
+    with user embeddings taken from the same factorization.
+    """
+    models_dir = Path(models_dir)
+    models_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.RandomState(seed) if seed is not None else np.random
+
+    print(f"Regenerating models in: {models_dir}")
+
+    # 1. Create Synthetic Item Metadata
+    print("Generating items_metadata.csv...")
+    items_df = make_items(num_items, rng)
+    num_items = len(items_df)
+    items_df.to_csv(models_dir / "items_metadata.csv", index=False)
+    print(f"Generated {num_items} items.")
+    print("Done.")
+
+    # 2. Train TfidfVectorizer
+    print("Training TfidfVectorizer...")
+    tfidf = TfidfVectorizer(stop_words='english')
+    tfidf.fit(items_df['title'] + " " + items_df['genres'])
+    with open(models_dir / "tfidf_vectorizer.pkl", 'wb') as f:
+        pickle.dump(tfidf, f)
+    print("Done.")
+
+    # 3. Train Encoders
+    print("Training LabelEncoders...")
+    gender_encoder = LabelEncoder()
+    gender_encoder.fit(GENDERS)
+    with open(models_dir / "gender_encoder.pkl", 'wb') as f:
+        pickle.dump(gender_encoder, f)
+
+    occupation_encoder = LabelEncoder()
+    occupation_encoder.fit(OCCUPATIONS)
+    with open(models_dir / "occupation_encoder.pkl", 'wb') as f:
+        pickle.dump(occupation_encoder, f)
+    print("Done.")
+
+    # 4. Train Ranking Model
+    # Features: svdScore, contentSimilarity, userItemSimilarity, popularity, recency, demographicMatch
+    # Placeholder fit on random features and labels, so its coefficients carry no signal;
+    # `python -m backend.training` learns a real ranker from held-out ratings
+    print("Training placeholder Ranking Model (Logistic Regression on random data)...")
+    X_train = rng.rand(100, 6) # 100 samples, 6 features
+    y_train = rng.randint(0, 2, 100) # Binary target
+    rank_model = LogisticRegression()
+    rank_model.fit(X_train, y_train)
+
+    with open(models_dir / "ranking_model.pkl", 'wb') as f:
+        pickle.dump(rank_model, f)
+    print("Done.")
+
+    # 5. Dummy Embeddings (Optional but good to have)
+    print("Generating Dummy Embeddings...")
+    item_embeddings = rng.rand(num_items, EMBEDDING_DIM)
+    with open(models_dir / "item_embeddings.pkl", 'wb') as f:
+        pickle.dump(item_embeddings, f)
+
+    user_embeddings = rng.rand(num_users, EMBEDDING_DIM)
+    if train_svd:
+        print("Training TruncatedSVD on synthetic ratings...")
+        ratings = make_ratings(num_users, items_df, rng=rng)
+        svd = TruncatedSVD(n_components=min(EMBEDDING_DIM, num_items - 1), random_state=seed)
+        user_embeddings = svd.fit_transform(ratings)
+        with open(models_dir / "svd_sklearn.pkl", 'wb') as f:
+            pickle.dump(svd, f)
+    with open(models_dir / "user_embeddings.pkl", 'wb') as f:
+        pickle.dump(user_embeddings, f)
+    print("Done.")
+
+    # 6. Export Memory-Mapped Artifacts (.npy arrays + manifest.json, loaded by the backend)
+    print("Exporting model artifacts...")
+    from backend.artifacts import export_artifacts
+
+    artifacts_version = export_artifacts(models_dir, items_df)
+    print(f"Done. Artifacts version {artifacts_version}")
+
+    # 7. Precompute Item Neighbours (memory-mapped by the backend for /api/similar, tied to the artifacts version)
+    print("Precomputing item neighbour table...")
+    from backend.item_store import ItemStore
+    from backend.neighbours import build_neighbour_table, save_neighbour_table
+
+    store = ItemStore(items_df)
+    tfidf_matrix = tfidf.transform(items_df['title'] + " " + items_df['genres'])
+    neighbour_idx, neighbour_scores = build_neighbour_table(store.genre_matrix, tfidf_matrix, item_embeddings)
+    save_neighbour_table(models_dir, neighbour_idx, neighbour_scores, store.ids)
+    print("Done.")
+
+    print("\nAll models regenerated successfully!")
+    return items_df
+
+
+if __name__ == "__main__":
+    regenerate(Path("models").resolve())
@@ -0,0 +1,11 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    """The app against the shipped models/, loaded once for the whole run"""
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,44 @@
+import numpy as np
+
+from backend.ann import IVFIndex
+
+
+def clustered_vectors(n=5000, dim=32, clusters=50, noise=1.0, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return (centers[rng.integers(clusters, size=n)] + noise * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def recall_at(index, rows, k, n_probe):
+    hits = 0
+    for row in rows:
+        approx, _ = index.search_item(row, k, n_probe=n_probe)
+        exact, _ = index.search_exact(index.vectors[row], k, exclude=row)
+        hits += len(np.intersect1d(approx, exact))
+    return hits / (k * len(rows))
+
+
+def test_ivf_recall_at_default_probe_count():
+    index = IVFIndex(clustered_vectors())
+    assert not index.exact
+    rows = np.arange(0, index.size, 50)
+    recall = recall_at(index, rows, 10, index.n_probe)
+    assert recall >= 0.95
+    # Fewer probes trade recall for speed
+    assert recall_at(index, rows, 10, 1) < recall
+
+
+def test_probing_every_list_is_exact():
+    index = IVFIndex(clustered_vectors())
+    rows = np.arange(0, index.size, 250)
+    assert recall_at(index, rows, 10, len(index.centroids)) == 1.0
+
+
+def test_small_catalogs_search_exhaustively():
+    index = IVFIndex(clustered_vectors(n=500))
+    assert index.exact
+    approx, scores = index.search_item(3, 10)
+    exact, exact_scores = index.search_exact(index.vectors[3], 10, exclude=3)
+    np.testing.assert_array_equal(approx, exact)
+    np.testing.assert_allclose(scores, exact_scores)
+    assert 3 not in approx
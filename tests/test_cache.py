@@ -0,0 +1,62 @@
+import pytest
+
+from backend import cache
+from backend.cache import LRUCache, ResultCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_their_ttl(clock):
+    lru = LRUCache(max_size=10, ttl_seconds=5.0)
+    lru.set('a', 1)
+    clock[0] += 4.9
+    assert lru.get('a') == 1
+    clock[0] += 0.2
+    assert lru.get('a') is None
+    stats = lru.stats()
+    assert (stats['hits'], stats['misses'], stats['expirations'], stats['size']) == (1, 1, 1, 0)
+
+
+def test_without_a_ttl_entries_never_expire(clock):
+    lru = LRUCache(max_size=10, ttl_seconds=None)
+    lru.set('a', 1)
+    clock[0] += 1e9
+    assert lru.get('a') == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    lru = LRUCache(max_size=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    # A hit makes 'a' the most recently used, so 'b' goes first
+    assert lru.get('a') == 1
+    lru.set('c', 3)
+    assert lru.get('b') is None
+    assert (lru.get('a'), lru.get('c')) == (1, 3)
+    assert lru.stats()['evictions'] == 1
+
+
+def test_results_are_keyed_by_model_version():
+    results = ResultCache(LRUCache(max_size=10))
+    results.set('v1', ('user', '42', 10), [1, 2, 3])
+    assert results.get('v1', ('user', '42', 10)) == [1, 2, 3]
+    # A reload changes the version, so old results can't be served even before invalidate()
+    assert results.get('v2', ('user', '42', 10)) is None
+    results.invalidate()
+    assert results.get('v1', ('user', '42', 10)) is None
+    assert results.stats()['invalidations'] == 1
+
+
+def test_falsy_results_are_cached_and_disabled_cache_stores_nothing():
+    results = ResultCache(LRUCache(max_size=10))
+    results.set('v1', ('empty',), [])
+    assert results.get('v1', ('empty',)) == []
+    disabled = ResultCache(LRUCache(max_size=10), enabled=False)
+    disabled.set('v1', ('user',), [1])
+    assert disabled.get('v1', ('user',)) is None
+    assert disabled.stats()['size'] == 0
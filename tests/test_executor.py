@@ -0,0 +1,98 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.executor import Saturated, ScoringExecutor
+
+
+def test_cancelled_call_keeps_its_slot_until_the_work_finishes():
+    async def scenario():
+        executor = ScoringExecutor('thread', max_workers=1, max_queue=0)
+        finish = threading.Event()
+        try:
+            task = asyncio.ensure_future(executor.run(finish.wait))
+            await asyncio.sleep(0.05)
+
+            # The client went away, but the worker thread is still busy
+            task.cancel()
+            await asyncio.sleep(0.05)
+            assert executor.in_flight == 1
+            with pytest.raises(Saturated):
+                await executor.run(lambda: None)
+
+            finish.set()
+            for _ in range(100):
+                if executor.in_flight == 0:
+                    break
+                await asyncio.sleep(0.01)
+            assert executor.in_flight == 0
+            assert await executor.run(lambda: 42) == 42
+        finally:
+            finish.set()
+            executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_released_reservation_waits_for_its_running_call():
+    async def scenario():
+        executor = ScoringExecutor('thread', max_workers=1, max_queue=0)
+        finish = threading.Event()
+        try:
+            reservation = executor.reserve()
+            task = asyncio.ensure_future(reservation.run(finish.wait))
+            await asyncio.sleep(0.05)
+
+            # A stream closed mid-block: its generator releases the reservation
+            task.cancel()
+            reservation.release()
+            reservation.release()
+            assert executor.in_flight == 1
+
+            finish.set()
+            for _ in range(100):
+                if executor.in_flight == 0:
+                    break
+                await asyncio.sleep(0.01)
+            assert executor.in_flight == 0
+        finally:
+            finish.set()
+            executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def one_slot(monkeypatch):
+    """The app's scoring executor swapped for a single worker with no queue"""
+    import backend.main
+
+    executor = ScoringExecutor('thread', max_workers=1, max_queue=0)
+    monkeypatch.setattr(backend.main, 'scoring_executor', executor)
+    yield executor
+    executor.shutdown()
+
+
+def test_saturated_executor_sheds_load_with_503(client, one_slot):
+    held = one_slot.reserve()
+    try:
+        for method, url, body in [
+            ('GET', "/api/recommend/user/1", None),
+            ('POST', "/api/recommend/batch", {'userIds': ['1', '2'], 'stream': True}),
+        ]:
+            response = client.request(method, url, json=body)
+            assert response.status_code == 503
+            assert response.headers['Retry-After'] == "1"
+        # Cheap endpoints stay on the event loop regardless
+        assert client.get("/api/items", params={'limit': 5}).status_code == 200
+    finally:
+        held.release()
+    assert one_slot.stats()['rejected'] == 2
+    assert one_slot.in_flight == 0
+
+    assert client.get("/api/recommend/user/1").status_code == 200
+    response = client.post("/api/recommend/batch", json={'userIds': ['1', '2', '3'], 'stream': True})
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 3
+    assert one_slot.in_flight == 0
@@ -0,0 +1,54 @@
+import numpy as np
+
+from backend.foldin import FoldInLayer
+from backend.mf import MFScorer
+
+
+def zero_filled_layer(training_row, max_users=10):
+    """Full-rank TruncatedSVD-style model: orthonormal item factors, user factors Q^T r"""
+    n = len(training_row)
+    item_factors = np.linalg.qr(np.random.default_rng(0).normal(size=(n, n)))[0]
+    scorer = MFScorer(
+        user_factors=(training_row @ item_factors)[None, :],
+        item_factors=item_factors,
+        user_ids=['known'],
+        item_ids=[str(i) for i in range(n)],
+    )
+    scorer.bind_catalog([str(i) for i in range(n)])
+    return FoldInLayer(scorer, max_users=max_users)
+
+
+def predictions(layer, user_id):
+    factors, _ = layer._users[user_id]
+    return layer.factors @ factors
+
+
+def test_rerating_a_training_item_replaces_its_rating():
+    training_row = np.array([5.0, 0.0, 3.0, 0.0, 0.0, 1.0])
+    layer = zero_filled_layer(training_row)
+
+    # Same value as in training: nothing changes, however often it is repeated
+    for _ in range(3):
+        layer.add_ratings('known', [(0, 5.0)])
+        np.testing.assert_allclose(predictions(layer, 'known'), training_row, atol=1e-9)
+
+    layer.add_ratings('known', [(2, 1.0)])
+    estimate = predictions(layer, 'known')
+    # 3 -> 1 moves the item by -2 (shrunk by the ridge), not by +1 on top of the old rating
+    np.testing.assert_allclose(estimate[2], 3.0 - 2.0 / (1 + layer.regularization), atol=1e-9)
+    np.testing.assert_allclose(estimate[[1, 3, 4, 5]], training_row[[1, 3, 4, 5]], atol=1e-9)
+
+
+def test_new_users_start_from_zero():
+    layer = zero_filled_layer(np.zeros(6))
+    layer.add_ratings('new', [(1, 4.0)])
+    np.testing.assert_allclose(predictions(layer, 'new')[1], 4.0 / (1 + layer.regularization), atol=1e-9)
+
+
+def test_evictions_are_counted():
+    layer = zero_filled_layer(np.zeros(6), max_users=2)
+    for user_id in ('a', 'b', 'c', 'd'):
+        layer.add_ratings(user_id, [(0, 4.0)])
+    assert len(layer) == 2
+    assert not layer.knows('a') and layer.knows('d')
+    assert layer.stats()['evicted'] == 2
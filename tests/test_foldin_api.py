@@ -0,0 +1,37 @@
+import time
+
+from backend.main import models
+
+USER = "fold-in-test-user"
+
+
+def recommended_ids(client):
+    response = client.get(f"/api/recommend/user/{USER}", params={'limit': 10})
+    assert response.status_code == 200
+    return [rec['item']['id'] for rec in response.json()]
+
+
+def test_ratings_change_recommendations_and_survive_a_reload(client):
+    before = recommended_ids(client)
+
+    # Love items the user wasn't recommended
+    liked = [item['id'] for item in client.get("/api/items", params={'sort_by': 'title', 'limit': 30}).json()
+             if item['id'] not in before][:5]
+    response = client.post("/api/ratings", json={
+        'userId': USER, 'ratings': [{'itemId': item_id, 'rating': 5} for item_id in liked]
+    })
+    assert response.status_code == 200
+    assert response.json()['folded'] == len(liked)
+
+    after = recommended_ids(client)
+    assert after != before
+
+    version = client.get("/api/admin/models").json()['version']
+    assert client.post("/api/admin/reload").status_code == 202
+    deadline = time.monotonic() + 60
+    while client.get("/api/admin/models").json()['version'] == version:
+        assert time.monotonic() < deadline, "reload did not finish"
+        time.sleep(0.05)
+
+    assert models.snapshot.fold_in.knows(USER)
+    assert recommended_ids(client) == after
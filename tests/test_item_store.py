@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.item_store import ItemStore, _bitmask, popcount64
+
+
+def catalog(n_genres, n_items=200, seed=0):
+    rng = np.random.default_rng(seed)
+    names = [f"G{i:02d}" for i in range(n_genres)]
+    genres = ['|'.join(rng.choice(names, size=rng.integers(0, 5), replace=False)) for _ in range(n_items)]
+    # Every genre used at least once, so the vocabulary has exactly n_genres entries
+    genres[:n_genres] = names
+    return pd.DataFrame({
+        'id': np.arange(1, n_items + 1),
+        'title': [f"Movie {i}" for i in range(n_items)],
+        'genres': genres,
+        'year': rng.integers(1950, 2024, size=n_items),
+    })
+
+
+def edge_values():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 2**64, size=1000, dtype=np.uint64)
+    return np.concatenate([values, np.array([0, 1, 2**63, 2**64 - 1], dtype=np.uint64)])
+
+
+@pytest.mark.parametrize("builtin", [False, True])
+def test_popcount_matches_python(monkeypatch, builtin):
+    if builtin and not hasattr(np, 'bitwise_count'):
+        pytest.skip("np.bitwise_count needs NumPy 2.0")
+    if not builtin:
+        # Lookup-table fallback, the only path on NumPy < 2.0
+        monkeypatch.delattr(np, 'bitwise_count', raising=False)
+    values = edge_values()
+    counts = popcount64(values)
+    assert counts.dtype == np.int64
+    np.testing.assert_array_equal(counts, [bin(int(v)).count('1') for v in values])
+
+
+def test_bitmask_sets_one_bit_per_column():
+    assert _bitmask(np.array([], dtype=np.int64)) == 0
+    assert _bitmask(np.array([0, 5, 63])) == np.uint64(1 | 1 << 5 | 1 << 63)
+    assert _bitmask(np.array([3, 3])) == np.uint64(8)
+
+
+def test_bitmask_path_matches_sparse_path():
+    # 64 genres still fit in one word, including the top bit
+    store = ItemStore(catalog(64))
+    assert store.genre_bits is not None
+    sparse_store = ItemStore(catalog(64))
+    sparse_store.genre_bits = None
+
+    query = ['G00', 'G31', 'G63', 'unknown']
+    np.testing.assert_array_equal(store.genre_overlap(query), sparse_store.genre_overlap(query))
+    for row in (0, 63, 100):
+        np.testing.assert_allclose(store.genre_jaccard(row), sparse_store.genre_jaccard(row))
+
+
+def test_more_than_64_genres_use_the_sparse_path():
+    store = ItemStore(catalog(65))
+    assert store.genre_bits is None
+    overlap = store.genre_overlap(['G64'])
+    assert overlap[64] == 1 and overlap.dtype == np.int64
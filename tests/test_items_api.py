@@ -0,0 +1,51 @@
+import json
+
+from backend.main import ITEMS_PAGE_MAX
+
+
+def listing(client, params):
+    """Every match in one page"""
+    return client.get("/api/items", params={**params, 'limit': ITEMS_PAGE_MAX}).json()
+
+
+def fetch_pages(client, params):
+    """Follow X-Next-Cursor from the first page to the last"""
+    ids, cursor, pages = [], None, 0
+    while True:
+        response = client.get("/api/items", params={**params, **({'cursor': cursor} if cursor else {})})
+        assert response.status_code == 200
+        ids += [item['id'] for item in response.json()]
+        pages += 1
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            return ids, pages
+
+
+def test_cursor_pages_cover_the_listing_once(client):
+    everything = [item['id'] for item in listing(client, {'sort_by': 'popularity'})]
+    ids, pages = fetch_pages(client, {'sort_by': 'popularity', 'limit': 10})
+    assert ids == everything
+    assert pages == -(-len(everything) // 10)
+
+
+def test_last_page_has_no_next_cursor(client):
+    total = len(listing(client, {'sort_by': 'year'}))
+    response = client.get("/api/items", params={'sort_by': 'year', 'limit': total})
+    assert len(response.json()) == total
+    assert 'X-Next-Cursor' not in response.headers
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/api/items", params={'cursor': '!!not-a-cursor!!'}).status_code == 400
+    cursor = client.get("/api/items", params={'sort_by': 'title', 'limit': 5}).headers['X-Next-Cursor']
+    # Issued for another sort order
+    assert client.get("/api/items", params={'sort_by': 'year', 'cursor': cursor}).status_code == 400
+
+
+def test_ndjson_streams_the_same_items(client):
+    params = {'genre': 'Drama', 'sort_by': 'popularity'}
+    expected = listing(client, params)
+    response = client.get("/api/items", params={**params, 'format': 'ndjson'})
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    assert [json.loads(line) for line in response.text.splitlines()] == expected
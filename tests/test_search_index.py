@@ -0,0 +1,55 @@
+import numpy as np
+
+from backend.search_index import PostingIndex, tokenize
+
+TITLES = [
+    "Toy Story",
+    "Amélie",
+    "Star Wars",
+    "Star Trek: Generations",
+    "Starship Troopers",
+    "The Story of Us",
+    "Toys",
+]
+
+
+def title_index(titles=TITLES):
+    return PostingIndex((tokenize(title) for title in titles), len(titles))
+
+
+def brute_force_prefix(documents, prefix):
+    return [row for row, terms in enumerate(documents) if any(term.startswith(prefix) for term in terms)]
+
+
+def test_tokens_are_lower_cased_without_accents():
+    assert tokenize("Amélie (2001)") == ["amelie", "2001"]
+
+
+def test_exact_and_prefix_lookup():
+    index = title_index()
+    np.testing.assert_array_equal(index.lookup("star"), [2, 3])
+    assert len(index.lookup("sta")) == 0
+    np.testing.assert_array_equal(index.prefix("star"), [2, 3, 4])
+    np.testing.assert_array_equal(index.prefix("toy"), [0, 6])
+    np.testing.assert_array_equal(index.prefix("amel"), [1])
+    assert len(index.prefix("zebra")) == 0
+
+
+def test_search_matches_every_token_as_a_prefix():
+    index = title_index()
+    np.testing.assert_array_equal(index.search("Star T"), [3, 4])
+    np.testing.assert_array_equal(index.search("story toy"), [0])
+    assert len(index.search("star story")) == 0
+    assert index.search("  !! ") is None
+
+
+def test_prefix_unions_match_brute_force():
+    rng = np.random.default_rng(0)
+    words = [f"{a}{b}{c}" for a in "abc" for b in "abc" for c in "abc"]
+    # Short prefixes cover most of the catalog (dense mask union), long ones a few items (sorted union)
+    documents = [list(rng.choice(words, size=rng.integers(1, 4))) for _ in range(300)]
+    index = PostingIndex(documents, len(documents))
+    for prefix in ["a", "ab", "abc", "b", "ca", "cc", "d", ""]:
+        rows = index.prefix(prefix)
+        assert rows.dtype == np.int32
+        np.testing.assert_array_equal(rows, brute_force_prefix(documents, prefix))